@@ -10,6 +10,12 @@ from pyspark.sql.types import NumericType
 from pyspark.sql.utils import AnalysisException
 import logging
 import re
+import json
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from spark_anonymization import apply_anonymization
 
 
 # Configure logging
@@ -45,6 +51,10 @@ spark = SparkSession.builder \
 source_bucket = "dw-bucket-bronze" 
 destination_bucket = "dw-bucket-silver"
 metadata_bucket = "dw-bucket-metadata"  # Bucket to store metadata of processed files
+anonymization_rules_prefix = "anonymization_rules"  # Per project rule files in the metadata bucket
+xpt_chunk_rows = 50000  # Rows per record batch when converting SAS XPT files
+xpt_staging_prefix = "xpt_staging"  # Converted XPT files awaiting preprocessing, kept in bronze next to the raw data
+spool_max_size = 64 * 1024 * 1024  # Objects up to this size are staged in memory, larger ones on disk
 
 def list_files_in_bucket(bucket_name):
     """List all files in a specified MinIO bucket."""
@@ -187,6 +197,31 @@ def apply_ml_preprocessing(df):
             continue
     return df
 
+# Preprocessing option 3
+def load_anonymization_rules(file_name):
+    """Load the anonymization rules of the file's project from the metadata bucket.
+    Uploads are named <project>/<name>, the rules live in anonymization_rules/<project>.json as
+    {"column": {"type": ..., options}}, the same format as the Data Anonymization scripts."""
+    if '/' not in file_name:
+        raise ValueError(f"File {file_name} has no project prefix to look up anonymization rules for")
+    project = file_name.split('/')[0]
+    response = minio_client.get_object(metadata_bucket, f"{anonymization_rules_prefix}/{project}.json")
+    try:
+        return json.loads(response.read())
+    finally:
+        response.close()
+        response.release_conn()
+
+def apply_preprocessing(df, file_name, preprocessing_option):
+    """Apply the transformations of the selected preprocessing option."""
+    if preprocessing_option == "Data Clean Up":
+        return apply_basic_cleanup(df)
+    elif preprocessing_option == "Preprocessing for Machine Learning":
+        return apply_ml_preprocessing(df)
+    elif preprocessing_option == "Anonymize":
+        return apply_anonymization(df, load_anonymization_rules(file_name))
+    return df  # No preprocessing
+
 # actually perform the preprocessing, take from bronze apply changes, save to silver.
 def process_file(file_name, preprocessing_option):
     """Process a file: read from MinIO, transform based on preprocessing option, and write back as a parquet."""
@@ -203,12 +238,7 @@ def process_file(file_name, preprocessing_option):
         print(f"Processing file: {file_name}")
 
         # Determine and apply transformations based on selected preprocessing option
-        if preprocessing_option == "Data Clean Up":
-            transformed_df = apply_basic_cleanup(df)
-        elif preprocessing_option == "Preprocessing for Machine Learning":
-            transformed_df = apply_ml_preprocessing(df)
-        else:
-            transformed_df = df  # No preprocessing
+        transformed_df = apply_preprocessing(df, file_name, preprocessing_option)
 
         transformed_df.show()
 
@@ -226,11 +256,93 @@ def process_file(file_name, preprocessing_option):
     except Exception as e:
         print(f"Failed to process file {file_name}: {e}")
 
+def xpt_field_name(value):
+    """XPT field names and labels are blank padded bytes."""
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    return value.strip()
+
+def xpt_schema(reader):
+    """Parquet schema of an XPT file: SAS numerics are doubles, characters strings,
+    and the SAS label of every variable is kept in its field metadata."""
+    fields = []
+    for field in reader.fields:
+        data_type = pa.float64() if field['ntype'] == 'numeric' else pa.string()
+        metadata = {'sas_label': xpt_field_name(field['label'])}
+        fields.append(pa.field(xpt_field_name(field['name']), data_type, metadata=metadata))
+    return pa.schema(fields)
+
+def convert_xpt_to_parquet(source, output):
+    """Convert a SAS XPT file to Parquet one record batch at a time, without a CSV copy."""
+    reader = pd.read_sas(source, format='xport', chunksize=xpt_chunk_rows, encoding='latin-1')
+    try:
+        schema = xpt_schema(reader)
+        rows = 0
+        with pq.ParquetWriter(output, schema, compression='snappy') as writer:
+            for chunk in reader:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+        return rows
+    finally:
+        reader.close()
+
+# XPT files (e.g. NHANES) are converted to typed Parquet, then preprocessed like CSV files.
+def process_xpt_file(file_name, preprocessing_option):
+    """Process an XPT file: convert it to Parquet and write it to silver, after the preprocessing option if one is selected.
+    With an option the converted file is staged in bronze, so only the transformed data ever reaches silver."""
+    try:
+        if is_file_processed(file_name):  # Check if file has already been processed
+            print(f"File {file_name} has already been processed. Skipping...")
+            return
+
+        base_name = re.sub(r'\.xpt$', '', file_name, flags=re.IGNORECASE)
+        preprocess = preprocessing_option in ("Data Clean Up", "Preprocessing for Machine Learning", "Anonymize")
+        if preprocess:
+            converted_bucket, converted_name = source_bucket, f"{xpt_staging_prefix}/{base_name}.parquet"
+        else:
+            converted_bucket, converted_name = destination_bucket, f"{base_name}.parquet"
+        print(f"Processing file: {file_name}")
+
+        # Stage the XPT file and the Parquet output locally, spilling to disk only for large files
+        with tempfile.SpooledTemporaryFile(max_size=spool_max_size) as source, \
+                tempfile.SpooledTemporaryFile(max_size=spool_max_size) as output:
+            response = minio_client.get_object(source_bucket, file_name)
+            try:
+                for data in response.stream(1024 * 1024):
+                    source.write(data)
+            finally:
+                response.close()
+                response.release_conn()
+            source.seek(0)
+            rows = convert_xpt_to_parquet(source, output)
+            length = output.tell()
+            output.seek(0)
+            minio_client.put_object(converted_bucket, converted_name, output, length,
+                                    content_type='application/vnd.apache.parquet')
+        print(f"Converted {rows} rows of {file_name} to {converted_bucket}/{converted_name}")
+
+        if preprocess:
+            try:
+                df = spark.read.parquet(f"s3a://{converted_bucket}/{converted_name}")
+                transformed_df = apply_preprocessing(df, file_name, preprocessing_option)
+                transformed_df.write.mode('overwrite').parquet(f"s3a://{destination_bucket}/{base_name}_processed.parquet")
+                print(f"Processed and saved file: {file_name} to {destination_bucket}")
+            finally:
+                # The staged copy is only needed for the Spark read, also when preprocessing fails
+                minio_client.remove_object(converted_bucket, converted_name)
+
+        # Mark the file as processed in the metadata bucket
+        mark_file_as_processed(file_name)
+    except Exception as e:
+        print(f"Failed to process file {file_name}: {e}")
+
 def main(file_name, preprocessing_option):
-    if file_name.endswith('.csv'):  # Ensure only CSV files are processed
+    if file_name.endswith('.csv'):  # Ensure only CSV and XPT files are processed
         process_file(file_name, preprocessing_option)
+    elif file_name.lower().endswith('.xpt'):
+        process_xpt_file(file_name, preprocessing_option)
     else:
-        print(f"File {file_name} is not a CSV file. Skipping.")
+        print(f"File {file_name} is not a CSV or XPT file. Skipping.")
 
 if __name__ == "__main__":
     # Read command-line arguments
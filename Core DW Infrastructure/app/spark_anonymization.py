@@ -0,0 +1,118 @@
+"""Spark versions of the column rules in Data Anonymization/anonymization.py.
+
+Every rule gives the same values as the pandas version, or for the random rules values drawn
+from the same alphabet and range, so a dataset anonymized by the ETL and one anonymized by the
+scripts look alike and their pseudonymized identifiers join.
+"""
+import hashlib
+import logging
+import os
+import string
+
+from pyspark.sql.functions import col, concat, floor, isnan, lit, rand, regexp_replace, sha2, unhex, when
+from pyspark.sql.types import BooleanType, DoubleType, FloatType
+
+logger = logging.getLogger(__name__)
+
+# Columns without a rule are masked, never passed through, like DEFAULT_RULE in anonymization.py
+DEFAULT_RULE = {'type': 'random_string', 'length': 20}
+
+# Leading and trailing characters Python's str.strip() removes: Unicode white space plus \x1c-\x1f
+_PYTHON_WHITESPACE = r'(?U)^[\s\x1c-\x1f]+|[\s\x1c-\x1f]+$'
+
+
+def is_missing(df, column):
+    """Null, or NaN in a float column, the values pandas counts as missing."""
+    if isinstance(df.schema[column].dataType, (FloatType, DoubleType)):
+        return col(column).isNull() | isnan(col(column))
+    return col(column).isNull()
+
+
+def value_text(df, column):
+    """The text Python's str() gives a value: 'True'/'False' for booleans, Spark's cast otherwise."""
+    if isinstance(df.schema[column].dataType, BooleanType):
+        return when(col(column), lit('True')).otherwise(lit('False'))
+    return col(column).cast("string")
+
+
+def identifier_text(df, column):
+    """Text form of an identifier, as Pseudonymizer._normalize gives it, so 123, 123.0 and '123'
+    in different files get one token."""
+    if isinstance(df.schema[column].dataType, (FloatType, DoubleType)):
+        return when(col(column) == floor(col(column)), col(column).cast("long").cast("string")) \
+            .otherwise(col(column).cast("string"))
+    return regexp_replace(value_text(df, column), _PYTHON_WHITESPACE, '')
+
+
+def hmac_sha256(key, message):
+    """HMAC-SHA256 hex digest as a Spark expression, matching Python's hmac module,
+    so tokens made here join with tokens made by the pseudonymization script."""
+    block_size = 64
+    if len(key) > block_size:
+        key = hashlib.sha256(key).digest()
+    key = key.ljust(block_size, b'\x00')
+    inner_pad = bytearray(b ^ 0x36 for b in key)
+    outer_pad = bytearray(b ^ 0x5C for b in key)
+    inner = unhex(sha2(concat(lit(inner_pad), message.cast("binary")), 256))
+    return sha2(concat(lit(outer_pad), inner), 256)
+
+
+def random_letters(length):
+    """A random string of ASCII letters per row, like random_string in anonymization.py."""
+    letters = lit(string.ascii_letters)
+    return concat(*[letters.substr((floor(rand() * len(string.ascii_letters)) + 1).cast("int"), lit(1))
+                    for _ in range(length)])
+
+
+def anonymize_column(df, column, rule):
+    """Spark expression for one column according to its rule, or None to drop the column."""
+    rule_type = rule['type']
+    missing = is_missing(df, column)
+    if rule_type == 'hash':
+        return when(~missing, sha2(concat(lit(rule.get('salt', '')), value_text(df, column)), 256))
+    if rule_type == 'pseudonymize':
+        key = os.getenv('PSEUDONYMIZATION_KEY')
+        if not key:
+            raise EnvironmentError("Please set 'PSEUDONYMIZATION_KEY' in your environment.")
+        message = concat(lit(f"{rule.get('namespace', 'default')}\x00"), identifier_text(df, column))
+        return when(~missing, hmac_sha256(key.encode('utf-8'), message))
+    if rule_type == 'bucket':
+        width = rule.get('width', 10)
+        return when(~missing, floor(col(column) / width) * width)
+    if rule_type == 'boolean_mask':
+        return when(col(column) == 1, lit(rule.get('true', 'Yes'))).otherwise(lit(rule.get('false', 'No')))
+    if rule_type == 'random_int':
+        low, high = rule.get('min', 1), rule.get('max', 1000)
+        return (floor(rand() * (high - low + 1)) + low).cast("int")
+    if rule_type == 'random_string':
+        return random_letters(rule.get('length', 20))
+    if rule_type == 'random_token':
+        # 64 lowercase hex digits, shaped like a SHA-256 digest
+        return sha2(rand().cast("string"), 256)
+    if rule_type == 'mask':
+        return when(~missing, lit(rule.get('value', '*****')))
+    if rule_type == 'drop':
+        return None
+    if rule_type == 'keep':
+        return col(column)
+    raise ValueError(f"Unknown anonymization rule type '{rule_type}'")
+
+
+def apply_anonymization(df, rules, default_rule=DEFAULT_RULE):
+    """Anonymization: rewrite every column with Spark column expressions in one projection, so the
+    work is spread over the executors. Columns without a rule get the default rule, 'keep' passes one through."""
+    logger.info("Applying anonymization...")
+    missing = [column for column in rules if column not in df.columns]
+    if missing:
+        logger.warning(f"Anonymization rules for missing columns ignored: {missing}")
+    unruled = [column for column in df.columns if column not in rules]
+    if unruled:
+        logger.info(f"Masking columns without a rule with the default rule: {unruled}")
+    columns = []
+    for column in df.columns:
+        expression = anonymize_column(df, column, rules.get(column, default_rule))
+        if expression is None:
+            logger.info(f"Dropping column '{column}'")
+        else:
+            columns.append(expression.alias(column))
+    return df.select(columns)
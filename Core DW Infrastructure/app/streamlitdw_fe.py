@@ -243,13 +243,13 @@ def main():
         # File uploader with expanded file types
         uploaded_file = st.file_uploader(
         "Choose a file", 
-        type=["csv", "txt", "xlsx", "json", "mp4", "jpg", "jpeg", "png"]
+        type=["csv", "txt", "xlsx", "json", "xpt", "mp4", "jpg", "jpeg", "png"]
         )
 
         # Preprocessing selection dropdown
         preprocessing_option = st.selectbox(
             "Preprocessing (optional)",
-            options=["No Pre-processing", "Data Clean Up", "Preprocessing for Machine Learning"],
+            options=["No Pre-processing", "Data Clean Up", "Preprocessing for Machine Learning", "Anonymize"],
             help="Choose a preprocessing option for the uploaded data.",
             key="preprocessing_option"
         )
@@ -119,7 +119,7 @@ def main():
 
         project = st.selectbox("Select Project", options=["project1", "project2", "project3", "project4", "project5","other"])
         num_files = st.number_input("Number of files to upload", 1, 10, 1)
-        preprocessing = st.selectbox("Preprocessing (optional)", options=["No Pre-processing", "Data Clean Up", "Preprocessing for Machine Learning"])
+        preprocessing = st.selectbox("Preprocessing (optional)", options=["No Pre-processing", "Data Clean Up", "Preprocessing for Machine Learning", "Anonymize"])
         add_prefix = st.checkbox("Add project as prefix and date as suffix to filename (to overwrite existing files)", value=True)
 
         uploaded_files = []
@@ -128,7 +128,7 @@ def main():
         
         with st.container():
             for i in range(num_files):
-                file = st.file_uploader(f"File {i + 1}", type=["csv", "txt", "json", "xlsx"], key=f"file_{i}")
+                file = st.file_uploader(f"File {i + 1}", type=["csv", "txt", "json", "xlsx", "xpt"], key=f"file_{i}")
                 if file:
                     uploaded_files.append(file)
                     default_base = file.name.rsplit('.', 1)[0]
@@ -0,0 +1,116 @@
+import importlib.util
+import string
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyspark')
+
+from pyspark.sql import SparkSession
+from pyspark.sql.types import BooleanType, DoubleType, LongType, StringType, StructField, StructType
+
+import spark_anonymization
+
+SCRIPTS = Path(__file__).resolve().parents[2] / 'Data Anonymization'
+KEY = 'parity-test-key'
+
+
+def load_script_module(name):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+anonymization = load_script_module('anonymization')
+pseudonymization = load_script_module('pseudonymization')
+
+SCHEMA = StructType([
+    StructField('text', StringType()),
+    StructField('number', LongType()),
+    StructField('amount', DoubleType()),
+    StructField('flag', BooleanType()),
+])
+ROWS = [
+    (' padded\t', 37, 1.5, True),
+    ('café ', 1, 123.0, False),
+    ('\x1cseparated ', 0, 42.0, True),
+    (None, None, None, None),
+]
+
+
+@pytest.fixture(scope='module')
+def spark():
+    session = SparkSession.builder.master('local[1]').appName('anonymization parity').getOrCreate()
+    yield session
+    session.stop()
+
+
+@pytest.fixture(scope='module')
+def frames(spark):
+    columns = list(zip(*ROWS))
+    pandas_df = pd.DataFrame({
+        'text': pd.Series(columns[0], dtype=object),
+        'number': pd.Series(columns[1], dtype='Int64'),
+        'amount': pd.Series(columns[2], dtype='float64'),
+        'flag': pd.Series(columns[3], dtype='boolean'),
+    })
+    return pandas_df, spark.createDataFrame(ROWS, SCHEMA)
+
+
+def run_both(frames, column, rule, monkeypatch):
+    pandas_df, spark_df = frames
+    monkeypatch.setenv('PSEUDONYMIZATION_KEY', KEY)
+    pseudonymizers = {rule.get('namespace', 'default'): pseudonymization.Pseudonymizer(KEY, rule.get('namespace', 'default'))}
+    expected = anonymization.apply_rule(pandas_df[column], rule, np.random.default_rng(0), pseudonymizers)
+    expression = spark_anonymization.anonymize_column(spark_df, column, rule)
+    if expected is None or expression is None:
+        return expected, expression
+    actual = [row[0] for row in spark_df.select(expression.alias(column)).collect()]
+    return [None if pd.isna(value) else value for value in pd.Series(expected, dtype=object)], actual
+
+
+@pytest.mark.parametrize('column', ['text', 'number', 'amount', 'flag'])
+@pytest.mark.parametrize('rule', [
+    {'type': 'hash'},
+    {'type': 'hash', 'salt': 'pepper'},
+    {'type': 'pseudonymize', 'namespace': 'patient'},
+    {'type': 'mask', 'value': 'XXX'},
+    {'type': 'keep'},
+])
+def test_deterministic_rules_match(frames, column, rule, monkeypatch):
+    expected, actual = run_both(frames, column, rule, monkeypatch)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('column', ['number', 'amount'])
+def test_bucket_matches(frames, column, monkeypatch):
+    expected, actual = run_both(frames, column, {'type': 'bucket', 'width': 10}, monkeypatch)
+    assert actual == expected
+
+
+def test_boolean_mask_matches(frames, monkeypatch):
+    expected, actual = run_both(frames, 'number', {'type': 'boolean_mask', 'true': 'High', 'false': 'Low'}, monkeypatch)
+    assert actual == expected == ['Low', 'High', 'Low', 'Low']
+
+
+def test_drop_matches(frames, monkeypatch):
+    assert run_both(frames, 'text', {'type': 'drop'}, monkeypatch) == (None, None)
+
+
+def test_random_int_draws_from_the_same_range(frames, monkeypatch):
+    expected, actual = run_both(frames, 'number', {'type': 'random_int', 'min': 5, 'max': 7}, monkeypatch)
+    for values in (expected, actual):
+        assert all(isinstance(value, (int, np.integer)) and 5 <= value <= 7 for value in values)
+
+
+@pytest.mark.parametrize('rule, alphabet, length', [
+    ({'type': 'random_string', 'length': 12}, string.ascii_letters, 12),
+    ({'type': 'random_token'}, '0123456789abcdef', 64),
+])
+def test_random_strings_use_the_same_alphabet(frames, rule, alphabet, length, monkeypatch):
+    expected, actual = run_both(frames, 'text', rule, monkeypatch)
+    for values in (expected, actual):
+        assert all(len(value) == length and set(value) <= set(alphabet) for value in values)
@@ -5,6 +5,10 @@ from dotenv import load_dotenv
 import os
 import requests
 import re
+import json
+import numpy as np
+from urllib.parse import quote
+from privacy import PrivacyLedger, BudgetExceeded, check_dataset, query_key, laplace_noise
 
 # Load environment variables from .env file
 load_dotenv('dw.env')
@@ -16,6 +20,21 @@ dremio_url = os.getenv('DREMIO_URL')
 dremio_username = os.getenv('DREMIO_USERNAME')
 dremio_password = os.getenv('DREMIO_PASSWORD')
 
+# Differential privacy: epsilon ledger and noisy answer cache
+privacy_ledger = PrivacyLedger(
+    os.getenv('DP_LEDGER_PATH', 'privacy_ledger.db'),
+    dataset_budget=float(os.getenv('DP_DATASET_BUDGET', 10.0)),
+    consumer_budget=float(os.getenv('DP_CONSUMER_BUDGET', 3.0))
+)
+dp_queries = ('count', 'sum', 'mean', 'histogram')
+# DP queries only run on datasets inside these Dremio spaces or folders (comma separated dotted paths)
+dp_allowed_spaces = [space.strip() for space in os.getenv('DP_ALLOWED_SPACES', 'Silver').split(',') if space.strip()]
+max_histogram_bins = 500  # Dremio returns at most 500 rows per results page
+# Consumers are identified by their API token (Authorization: Bearer <token>), never by a name in the request.
+# DP_CONSUMER_TOKENS is a JSON object of {"token": "consumer"}; without it every caller is the one shared consumer.
+dp_consumer_tokens = json.loads(os.getenv('DP_CONSUMER_TOKENS', '{}'))
+anonymous_consumer = 'anonymous'
+
 # Authenticate and get token
 def get_dremio_token():
     auth_response = requests.post(f'{dremio_url}/apiv2/login', json={'userName': dremio_username, 'password': dremio_password})
@@ -34,8 +53,8 @@ def execute_dremio_query(sql):
     job_id = response.json().get('id')
     return job_id
 
-# Function to get query results from Dremio
-def get_dremio_query_results(job_id):
+# Function to get query results from Dremio, only the first limit rows if a limit is given
+def get_dremio_query_results(job_id, limit=None):
     token = get_dremio_token()
     headers = {
         'Authorization': f'_dremio{token}',
@@ -52,7 +71,8 @@ def get_dremio_query_results(job_id):
             raise Exception(f'Query failed with status: {job_status}')
     
     # Fetch the query results
-    response = requests.get(f'{dremio_url}/api/v3/job/{job_id}/results', headers=headers)
+    params = {'limit': limit} if limit else None
+    response = requests.get(f'{dremio_url}/api/v3/job/{job_id}/results', headers=headers, params=params)
     response.raise_for_status()
     return response.json()
 
@@ -67,6 +87,24 @@ def list_dremio_catalog():
     response.raise_for_status()
     return response.json()
 
+# Function to look a dataset up in the Dremio catalog, returns its path as Dremio spells it and its version tag.
+# Dremio changes the tag whenever the dataset changes, including a metadata refresh that picks up new files.
+def resolve_dataset(dataset):
+    token = get_dremio_token()
+    headers = {
+        'Authorization': f'_dremio{token}',
+        'Content-Type': 'application/json'
+    }
+    path = '/'.join(quote(part, safe='') for part in dataset.split('.'))
+    response = requests.get(f'{dremio_url}/api/v3/catalog/by-path/{path}', headers=headers)
+    if response.status_code == 404:
+        raise ValueError(f'Dataset {dataset} does not exist')
+    response.raise_for_status()
+    entity = response.json()
+    if entity.get('entityType') != 'dataset':
+        raise ValueError(f'{dataset} is not a dataset')
+    return '.'.join(entity['path']), entity.get('tag')
+
 @app.route('/dremio_query', methods=['POST'])
 def dremio_query():
     sql = request.json.get('sql')
@@ -87,6 +125,145 @@ def dremio_query():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Function to quote a dotted dataset path or a column name as Dremio identifiers
+def quote_identifier(name):
+    return '.'.join('"' + part.replace('"', '""') + '"' for part in name.split('.'))
+
+# Function to build the aggregate SQL of a DP query; only names and numbers come from the request
+def build_dp_sql(dataset, query, column, bounds, bins):
+    table = quote_identifier(dataset)
+    if query == 'count':
+        return f'SELECT COUNT(*) AS "value" FROM {table}'
+    value = f'CAST({quote_identifier(column)} AS DOUBLE)'
+    lower, upper = bounds
+    # Clip to the bounds, which is what limits the sensitivity
+    clipped = f'CASE WHEN {value} < {lower!r} THEN {lower!r} WHEN {value} > {upper!r} THEN {upper!r} ELSE {value} END'
+    if query in ('sum', 'mean'):
+        return f'SELECT SUM({clipped}) AS "value", COUNT({value}) AS "n" FROM {table}'
+    width = (upper - lower) / bins
+    bin_index = f'LEAST(CAST(FLOOR(({clipped} - {lower!r}) / {width!r}) AS INTEGER), {bins - 1})'
+    return (f'SELECT {bin_index} AS "bin", COUNT(*) AS "value" FROM {table} '
+            f'WHERE {value} IS NOT NULL GROUP BY {bin_index}')
+
+# Function to add noise to the exact Dremio result of a DP query
+def noisy_answer(query, rows, bounds, bins, epsilon):
+    if query == 'count':
+        return {'value': float(laplace_noise(rows[0]['value'], 1.0, epsilon))}
+    if query == 'histogram':
+        counts = np.zeros(bins)
+        for row in rows:
+            counts[int(row['bin'])] = row['value']
+        # Every bin gets noise, including empty ones, so empty bins are not revealed
+        edges = np.linspace(bounds[0], bounds[1], bins + 1)
+        return {'counts': laplace_noise(counts, 1.0, epsilon).tolist(), 'bin_edges': edges.tolist()}
+    total = rows[0]['value'] or 0.0
+    sum_sensitivity = max(abs(bounds[0]), abs(bounds[1]))
+    if query == 'sum':
+        return {'value': float(laplace_noise(total, sum_sensitivity, epsilon))}
+    # Mean: noisy sum over noisy count, each spending half of epsilon
+    noisy_sum = laplace_noise(total, sum_sensitivity, epsilon / 2)
+    noisy_count = max(float(laplace_noise(rows[0]['n'], 1.0, epsilon / 2)), 1.0)
+    return {'value': float(np.clip(noisy_sum / noisy_count, bounds[0], bounds[1]))}
+
+# Function to identify the consumer of a DP request from its token, None if the token is not known
+def authenticated_consumer():
+    if not dp_consumer_tokens:
+        return anonymous_consumer
+    authorization = request.headers.get('Authorization', '')
+    token = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else None
+    return dp_consumer_tokens.get(token) if token else None
+
+# Function to validate a DP query request, returns the query spec or raises ValueError
+def parse_dp_request(body):
+    if not isinstance(body, dict):
+        raise ValueError('Request body must be a JSON object')
+    dataset, query = body.get('dataset'), body.get('query')
+    if not dataset:
+        raise ValueError('dataset is required')
+    check_dataset(dataset, dp_allowed_spaces)
+    if query not in dp_queries:
+        raise ValueError(f'query must be one of {", ".join(dp_queries)}')
+    epsilon = float(body.get('epsilon', 0))
+    if not epsilon > 0:
+        raise ValueError('epsilon must be positive')
+    column, bounds, bins = body.get('column'), None, None
+    if query != 'count':
+        if not column or len(body.get('bounds') or []) != 2:
+            raise ValueError('column and bounds [lower, upper] are required')
+        bounds = [float(bound) for bound in body['bounds']]
+        if not np.all(np.isfinite(bounds)) or not bounds[0] < bounds[1]:
+            raise ValueError('bounds must be finite with the lower bound below the upper bound')
+    if query == 'histogram':
+        bins = int(body.get('bins', 10))
+        if not 1 <= bins <= max_histogram_bins:
+            raise ValueError(f'bins must be between 1 and {max_histogram_bins}')
+    return dataset, query, column, bounds, bins, epsilon
+
+@app.route('/dp_query', methods=['POST'])
+def dp_query():
+    consumer = authenticated_consumer()
+    if consumer is None:
+        return jsonify({'error': 'A valid consumer token is required'}), 401
+    try:
+        dataset, query, column, bounds, bins, epsilon = parse_dp_request(request.get_json(silent=True))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Names are case-insensitive in Dremio, the catalog's spelling keeps one budget per dataset
+        dataset, version = resolve_dataset(dataset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 500
+
+    # A repeated query on the same version gets the released answer again, without new budget or a Dremio round trip.
+    # A refresh between here and the query only means the next request asks Dremio again.
+    key = query_key(dataset, version, query, column, bounds, bins, epsilon)
+    answer = privacy_ledger.cached_answer(dataset, key)
+    if answer is not None:
+        return jsonify({**answer, 'epsilon_spent': 0.0, 'cached': True,
+                        'remaining_budget': privacy_ledger.remaining(dataset, consumer)})
+
+    try:
+        spend_id = privacy_ledger.spend(dataset, consumer, key, epsilon)
+    except BudgetExceeded as e:
+        return jsonify({'error': str(e)}), 403
+
+    try:
+        job_id = execute_dremio_query(build_dp_sql(dataset, query, column, bounds, bins))
+        rows = get_dremio_query_results(job_id, limit=max_histogram_bins).get('rows', [])
+        answer, stored = privacy_ledger.store_answer(dataset, key, noisy_answer(query, rows, bounds, bins, epsilon))
+    except Exception as e:
+        privacy_ledger.refund(spend_id)
+        return jsonify({'error': str(e)}), 500
+    if not stored:
+        # A concurrent request released its answer first, ours was never shown
+        privacy_ledger.refund(spend_id)
+    return jsonify({**answer, 'epsilon_spent': epsilon if stored else 0.0, 'cached': not stored,
+                    'remaining_budget': privacy_ledger.remaining(dataset, consumer)})
+
+@app.route('/dp_budget', methods=['GET'])
+def dp_budget():
+    consumer = authenticated_consumer()
+    if consumer is None:
+        return jsonify({'error': 'A valid consumer token is required'}), 401
+    dataset = request.args.get('dataset')
+    if not dataset:
+        return jsonify({'error': 'dataset is required'}), 400
+    try:
+        check_dataset(dataset, dp_allowed_spaces)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        dataset, _ = resolve_dataset(dataset)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'dataset': dataset, 'consumer': consumer,
+                    'remaining_budget': privacy_ledger.remaining(dataset, consumer)})
+
 @app.route('/dremio_catalog', methods=['GET'])
 def dremio_catalog():
     try:
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+
+class BudgetExceeded(Exception):
+    """Raised when a query would spend more epsilon than a dataset or consumer has left."""
+
+
+def check_dataset(dataset, allowed_spaces):
+    """Raise ValueError unless the dotted dataset path is a dataset inside one of the allowed spaces,
+    e.g. Silver.project.table for the space Silver. Dremio compares names case-insensitively."""
+    parts = dataset.lower().split('.')
+    if not all(part.strip() for part in parts):
+        raise ValueError('dataset must be a dotted path without empty parts')
+    for space in allowed_spaces:
+        prefix = space.lower().split('.')
+        if len(parts) > len(prefix) and parts[:len(prefix)] == prefix:
+            return
+    raise ValueError(f'dataset must be inside {" or ".join(allowed_spaces)}')
+
+
+def query_key(dataset, version, query, column, bounds, bins, epsilon):
+    """Stable key of a DP query on one version of the dataset, so the same question maps to the
+    same cached answer until the dataset changes."""
+    spec = {'dataset': dataset, 'version': version, 'query': query, 'column': column, 'bounds': bounds,
+            'bins': bins, 'epsilon': epsilon}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def laplace_noise(values, sensitivity, epsilon, rng=None):
+    """Add Laplace noise with scale sensitivity / epsilon to a value or an array of values."""
+    rng = rng or np.random.default_rng()
+    values = np.asarray(values, dtype=float)
+    return values + rng.laplace(0.0, sensitivity / epsilon, size=values.shape)
+
+
+class PrivacyLedger:
+    """Persistent epsilon ledger and noisy answer cache in SQLite.
+
+    Every dataset has a total budget shared by all consumers and every consumer a budget per
+    dataset. A spend is only recorded when both have enough left. Noisy answers are stored per
+    dataset and query: releasing the same noisy answer again reveals nothing new, so a repeated
+    query is answered from the cache without spending budget or querying Dremio. The query key
+    includes the dataset's version, so a query on a changed dataset is answered afresh.
+    """
+
+    def __init__(self, path, dataset_budget, consumer_budget):
+        self.path = path
+        self.dataset_budget = dataset_budget
+        self.consumer_budget = consumer_budget
+        # Serializes check-and-spend within this process, SQLite's write lock covers other processes
+        self.lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(
+                'CREATE TABLE IF NOT EXISTS budgets ('
+                ' dataset TEXT NOT NULL, consumer TEXT NOT NULL, total REAL NOT NULL,'
+                ' PRIMARY KEY (dataset, consumer));'
+                'CREATE TABLE IF NOT EXISTS spends ('
+                ' id INTEGER PRIMARY KEY, dataset TEXT NOT NULL, consumer TEXT NOT NULL,'
+                ' query_key TEXT NOT NULL, epsilon REAL NOT NULL, spent_at TEXT NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS spends_dataset_consumer ON spends (dataset, consumer);'
+                'CREATE TABLE IF NOT EXISTS answers ('
+                ' dataset TEXT NOT NULL, query_key TEXT NOT NULL, answer TEXT NOT NULL, created_at TEXT NOT NULL,'
+                ' PRIMARY KEY (dataset, query_key));'
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit, transactions are opened explicitly where a read and a write must be atomic
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _total(self, connection, dataset, consumer):
+        """Budget set for the dataset ('*') or a consumer of it, else the configured default."""
+        row = connection.execute(
+            'SELECT total FROM budgets WHERE dataset = ? AND consumer = ?', (dataset, consumer)
+        ).fetchone()
+        if row:
+            return row[0]
+        return self.dataset_budget if consumer == '*' else self.consumer_budget
+
+    def _spent(self, connection, dataset, consumer=None):
+        if consumer is None:
+            row = connection.execute('SELECT COALESCE(SUM(epsilon), 0) FROM spends WHERE dataset = ?', (dataset,))
+        else:
+            row = connection.execute(
+                'SELECT COALESCE(SUM(epsilon), 0) FROM spends WHERE dataset = ? AND consumer = ?', (dataset, consumer)
+            )
+        return row.fetchone()[0]
+
+    def set_budget(self, dataset, total, consumer='*'):
+        """Set the total epsilon of a dataset (consumer '*') or of one consumer on it."""
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO budgets (dataset, consumer, total) VALUES (?, ?, ?)', (dataset, consumer, total)
+            )
+
+    def remaining(self, dataset, consumer):
+        with self._connect() as connection:
+            return {
+                'dataset': self._total(connection, dataset, '*') - self._spent(connection, dataset),
+                'consumer': self._total(connection, dataset, consumer) - self._spent(connection, dataset, consumer),
+            }
+
+    def cached_answer(self, dataset, key):
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT answer FROM answers WHERE dataset = ? AND query_key = ?', (dataset, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def spend(self, dataset, consumer, key, epsilon):
+        """Record a spend of epsilon, or raise BudgetExceeded if the dataset or consumer lacks it."""
+        with self.lock, self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            dataset_left = self._total(connection, dataset, '*') - self._spent(connection, dataset)
+            consumer_left = self._total(connection, dataset, consumer) - self._spent(connection, dataset, consumer)
+            if epsilon > dataset_left or epsilon > consumer_left:
+                connection.execute('ROLLBACK')
+                raise BudgetExceeded(
+                    f'Epsilon {epsilon} exceeds the remaining budget '
+                    f'(dataset {dataset_left:.4g}, consumer {consumer_left:.4g})'
+                )
+            cursor = connection.execute(
+                'INSERT INTO spends (dataset, consumer, query_key, epsilon, spent_at) VALUES (?, ?, ?, ?, ?)',
+                (dataset, consumer, key, epsilon, datetime.utcnow().isoformat())
+            )
+            connection.execute('COMMIT')
+            return cursor.lastrowid
+
+    def refund(self, spend_id):
+        """Undo a spend whose query never produced an answer."""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM spends WHERE id = ?', (spend_id,))
+
+    def store_answer(self, dataset, key, answer):
+        """Store a noisy answer, returning the stored answer and whether it is this one.
+        If a concurrent request stored first, that answer wins so everybody sees the same release."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO answers (dataset, query_key, answer, created_at) VALUES (?, ?, ?, ?)',
+                (dataset, key, json.dumps(answer), datetime.utcnow().isoformat())
+            )
+            row = connection.execute(
+                'SELECT answer FROM answers WHERE dataset = ? AND query_key = ?', (dataset, key)
+            ).fetchone()
+        return json.loads(row[0]), cursor.rowcount == 1
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+pytest.importorskip('flask')
+# The app opens its ledger on import; the tests swap in one per test
+os.environ.setdefault('DP_LEDGER_PATH', ':memory:')
+
+import api  # noqa: E402
+from privacy import PrivacyLedger  # noqa: E402
+
+
+def test_count_sql():
+    assert api.build_dp_sql('Silver.p.t', 'count', None, None, None) == 'SELECT COUNT(*) AS "value" FROM "Silver"."p"."t"'
+
+
+def test_mean_sql_clips_to_the_bounds():
+    assert api.build_dp_sql('Silver.t', 'mean', 'age', [0.0, 80.0], None) == (
+        'SELECT SUM(CASE WHEN CAST("age" AS DOUBLE) < 0.0 THEN 0.0 WHEN CAST("age" AS DOUBLE) > 80.0 THEN 80.0 '
+        'ELSE CAST("age" AS DOUBLE) END) AS "value", COUNT(CAST("age" AS DOUBLE)) AS "n" FROM "Silver"."t"'
+    )
+
+
+def test_histogram_sql_puts_the_upper_bound_in_the_last_bin():
+    clipped = ('CASE WHEN CAST("age" AS DOUBLE) < 0.0 THEN 0.0 WHEN CAST("age" AS DOUBLE) > 80.0 THEN 80.0 '
+               'ELSE CAST("age" AS DOUBLE) END')
+    bin_index = f'LEAST(CAST(FLOOR(({clipped} - 0.0) / 10.0) AS INTEGER), 7)'
+    assert api.build_dp_sql('Silver.t', 'histogram', 'age', [0.0, 80.0], 8) == (
+        f'SELECT {bin_index} AS "bin", COUNT(*) AS "value" FROM "Silver"."t" '
+        f'WHERE CAST("age" AS DOUBLE) IS NOT NULL GROUP BY {bin_index}'
+    )
+
+
+def test_identifiers_are_quoted():
+    assert api.build_dp_sql('Silver.t"; DROP', 'sum', 'a"b', [0.0, 1.0], None).endswith('FROM "Silver"."t""; DROP"')
+    assert 'CAST("a""b" AS DOUBLE)' in api.build_dp_sql('Silver.t', 'sum', 'a"b', [0.0, 1.0], None)
+
+
+@pytest.fixture
+def dremio(tmp_path, monkeypatch):
+    """Stands in for Dremio: the catalog version of every dataset and the SQL that was run."""
+    monkeypatch.setattr(api, 'privacy_ledger', PrivacyLedger(str(tmp_path / 'ledger.db'), 10.0, 3.0))
+    monkeypatch.setattr(api, 'dp_consumer_tokens', {})
+    state = {'version': 'v1', 'queries': []}
+    monkeypatch.setattr(api, 'resolve_dataset', lambda dataset: ('Silver.' + dataset.split('.', 1)[1], state['version']))
+    monkeypatch.setattr(api, 'execute_dremio_query', lambda sql: state['queries'].append(sql) or 'job')
+    monkeypatch.setattr(api, 'get_dremio_query_results', lambda job_id, limit=None: {'rows': [{'value': 100}]})
+    return state
+
+
+def post(body):
+    return api.app.test_client().post('/dp_query', json=body)
+
+
+def test_repeated_query_is_answered_from_the_cache_until_the_dataset_changes(dremio):
+    body = {'dataset': 'Silver.p.t', 'query': 'count', 'epsilon': 0.5}
+    first = post(body).get_json()
+    second = post(dict(body, dataset='SILVER.p.t')).get_json()
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['value'] == first['value']
+    assert second['remaining_budget'] == {'dataset': 9.5, 'consumer': 2.5}
+    dremio['version'] = 'v2'
+    third = post(body).get_json()
+    assert third['cached'] is False and third['epsilon_spent'] == 0.5
+    assert len(dremio['queries']) == 2
+
+
+def test_datasets_outside_silver_are_rejected(dremio):
+    response = post({'dataset': 'Bronze.p.t', 'query': 'count', 'epsilon': 0.5})
+    assert response.status_code == 400
+    assert dremio['queries'] == []
+
+
+def test_failed_query_refunds_the_budget(dremio, monkeypatch):
+    def fail(sql):
+        raise RuntimeError('Dremio is down')
+
+    monkeypatch.setattr(api, 'execute_dremio_query', fail)
+    assert post({'dataset': 'Silver.t', 'query': 'count', 'epsilon': 1.0}).status_code == 500
+    budget = api.app.test_client().get('/dp_budget?dataset=Silver.t').get_json()
+    assert budget['remaining_budget'] == {'dataset': 10.0, 'consumer': 3.0}
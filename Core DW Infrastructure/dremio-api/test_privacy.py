@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+from privacy import BudgetExceeded, PrivacyLedger, check_dataset, laplace_noise, query_key
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return PrivacyLedger(str(tmp_path / 'ledger.db'), dataset_budget=2.0, consumer_budget=1.0)
+
+
+def test_spend_reduces_dataset_and_consumer_budgets(ledger):
+    ledger.spend('Silver.a', 'team-a', 'q1', 0.25)
+    ledger.spend('Silver.a', 'team-b', 'q2', 0.5)
+    assert ledger.remaining('Silver.a', 'team-a') == {'dataset': 1.25, 'consumer': 0.75}
+    assert ledger.remaining('Silver.b', 'team-a') == {'dataset': 2.0, 'consumer': 1.0}
+
+
+def test_spend_over_the_consumer_budget_is_refused(ledger):
+    ledger.spend('Silver.a', 'team-a', 'q1', 0.75)
+    with pytest.raises(BudgetExceeded, match='consumer 0.25'):
+        ledger.spend('Silver.a', 'team-a', 'q2', 0.5)
+    assert ledger.remaining('Silver.a', 'team-a')['consumer'] == 0.25
+
+
+def test_spend_over_the_dataset_budget_is_refused(ledger):
+    for consumer in ('team-a', 'team-b'):
+        ledger.spend('Silver.a', consumer, 'q', 1.0)
+    with pytest.raises(BudgetExceeded, match='dataset 0'):
+        ledger.spend('Silver.a', 'team-c', 'q', 0.1)
+
+
+def test_budgets_can_be_set_per_dataset_and_consumer(ledger):
+    ledger.set_budget('Silver.a', 5.0)
+    ledger.set_budget('Silver.a', 4.0, consumer='team-a')
+    ledger.spend('Silver.a', 'team-a', 'q', 3.0)
+    assert ledger.remaining('Silver.a', 'team-a') == {'dataset': 2.0, 'consumer': 1.0}
+
+
+def test_refund_returns_the_epsilon(ledger):
+    spend_id = ledger.spend('Silver.a', 'team-a', 'q', 1.0)
+    ledger.refund(spend_id)
+    assert ledger.remaining('Silver.a', 'team-a') == {'dataset': 2.0, 'consumer': 1.0}
+
+
+def test_concurrent_spends_never_exceed_the_budget(ledger):
+    refused = []
+
+    def spend():
+        try:
+            ledger.spend('Silver.a', 'team-a', 'q', 0.1)
+        except BudgetExceeded:
+            refused.append(True)
+
+    threads = [threading.Thread(target=spend) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(refused) == 10
+    assert ledger.remaining('Silver.a', 'team-a')['consumer'] == pytest.approx(0.0)
+
+
+def test_first_stored_answer_wins(ledger):
+    assert ledger.store_answer('Silver.a', 'k', {'value': 1.0}) == ({'value': 1.0}, True)
+    assert ledger.store_answer('Silver.a', 'k', {'value': 2.0}) == ({'value': 1.0}, False)
+    assert ledger.cached_answer('Silver.a', 'k') == {'value': 1.0}
+    assert ledger.cached_answer('Silver.b', 'k') is None
+
+
+def test_query_key_changes_with_the_dataset_version():
+    first = query_key('Silver.a', 'v1', 'mean', 'age', [0.0, 80.0], None, 0.5)
+    assert first == query_key('Silver.a', 'v1', 'mean', 'age', [0.0, 80.0], None, 0.5)
+    assert first != query_key('Silver.a', 'v2', 'mean', 'age', [0.0, 80.0], None, 0.5)
+    assert first != query_key('Silver.a', 'v1', 'mean', 'age', [0.0, 80.0], None, 0.25)
+
+
+@pytest.mark.parametrize('dataset', ['Silver.project.table', 'silver.t', 'minio.dw-bucket-silver.t'])
+def test_datasets_inside_the_allowed_spaces(dataset):
+    check_dataset(dataset, ['Silver', 'minio.dw-bucket-silver'])
+
+
+@pytest.mark.parametrize('dataset', ['Bronze.project.table', 'Silver', 'SilverCopy.t', 'Silver..t',
+                                     'minio.dw-bucket-bronze.t'])
+def test_datasets_outside_the_allowed_spaces_are_rejected(dataset):
+    with pytest.raises(ValueError):
+        check_dataset(dataset, ['Silver', 'minio.dw-bucket-silver'])
+
+
+def test_laplace_noise_scale():
+    noise = laplace_noise(np.zeros(100000), sensitivity=3.0, epsilon=1.5, rng=np.random.default_rng(0))
+    assert np.mean(np.abs(noise)) == pytest.approx(2.0, rel=0.03)
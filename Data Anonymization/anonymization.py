@@ -0,0 +1,147 @@
+import json
+import string
+from hashlib import sha256
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Column rules for the heart attack prediction dataset.
+# Each rule has a "type" and its options, columns without a rule get the default rule.
+HEART_ATTACK_RULES = {
+    'Patient ID': {'type': 'pseudonymize', 'namespace': 'patient'},
+    'Age': {'type': 'bucket', 'width': 10},
+    'Sex': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Diabetes': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Family History': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Smoking': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Obesity': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Alcohol Consumption': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Previous Heart Problems': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Medication Use': {'type': 'boolean_mask', 'true': 'Yes', 'false': 'No'},
+    'Heart Attack Risk': {'type': 'boolean_mask', 'true': 'High', 'false': 'Low'},
+    'Cholesterol': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Blood Pressure': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Heart Rate': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Exercise Hours Per Week': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Stress Level': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Income': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'BMI': {'type': 'random_int', 'min': 1, 'max': 1000},
+    'Triglycerides': {'type': 'random_int', 'min': 1, 'max': 1000},
+}
+
+# Non-sensitive columns are masked with random letters, like Faker's pystr()
+DEFAULT_RULE = {'type': 'random_string', 'length': 20}
+
+_LETTERS = np.frombuffer(string.ascii_letters.encode('ascii'), dtype=np.uint8)
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def _as_strings(characters, length):
+    """Turn a (rows, length) array of ASCII codes into a string column without a Python object per row."""
+    characters = np.ascontiguousarray(characters, dtype=np.uint8)
+    rows = len(characters)
+    if pa is None:
+        return characters.view(f'S{length}').ravel().astype(f'U{length}').astype(object)
+    # Fixed width strings already are an Arrow string buffer, they only need the offsets
+    offsets = np.arange(0, (rows + 1) * length, length, dtype=np.int32)
+    strings = pa.StringArray.from_buffers(rows, pa.py_buffer(offsets), pa.py_buffer(characters))
+    return pd.array(strings, dtype=pd.ArrowDtype(pa.string()))
+
+
+def load_rules(path):
+    """Load column rules from a JSON file of {"column": {"type": ..., options}}."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def bucket(values, width):
+    """Generalize numbers to the lower bound of their bucket, e.g. 37 -> 30 for width 10."""
+    return values // width * width
+
+
+def boolean_mask(values, true_label, false_label):
+    """Replace 1 with true_label and everything else with false_label."""
+    # A two-category column holds one code per row instead of a string object per row
+    codes = (values.to_numpy() == 1).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=[false_label, true_label])
+
+
+def random_int(size, low, high, rng):
+    """Draw uniform random integers in [low, high] in one call."""
+    return rng.integers(low, high, size=size, endpoint=True)
+
+
+def random_string(size, length, rng):
+    """Draw random ASCII letter strings of a fixed length in one call."""
+    letters = _LETTERS[rng.integers(0, len(_LETTERS), size=(size, length), dtype=np.uint8)]
+    return _as_strings(letters, length)
+
+
+def random_token(size, rng):
+    """Draw random 256-bit hex tokens, shaped like the SHA-256 digests the script used to produce."""
+    raw = rng.integers(0, 256, size=(size, 32), dtype=np.uint8)
+    # Split each byte into its two hex digits without going through Python strings
+    digits = np.empty((size, 64), dtype=np.uint8)
+    digits[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    digits[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    return _as_strings(digits, 64)
+
+
+def sha256_hash(values, salt=''):
+    """SHA-256 hex digest of the salt followed by every value, hashing each distinct value only once.
+    Missing values stay missing, as in the Spark ETL."""
+    codes, uniques = pd.factorize(values)
+    digests = np.array([sha256(f'{salt}{value}'.encode('utf-8')).hexdigest() for value in uniques] + [None],
+                       dtype=object)
+    # The missing value code -1 picks the trailing None
+    return digests[codes]
+
+
+def apply_rule(values, rule, rng, pseudonymizers=None):
+    """Anonymize one column according to its rule, or return None to drop the column."""
+    rule_type = rule['type']
+    size = len(values)
+    if rule_type == 'bucket':
+        return bucket(values, rule.get('width', 10))
+    if rule_type == 'boolean_mask':
+        return boolean_mask(values, rule.get('true', 'Yes'), rule.get('false', 'No'))
+    if rule_type == 'random_int':
+        return random_int(size, rule.get('min', 1), rule.get('max', 1000), rng)
+    if rule_type == 'random_string':
+        return random_string(size, rule.get('length', 20), rng)
+    if rule_type == 'random_token':
+        return random_token(size, rng)
+    if rule_type == 'hash':
+        return sha256_hash(values, rule.get('salt', ''))
+    if rule_type == 'pseudonymize':
+        namespace = rule.get('namespace', 'default')
+        if not pseudonymizers or namespace not in pseudonymizers:
+            raise ValueError(f"No pseudonymizer configured for namespace '{namespace}'")
+        return pseudonymizers[namespace].tokenize(values)
+    if rule_type == 'mask':
+        # As objects, nullable integer and boolean columns cannot hold the mask text
+        return values.astype(object).where(values.isna(), rule.get('value', '*****'))
+    if rule_type == 'drop':
+        return None
+    if rule_type == 'keep':
+        return values
+    raise ValueError(f"Unknown anonymization rule type '{rule_type}'")
+
+
+def anonymize(data, rules, default_rule=DEFAULT_RULE, seed=None, pseudonymizers=None):
+    """Return an anonymized copy of the DataFrame, one whole-column operation per column.
+
+    pseudonymizers maps a rule namespace to the Pseudonymizer used for its 'pseudonymize' columns.
+    """
+    rng = np.random.default_rng(seed)
+    anonymized = {}
+    for column in data.columns:
+        values = apply_rule(data[column], rules.get(column, default_rule), rng, pseudonymizers)
+        if values is not None:
+            anonymized[column] = values
+    return pd.DataFrame(anonymized, index=data.index)
@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class Pseudonymizer:
+    """Keyed, deterministic tokens for identifiers such as patient IDs.
+
+    A token is the HMAC-SHA256 of the identifier under a secret key, so the same patient gets the
+    same token in every dataset tokenized with that key and the tokens can be joined on, while
+    nobody without the key can recompute or reverse them. Tokens are cached in memory only:
+    a table of identifiers and their tokens on disk would undo the pseudonymization, and
+    recomputing the HMAC is cheaper than looking it up.
+
+    Nothing is persisted between runs. Tokens stay the same across runs only because the HMAC is
+    deterministic: the same key and namespace give the same token, and a new key gives new tokens
+    for every identifier, so rotating the key breaks joins with data tokenized before.
+    """
+
+    def __init__(self, key, namespace='default'):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        if not key:
+            raise ValueError("A non-empty pseudonymization key is required.")
+        self.key = key
+        # The namespace keeps tokens for different kinds of identifiers apart under the same key
+        self.namespace = namespace
+        self.cache = {}
+
+    @classmethod
+    def from_env(cls, namespace='default', variable='PSEUDONYMIZATION_KEY'):
+        """Create a pseudonymizer with the key from an environment variable."""
+        key = os.getenv(variable)
+        if not key:
+            raise EnvironmentError(f"Please set '{variable}' in your environment.")
+        return cls(key, namespace=namespace)
+
+    @staticmethod
+    def _normalize(value):
+        """Text form of an identifier, so 123, 123.0 and '123' from different files get one token."""
+        if isinstance(value, (float, np.floating)) and float(value).is_integer():
+            value = int(value)
+        return str(value).strip()
+
+    def _hmac(self, value):
+        message = f'{self.namespace}\x00{value}'.encode('utf-8')
+        return hmac.new(self.key, message, hashlib.sha256).hexdigest()
+
+    def tokenize_many(self, values):
+        """Return the tokens for a list of identifier strings, computing each missing one once."""
+        missing = [value for value in dict.fromkeys(values) if value not in self.cache]
+        self.cache.update((value, self._hmac(value)) for value in missing)
+        return [self.cache[value] for value in values]
+
+    def tokenize(self, values):
+        """Tokenize a column, working on its distinct values only; missing identifiers stay missing."""
+        codes, uniques = pd.factorize(values)
+        tokens = np.array(self.tokenize_many([self._normalize(value) for value in uniques]) + [None], dtype=object)
+        # The missing value code -1 picks the trailing None
+        return tokens[codes]
+
+
+def pseudonymizers_for_rules(rules):
+    """One pseudonymizer per namespace used by the 'pseudonymize' rules, keyed from the environment."""
+    namespaces = {rule.get('namespace', 'default') for rule in rules.values() if rule['type'] == 'pseudonymize'}
+    return {namespace: Pseudonymizer.from_env(namespace=namespace) for namespace in namespaces}
@@ -0,0 +1,195 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from dotenv import load_dotenv
+from minio import Minio
+
+from anonymization import HEART_ATTACK_RULES, anonymize, load_rules
+from pseudonymization import pseudonymizers_for_rules
+
+# Load environment variables from the .env file
+load_dotenv(dotenv_path='api.env')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PART_SIZE = 10 * 1024 * 1024  # Multipart upload part size, the most output held in memory at once
+
+# Per worker process state set up by init_worker
+_worker_rules = None
+_worker_pseudonymizers = None
+
+
+def create_client():
+    """Create a MinIO client from the environment settings."""
+    access_key = os.getenv('MINIO_ACCESS_KEY')
+    secret_key = os.getenv('MINIO_SECRET_KEY')
+    if not access_key or not secret_key:
+        raise EnvironmentError("Please set 'MINIO_ACCESS_KEY' and 'MINIO_SECRET_KEY' in your environment.")
+    return Minio(
+        os.getenv('MINIO_HOST'),
+        access_key=access_key,
+        secret_key=secret_key,
+        secure=os.getenv('MINIO_SECURE', 'False').lower() == 'true'
+    )
+
+
+class PipeUpload:
+    """Writable file whose bytes are streamed into a MinIO object by a background multipart upload."""
+
+    def __init__(self, client, bucket_name, object_name, content_type):
+        self._client = client
+        self._bucket_name = bucket_name
+        self._object_name = object_name
+        read_fd, write_fd = os.pipe()
+        self._reader = os.fdopen(read_fd, 'rb')
+        self.file = os.fdopen(write_fd, 'wb')
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._upload, args=(client, bucket_name, object_name, content_type), daemon=True
+        )
+
+    def _upload(self, client, bucket_name, object_name, content_type):
+        try:
+            client.put_object(bucket_name, object_name, self._reader, length=-1, part_size=PART_SIZE,
+                              content_type=content_type)
+        except Exception as e:
+            self._error = e
+            # Keep draining so the writer never blocks on a full pipe after a failed upload
+            while self._reader.read(PART_SIZE):
+                pass
+        finally:
+            self._reader.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self.file
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.file.close()
+        self._thread.join()
+        if exc is not None and self._error is None:
+            # Closing the pipe completed the upload, so remove the partial object rather than leave it in Silver
+            self._client.remove_object(self._bucket_name, self._object_name)
+        if self._error is not None and exc is None:
+            raise self._error
+        return False
+
+
+def init_worker(rules):
+    """Set up the rules and pseudonymizers once per worker process instead of once per chunk."""
+    global _worker_rules, _worker_pseudonymizers
+    _worker_rules = rules
+    _worker_pseudonymizers = pseudonymizers_for_rules(rules)
+
+
+def anonymize_chunk(chunk, seed):
+    """Anonymize one chunk in a worker process."""
+    return anonymize(chunk, _worker_rules, seed=seed, pseudonymizers=_worker_pseudonymizers)
+
+
+def chunk_seed(seed, index):
+    """Independent but reproducible random stream for every chunk."""
+    return None if seed is None else [seed, index]
+
+
+def worker_context():
+    """Fork the workers where that is safe, elsewhere (Windows, macOS) use the platform's default start method."""
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def anonymized_chunks(chunks, rules, seed, workers):
+    """Yield anonymized chunks in input order, on a process pool when workers > 1."""
+    if workers <= 1:
+        init_worker(rules)
+        for index, chunk in enumerate(chunks):
+            yield anonymize_chunk(chunk, chunk_seed(seed, index))
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(),
+                             initializer=init_worker, initargs=(rules,)) as executor:
+        # Only a couple of chunks per worker are in flight, which keeps memory constant
+        pending = deque()
+        for index, chunk in enumerate(chunks):
+            pending.append(executor.submit(anonymize_chunk, chunk, chunk_seed(seed, index)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_csv(chunks, output):
+    rows = 0
+    for index, chunk in enumerate(chunks):
+        output.write(chunk.to_csv(index=False, header=(index == 0)).encode('utf-8'))
+        rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, output):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output, table.schema, compression='snappy')
+            else:
+                # A chunk can infer a different type, e.g. a column that is empty in this chunk
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def anonymize_object(client, source_bucket, object_name, destination_bucket, output_name, rules,
+                     output_format='csv', chunk_rows=100000, workers=1, seed=None):
+    """Stream a CSV object from the source bucket through anonymization into the destination bucket."""
+    response = client.get_object(source_bucket, object_name)
+    try:
+        chunks = anonymized_chunks(pd.read_csv(response, chunksize=chunk_rows), rules, seed, workers)
+        content_type = 'text/csv' if output_format == 'csv' else 'application/vnd.apache.parquet'
+        with PipeUpload(client, destination_bucket, output_name, content_type) as output:
+            if output_format == 'csv':
+                rows = write_csv(chunks, output)
+            else:
+                rows = write_parquet(chunks, output)
+    finally:
+        response.close()
+        response.release_conn()
+    logging.info(f"Anonymized {rows} rows of {source_bucket}/{object_name} into {destination_bucket}/{output_name}")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Anonymize a CSV object from Bronze into Silver chunk by chunk.')
+    parser.add_argument('object_name', help='CSV object in the source bucket')
+    parser.add_argument('--source-bucket', default='dw-bucket-bronze')
+    parser.add_argument('--destination-bucket', default='dw-bucket-silver')
+    parser.add_argument('--output-name', help='Name of the anonymized object, defaults to <name>_anonymized.<format>')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--rules', help='JSON file with column rules, defaults to the heart attack dataset rules')
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=1, help='Processes anonymizing chunks in parallel')
+    parser.add_argument('--seed', type=int, help='Seed for the random replacements')
+    args = parser.parse_args()
+
+    output_name = args.output_name or f"{os.path.splitext(args.object_name)[0]}_anonymized.{args.format}"
+    rules = load_rules(args.rules) if args.rules else HEART_ATTACK_RULES
+    anonymize_object(create_client(), args.source_bucket, args.object_name, args.destination_bucket, output_name,
+                     rules, output_format=args.format, chunk_rows=args.chunk_rows, workers=args.workers,
+                     seed=args.seed)
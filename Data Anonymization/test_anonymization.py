@@ -0,0 +1,66 @@
+import hashlib
+import string
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import anonymization
+
+
+def test_bucket_rounds_down_to_the_width():
+    assert anonymization.bucket(pd.Series([0, 9, 10, 37, 99]), 10).tolist() == [0, 0, 10, 30, 90]
+
+
+def test_boolean_mask_labels_ones_and_everything_else():
+    masked = anonymization.boolean_mask(pd.Series([1, 0, np.nan, 2]), 'Yes', 'No')
+    assert list(masked) == ['Yes', 'No', 'No', 'No']
+
+
+def test_random_int_stays_within_bounds():
+    values = anonymization.random_int(10000, 3, 5, np.random.default_rng(0))
+    assert set(values) == {3, 4, 5}
+
+
+def test_random_string_is_letters_of_the_given_length():
+    values = list(anonymization.random_string(100, 20, np.random.default_rng(0)))
+    assert all(len(value) == 20 and set(value) <= set(string.ascii_letters) for value in values)
+
+
+def test_random_token_is_64_hex_digits():
+    values = list(anonymization.random_token(100, np.random.default_rng(0)))
+    assert all(len(value) == 64 and set(value) <= set('0123456789abcdef') for value in values)
+    assert len(set(values)) == 100
+
+
+def test_sha256_hash_with_salt_keeps_missing_values():
+    digests = anonymization.sha256_hash(pd.Series(['a', None, 'a']), salt='s')
+    assert digests[0] == digests[2] == hashlib.sha256(b'sa').hexdigest()
+    assert digests[1] is None
+
+
+def test_anonymize_applies_rules_and_default_rule():
+    data = pd.DataFrame({'Age': [37, 52], 'Name': ['Ann', 'Bob'], 'Notes': ['x', 'y'], 'Code': ['a', None]})
+    rules = {'Age': {'type': 'bucket', 'width': 10}, 'Notes': {'type': 'drop'}, 'Code': {'type': 'mask'}}
+    anonymized = anonymization.anonymize(data, rules, seed=1)
+    assert list(anonymized.columns) == ['Age', 'Name', 'Code']
+    assert anonymized['Age'].tolist() == [30, 50]
+    assert all(len(value) == 20 for value in anonymized['Name'])
+    assert anonymized['Code'].tolist()[0] == '*****'
+    assert pd.isna(anonymized['Code'].tolist()[1])
+
+
+def test_anonymize_is_reproducible_with_a_seed():
+    data = pd.DataFrame({'Income': range(50), 'Name': ['n'] * 50})
+    rules = {'Income': {'type': 'random_int', 'min': 1, 'max': 1000}}
+    pd.testing.assert_frame_equal(anonymization.anonymize(data, rules, seed=7), anonymization.anonymize(data, rules, seed=7))
+
+
+def test_unknown_rule_type_is_rejected():
+    with pytest.raises(ValueError, match="Unknown anonymization rule type"):
+        anonymization.anonymize(pd.DataFrame({'a': [1]}), {'a': {'type': 'shuffle'}})
+
+
+def test_pseudonymize_needs_a_pseudonymizer_for_the_namespace():
+    with pytest.raises(ValueError, match="No pseudonymizer configured"):
+        anonymization.anonymize(pd.DataFrame({'id': [1]}), {'id': {'type': 'pseudonymize', 'namespace': 'patient'}})
@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pseudonymization import Pseudonymizer, pseudonymizers_for_rules
+
+
+def test_token_is_the_hmac_of_namespace_and_identifier():
+    token = Pseudonymizer('key', 'patient').tokenize(pd.Series(['P-1']))[0]
+    assert token == hmac.new(b'key', b'patient\x00P-1', hashlib.sha256).hexdigest()
+
+
+def test_tokens_are_stable_across_instances_with_the_same_key():
+    # Nothing is stored between runs, a new instance recomputes the same tokens
+    values = pd.Series(['a', 'b', 'a'])
+    first = Pseudonymizer('key', 'patient').tokenize(values)
+    assert list(first) == list(Pseudonymizer('key', 'patient').tokenize(values))
+    assert first[0] == first[2] != first[1]
+
+
+def test_key_and_namespace_change_the_tokens():
+    values = pd.Series(['a'])
+    token = Pseudonymizer('key', 'patient').tokenize(values)[0]
+    assert token != Pseudonymizer('other key', 'patient').tokenize(values)[0]
+    assert token != Pseudonymizer('key', 'visit').tokenize(values)[0]
+
+
+def test_numbers_and_text_of_one_identifier_share_a_token():
+    tokens = Pseudonymizer('key').tokenize(pd.Series([123, 123.0, ' 123', '123'], dtype=object))
+    assert len(set(tokens)) == 1
+
+
+def test_missing_identifiers_stay_missing():
+    tokens = Pseudonymizer('key').tokenize(pd.Series(['a', None, np.nan]))
+    assert tokens[0] is not None and tokens[1] is None and tokens[2] is None
+
+
+def test_empty_key_is_rejected(monkeypatch):
+    with pytest.raises(ValueError):
+        Pseudonymizer('')
+    monkeypatch.delenv('PSEUDONYMIZATION_KEY', raising=False)
+    with pytest.raises(EnvironmentError):
+        Pseudonymizer.from_env()
+
+
+def test_one_pseudonymizer_per_namespace(monkeypatch):
+    monkeypatch.setenv('PSEUDONYMIZATION_KEY', 'key')
+    rules = {'Patient ID': {'type': 'pseudonymize', 'namespace': 'patient'},
+             'Doctor ID': {'type': 'pseudonymize'}, 'Age': {'type': 'bucket'}}
+    assert sorted(pseudonymizers_for_rules(rules)) == ['default', 'patient']
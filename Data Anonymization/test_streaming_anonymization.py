@@ -0,0 +1,52 @@
+import io
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+import streaming_anonymization
+
+RULES = {'Age': {'type': 'bucket', 'width': 10}, 'Name': {'type': 'random_string', 'length': 8}}
+
+
+def make_chunks():
+    data = pd.DataFrame({'Age': [23, 37, 41, 58, 62, 70], 'Name': list('abcdef')})
+    return [data.iloc[start:start + 2] for start in range(0, len(data), 2)]
+
+
+def test_chunk_seed_is_independent_per_chunk():
+    assert streaming_anonymization.chunk_seed(7, 3) == [7, 3]
+    assert streaming_anonymization.chunk_seed(None, 3) is None
+
+
+def test_write_csv_writes_the_header_once():
+    output = io.BytesIO()
+    assert streaming_anonymization.write_csv(make_chunks(), output) == 6
+    assert output.getvalue().decode('utf-8').splitlines() == [
+        'Age,Name', '23,a', '37,b', '41,c', '58,d', '62,e', '70,f'
+    ]
+
+
+def test_write_parquet_casts_later_chunks_to_the_first_schema():
+    pq = pytest.importorskip('pyarrow.parquet')
+    chunks = [pd.DataFrame({'a': [1.5], 'b': ['x']}), pd.DataFrame({'a': [2.0], 'b': [None]})]
+    output = io.BytesIO()
+    assert streaming_anonymization.write_parquet(chunks, output) == 2
+    output.seek(0)
+    assert pq.read_table(output).to_pydict() == {'a': [1.5, 2.0], 'b': ['x', None]}
+
+
+def test_anonymized_chunks_is_reproducible_with_a_seed():
+    first = pd.concat(streaming_anonymization.anonymized_chunks(make_chunks(), RULES, 5, 1))
+    second = pd.concat(streaming_anonymization.anonymized_chunks(make_chunks(), RULES, 5, 1))
+    pd.testing.assert_frame_equal(first, second)
+    assert first['Age'].tolist() == [20, 30, 40, 50, 60, 70]
+
+
+@pytest.mark.parametrize('start_method', multiprocessing.get_all_start_methods())
+def test_worker_pool_keeps_input_order_and_seeded_values(start_method, monkeypatch):
+    monkeypatch.setattr(streaming_anonymization, 'worker_context',
+                        lambda: multiprocessing.get_context(start_method))
+    serial = pd.concat(streaming_anonymization.anonymized_chunks(make_chunks(), RULES, 5, 1))
+    parallel = pd.concat(streaming_anonymization.anonymized_chunks(make_chunks(), RULES, 5, 2))
+    pd.testing.assert_frame_equal(serial, parallel)
@@ -0,0 +1,145 @@
+"""Differentially private mechanisms and bounded queries on NumPy arrays.
+
+Every function takes epsilon as a scalar or an array of epsilons and data as one column
+(shape (n,)) or several columns (shape (n, columns), or a DataFrame). Results broadcast as
+(epsilons, *statistic shape), so a whole epsilon sweep over all columns is one call:
+
+    dp_mean(df[['RIDAGEYR', 'INDFMPIR']], bounds=([0, 0], [80, 5]), epsilon=[0.1, 0.5, 1.0, 5.0])
+
+returns a (4, 2) array of noisy means. Missing values (NaN) are left out per column and the
+number of rows is treated as public, as in the notebook examples.
+"""
+import numpy as np
+
+
+def _rng(rng):
+    """Accept a Generator, a seed or None."""
+    return rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+
+
+def _columns(data):
+    """Data as a float (n, columns) array and whether it was a single column."""
+    values = np.asarray(data, dtype=float)
+    if values.ndim == 1:
+        return values[:, None], True
+    if values.ndim != 2:
+        raise ValueError("data must be one column (n,) or several columns (n, columns)")
+    return values, False
+
+
+def _epsilons(epsilon, statistic_ndim):
+    """Epsilons shaped to broadcast in front of a statistic with statistic_ndim dimensions."""
+    epsilon = np.asarray(epsilon, dtype=float)
+    if np.any(epsilon <= 0):
+        raise ValueError("epsilon must be positive")
+    return epsilon.reshape(epsilon.shape + (1,) * statistic_ndim)
+
+
+def _bounds(bounds, columns):
+    lower, upper = (np.broadcast_to(np.asarray(bound, dtype=float), (columns,)) for bound in bounds)
+    if np.any(lower > upper):
+        raise ValueError("lower bounds must not exceed upper bounds")
+    return lower, upper
+
+
+def laplace_mechanism(value, sensitivity, epsilon, rng=None):
+    """Add Laplace noise with scale sensitivity / epsilon; all arguments broadcast together."""
+    scale = np.asarray(sensitivity, dtype=float) / np.asarray(epsilon, dtype=float)
+    value = np.asarray(value, dtype=float)
+    return value + _rng(rng).laplace(0.0, 1.0, size=np.broadcast_shapes(value.shape, scale.shape)) * scale
+
+
+def gaussian_mechanism(value, sensitivity, epsilon, delta, rng=None):
+    """Add Gaussian noise for (epsilon, delta)-DP with the classic calibration
+    sigma = sqrt(2 ln(1.25 / delta)) * sensitivity / epsilon, which holds for epsilon < 1."""
+    if not 0 < delta < 1:
+        raise ValueError("delta must be in (0, 1)")
+    sigma = np.sqrt(2 * np.log(1.25 / delta)) * np.asarray(sensitivity, dtype=float) / np.asarray(epsilon, dtype=float)
+    value = np.asarray(value, dtype=float)
+    return value + _rng(rng).standard_normal(np.broadcast_shapes(value.shape, sigma.shape)) * sigma
+
+
+def dp_count(data, epsilon, rng=None):
+    """Noisy number of non-missing values per column (sensitivity 1)."""
+    values, single = _columns(data)
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    result = laplace_mechanism(counts, 1.0, _epsilons(epsilon, 1), rng)
+    return result[..., 0] if single else result
+
+
+def dp_sum(data, bounds, epsilon, rng=None):
+    """Noisy sum per column of the values clipped to bounds=(lower, upper)."""
+    values, single = _columns(data)
+    lower, upper = _bounds(bounds, values.shape[1])
+    sums = np.nansum(np.clip(values, lower, upper), axis=0)
+    sensitivity = np.maximum(np.abs(lower), np.abs(upper))
+    result = laplace_mechanism(sums, sensitivity, _epsilons(epsilon, 1), rng)
+    return result[..., 0] if single else result
+
+
+def dp_mean(data, bounds, epsilon, rng=None):
+    """Noisy mean per column of the values clipped to bounds=(lower, upper).
+    With the row count public the sensitivity is (upper - lower) / n."""
+    values, single = _columns(data)
+    lower, upper = _bounds(bounds, values.shape[1])
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    if np.any(counts == 0):
+        raise ValueError("every column needs at least one value")
+    means = np.nanmean(np.clip(values, lower, upper), axis=0)
+    result = laplace_mechanism(means, (upper - lower) / counts, _epsilons(epsilon, 1), rng)
+    return result[..., 0] if single else result
+
+
+def histogram_counts(data, bins, range):
+    """Exact histogram of every column over the same bins, in one bincount.
+    Returns counts of shape (columns, bins) (or (bins,) for one column) and the bin edges."""
+    values, single = _columns(data)
+    low, high = range
+    edges = np.linspace(low, high, bins + 1)
+    columns = values.shape[1]
+    # Values outside the range and missing values are not counted, like np.histogram
+    inside = ~np.isnan(values) & (values >= low) & (values <= high)
+    scaled = np.where(inside, (values - low) / (high - low) * bins, 0)
+    index = np.minimum(scaled.astype(np.int64), bins - 1)
+    offsets = index + np.arange(columns) * bins
+    counts = np.bincount(offsets[inside], minlength=columns * bins).reshape(columns, bins)
+    return (counts[0] if single else counts), edges
+
+
+def dp_histogram(data, bins, range, epsilon, rng=None):
+    """Noisy histogram per column (sensitivity 1, each row lands in one bin).
+    Returns noisy counts of shape (*epsilon shape, columns, bins) and the bin edges."""
+    counts, edges = histogram_counts(data, bins, range)
+    return laplace_mechanism(counts, 1.0, _epsilons(epsilon, counts.ndim), rng), edges
+
+
+def dp_quantile(data, q, bounds, epsilon, rng=None):
+    """Noisy q-quantile per column with the exponential mechanism over the gaps between sorted values.
+
+    The gap between the i-th and (i+1)-th sorted value has utility -|i - q n| and is chosen with
+    probability proportional to its width times exp(epsilon * utility / 2); the answer is drawn
+    uniformly from the chosen gap. All epsilons and columns are sampled at once with the Gumbel-max trick.
+    """
+    if not 0 <= q <= 1:
+        raise ValueError("q must be in [0, 1]")
+    values, single = _columns(data)
+    lower, upper = _bounds(bounds, values.shape[1])
+    rng = _rng(rng)
+    # NaNs sort last, so each column's n values come first and the gaps past n are masked out
+    ordered = np.sort(np.clip(values, lower, upper), axis=0)
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    points = np.concatenate([lower[None, :], ordered, upper[None, :]], axis=0)
+    points = np.where(np.isnan(points), upper, points)
+    widths = np.diff(points, axis=0)
+    rank = np.arange(len(widths))[:, None]
+    utility = -np.abs(rank - q * counts)
+    with np.errstate(divide='ignore'):
+        log_widths = np.where(rank <= counts, np.log(widths), -np.inf)
+    eps = _epsilons(epsilon, 2)
+    scores = log_widths + eps * utility / 2
+    chosen = np.argmax(scores + rng.gumbel(size=scores.shape), axis=-2)
+    columns = np.arange(values.shape[1])
+    start = points[chosen, columns]
+    end = points[chosen + 1, columns]
+    result = start + (end - start) * rng.random(start.shape)
+    return result[..., 0] if single else result
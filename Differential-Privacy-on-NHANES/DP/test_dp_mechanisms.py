@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import dp_mechanisms
+
+
+def test_laplace_noise_has_scale_sensitivity_over_epsilon():
+    noise = dp_mechanisms.laplace_mechanism(np.zeros(200000), sensitivity=2.0, epsilon=0.5, rng=0)
+    # The mean absolute deviation of Laplace(0, b) is b
+    assert np.mean(np.abs(noise)) == pytest.approx(4.0, rel=0.02)
+    assert np.median(noise) == pytest.approx(0.0, abs=0.05)
+
+
+def test_gaussian_noise_has_the_classic_sigma():
+    noise = dp_mechanisms.gaussian_mechanism(np.zeros(200000), sensitivity=1.0, epsilon=0.5, delta=1e-5, rng=0)
+    assert np.std(noise) == pytest.approx(np.sqrt(2 * np.log(1.25 / 1e-5)) / 0.5, rel=0.02)
+
+
+def test_noise_scale_broadcasts_over_epsilons():
+    noise = dp_mechanisms.laplace_mechanism(np.zeros(100000), 1.0, np.array([[0.1], [10.0]]), rng=0)
+    assert np.mean(np.abs(noise), axis=1) == pytest.approx([10.0, 0.1], rel=0.02)
+
+
+def test_dp_mean_sweep_shape_and_sensitivity():
+    data = np.column_stack([np.arange(1000) % 80, np.full(1000, 2.5)])
+    means = dp_mechanisms.dp_mean(data, bounds=([0, 0], [80, 5]), epsilon=[0.1, 0.5, 1.0, 5.0], rng=0)
+    assert means.shape == (4, 2)
+    # Sensitivity 80 / 1000 at epsilon 5 is noise of scale 0.016
+    assert means[-1] == pytest.approx([np.mean(data[:, 0]), 2.5], abs=0.2)
+
+
+def test_dp_sum_and_count_clip_and_skip_missing_values():
+    data = np.array([1.0, 5.0, np.nan, -3.0])
+    assert dp_mechanisms.dp_sum(data, (0, 2), epsilon=1e9, rng=0) == pytest.approx(3.0, abs=1e-6)
+    assert dp_mechanisms.dp_count(data, epsilon=1e9, rng=0) == pytest.approx(3.0, abs=1e-6)
+
+
+def test_histogram_counts_match_numpy_per_column():
+    data = np.random.default_rng(0).uniform(-1, 11, size=(500, 3))
+    data[::7, 1] = np.nan
+    counts, edges = dp_mechanisms.histogram_counts(data, bins=10, range=(0, 10))
+    for column in range(3):
+        values = data[:, column]
+        expected, expected_edges = np.histogram(values[~np.isnan(values)], bins=10, range=(0, 10))
+        assert counts[column].tolist() == expected.tolist()
+    assert edges == pytest.approx(expected_edges)
+
+
+def test_dp_histogram_shape():
+    noisy, _ = dp_mechanisms.dp_histogram(np.zeros((10, 2)), bins=5, range=(0, 1), epsilon=[1.0, 2.0, 3.0], rng=0)
+    assert noisy.shape == (3, 2, 5)
+
+
+def test_dp_quantile_stays_within_bounds():
+    data = np.random.default_rng(0).normal(50, 20, size=(300, 2))
+    results = dp_mechanisms.dp_quantile(data, 0.5, bounds=(0, 100), epsilon=np.full(200, 0.01), rng=1)
+    assert results.shape == (200, 2)
+    assert np.all((results >= 0) & (results <= 100))
+
+
+def test_dp_quantile_with_large_epsilon_is_close_to_the_quantile():
+    data = np.random.default_rng(0).uniform(0, 100, size=1001)
+    data[::10] = np.nan
+    values = data[~np.isnan(data)]
+    for q in (0.1, 0.5, 0.9):
+        result = dp_mechanisms.dp_quantile(data, q, bounds=(0, 100), epsilon=[50.0] * 20, rng=2)
+        assert np.all(np.abs(result - np.quantile(values, q)) < 2.0)
+
+
+def test_dp_quantile_is_spread_over_the_bounds_at_tiny_epsilon():
+    # With epsilon near zero the answer is close to uniform over the bounds
+    results = dp_mechanisms.dp_quantile(np.array([1.0, 2.0, 3.0]), 0.5, bounds=(0, 100), epsilon=np.full(5000, 1e-6), rng=3)
+    assert np.mean(results) == pytest.approx(50.0, abs=2.0)
+
+
+@pytest.mark.parametrize('call', [
+    lambda: dp_mechanisms.dp_count(np.ones(3), epsilon=0),
+    lambda: dp_mechanisms.dp_sum(np.ones(3), (2, 1), epsilon=1),
+    lambda: dp_mechanisms.dp_quantile(np.ones(3), 1.5, (0, 1), epsilon=1),
+    lambda: dp_mechanisms.gaussian_mechanism(0.0, 1.0, 1.0, delta=1.0),
+])
+def test_invalid_arguments_are_rejected(call):
+    with pytest.raises(ValueError):
+        call()
@@ -1,7 +1,10 @@
 from flask import Flask
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel
+from pymongo.errors import OperationFailure
 import os
 import logging
+from app.query_stats import QueryStatsListener
+from app.document_cache import DocumentCache, LocalCache, shared_cache
 
 # Configure logging
 log_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.log')
@@ -18,14 +21,49 @@ app = Flask(__name__)
 # Load configuration
 app.config.from_object('config.Config')
 
+# Timings of every query shape, reported by /admin/query-stats
+query_stats = QueryStatsListener(slow_ms=app.config['SLOW_QUERY_MS'])
+
+# Read-through cache of single documents, reported by /admin/cache-stats
+document_cache = DocumentCache(
+    LocalCache(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_TTL_SECONDS']),
+    shared_cache(app.config['CACHE_SHARED_URL'], app.config['CACHE_SHARED_TTL_SECONDS'],
+                 app.config['CACHE_TOMBSTONE_SECONDS'])
+)
+
+def index_models(specs):
+    models = []
+    for spec in specs:
+        options = {key: value for key, value in spec.items() if key != 'keys'}
+        models.append(IndexModel([(field, direction) for field, direction in spec['keys']], **options))
+    return models
+
+def apply_indexes(collection, specs, drop_undeclared=False):
+    """Create the declared indexes; existing identical ones are left as they are."""
+    models = index_models(specs)
+    declared = {model.document['name'] for model in models}
+    for model in models:
+        try:
+            collection.create_indexes([model])
+        except OperationFailure as e:
+            # An index of the same name with other options is not replaced automatically
+            logger.error("Failed to create index {}: {}".format(model.document['name'], e))
+    if drop_undeclared:
+        for name in collection.index_information():
+            if name != '_id_' and name not in declared:
+                collection.drop_index(name)
+                logger.info("Dropped undeclared index {}".format(name))
+    logger.info("Indexes on {}: {}".format(collection.name, sorted(collection.index_information())))
+
 # MongoDB connection setup
 try:
-    client = MongoClient(app.config['MONGO_URI'])
+    client = MongoClient(app.config['MONGO_URI'], event_listeners=[query_stats], **app.config['MONGO_CLIENT_OPTIONS'])
     db = client[app.config['DB_NAME']]
     logger.info("Connected to MongoDB successfully!")
+    apply_indexes(db[app.config['COLLECTION_NAME']], app.config['INDEXES'], app.config['DROP_UNDECLARED_INDEXES'])
 except Exception as e:
     logger.error("Failed to connect to MongoDB: {}".format(e))
     raise
 
 # Import controllers to register routes
-from app.controllers import document_controller
\ No newline at end of file
+from app.controllers import document_controller, admin_controller
\ No newline at end of file
@@ -0,0 +1,74 @@
+import json
+from functools import wraps
+from flask import request, jsonify, Response
+from app import app, client, query_stats, document_cache
+
+def require_admin(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config['ADMIN_TOKEN']
+        if not token:
+            return jsonify({"error": "Admin endpoints are disabled, set ADMIN_TOKEN to enable them"}), 404
+        if request.headers.get('X-Admin-Token') != token:
+            return jsonify({"error": "Invalid admin token"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def plan_stages(plan):
+    """Stage names of a query plan tree, from the root down, e.g. ['LIMIT', 'FETCH', 'IXSCAN']."""
+    stages = [plan.get('stage')]
+    children = plan.get('inputStages') or ([plan['inputStage']] if 'inputStage' in plan else [])
+    for child in children:
+        stages.extend(plan_stages(child))
+    return stages
+
+def winning_plan(explain):
+    planner = explain.get('queryPlanner') or explain.get('stages', [{}])[0].get('$cursor', {}).get('queryPlanner', {})
+    plan = planner.get('winningPlan', {})
+    # Newer servers wrap the plan in queryPlan
+    return plan.get('queryPlan', plan)
+
+@app.route('/admin/query-stats', methods=['GET'])
+@require_admin
+def get_query_stats():
+    return jsonify(query_stats.report()), 200
+
+@app.route('/admin/query-stats', methods=['DELETE'])
+@require_admin
+def reset_query_stats():
+    query_stats.reset()
+    return jsonify({"message": "Query stats reset"}), 200
+
+@app.route('/admin/cache-stats', methods=['GET'])
+@require_admin
+def get_cache_stats():
+    return jsonify(document_cache.report()), 200
+
+@app.route('/admin/cache-stats', methods=['DELETE'])
+@require_admin
+def reset_cache_stats():
+    document_cache.reset()
+    return jsonify({"message": "Cache stats reset"}), 200
+
+@app.route('/admin/explain', methods=['GET'])
+@require_admin
+def explain_queries():
+    """Explain the last slow query of every shape the API has run, flagging collection scans."""
+    reports = []
+    for shape, database, command in query_stats.samples():
+        try:
+            explain = client[database].command({'explain': command, 'verbosity': 'queryPlanner'})
+            plan = winning_plan(explain)
+            stages = plan_stages(plan) if plan else []
+            reports.append({
+                "shape": shape,
+                "stages": stages,
+                "collection_scan": 'COLLSCAN' in stages,
+                "winning_plan": plan,
+            })
+        except Exception as e:
+            reports.append({"shape": shape, "error": str(e)})
+    # Collection scans first, they are the ones to fix
+    reports.sort(key=lambda report: not report.get("collection_scan", False))
+    # Plans hold BSON values that jsonify does not know
+    return Response(json.dumps(reports, default=str), mimetype='application/json'), 200
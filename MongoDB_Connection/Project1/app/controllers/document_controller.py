@@ -1,7 +1,13 @@
-from flask import request, jsonify
+import json
+from flask import request, jsonify, Response, stream_with_context
 from bson import ObjectId
 from app import app
-from app.models.document_model import DocumentModel
+from app.models.document_model import DocumentModel, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Query parameters of GET /documents that are not field filters
+LIST_PARAMETERS = {'limit', 'after', 'fields', 'format'}
+# Comparison suffixes for filters, e.g. ?amount__gte=100
+FILTER_OPERATORS = {'gt': '$gt', 'gte': '$gte', 'lt': '$lt', 'lte': '$lte', 'ne': '$ne'}
 
 def validate_document(data):
     # Modify this validation logic as needed based on your team requirements
@@ -24,6 +30,72 @@ def insert_document():
     document_id = DocumentModel.insert_document(data)
     return jsonify({"message": "Document inserted successfully!", "id": document_id}), 201
 
+def bulk_batch_size():
+    """Batch size of a bulk request: ?batch_size= if given, else BULK_BATCH_SIZE from the config."""
+    batch_size = request.args.get('batch_size', app.config['BULK_BATCH_SIZE'])
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        batch_size = 0
+    return batch_size if batch_size > 0 else None
+
+def is_document_id(value):
+    # Only strings: str() of a 12 digit number passes ObjectId.is_valid, but ObjectId() rejects the number
+    return isinstance(value, str) and ObjectId.is_valid(value)
+
+def bulk_status(errors, success=200):
+    # 207 Multi-Status when only some of the items went through
+    return 207 if errors else success
+
+@app.route('/documents/bulk', methods=['POST'])
+def insert_documents():
+    data = request.json
+    batch_size = bulk_batch_size()
+    if not isinstance(data, list) or batch_size is None:
+        return jsonify({"error": "Expected a JSON array of documents and a positive batch_size"}), 400
+    # Invalid items are reported by index, the valid ones are still inserted
+    errors = [{"index": index, "error": "Invalid document data"}
+              for index, document in enumerate(data) if not isinstance(document, dict) or not validate_document(document)]
+    invalid = {error["index"] for error in errors}
+    documents = [(index, document) for index, document in enumerate(data) if index not in invalid]
+    ids, write_errors = DocumentModel.insert_documents(documents, batch_size)
+    errors = sorted(errors + write_errors, key=lambda error: error["index"])
+    return jsonify({"inserted": len(ids), "ids": {str(index): document_id for index, document_id in ids.items()},
+                    "errors": errors}), bulk_status(errors, success=201)
+
+@app.route('/documents/bulk', methods=['PUT'])
+def update_documents():
+    data = request.json
+    batch_size = bulk_batch_size()
+    if not isinstance(data, list) or batch_size is None:
+        return jsonify({"error": "Expected a JSON array of {\"id\": ..., \"data\": {...}} and a positive batch_size"}), 400
+    errors, updates = [], []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict) or not is_document_id(item.get('id')):
+            errors.append({"index": index, "error": "Invalid document ID"})
+        elif not isinstance(item.get('data'), dict) or not validate_document(item['data']):
+            errors.append({"index": index, "error": "Invalid document data"})
+        else:
+            updates.append((index, item['id'], item['data']))
+    matched, modified, write_errors = DocumentModel.update_documents(updates, batch_size)
+    errors = sorted(errors + write_errors, key=lambda error: error["index"])
+    return jsonify({"matched": matched, "modified": modified, "errors": errors}), bulk_status(errors)
+
+@app.route('/documents/bulk', methods=['DELETE'])
+def delete_documents():
+    data = request.json
+    batch_size = bulk_batch_size()
+    if not isinstance(data, list) or batch_size is None:
+        return jsonify({"error": "Expected a JSON array of document IDs and a positive batch_size"}), 400
+    errors = [{"index": index, "error": "Invalid document ID"}
+              for index, document_id in enumerate(data) if not is_document_id(document_id)]
+    invalid = {error["index"] for error in errors}
+    document_ids = [(index, document_id) for index, document_id in enumerate(data) if index not in invalid]
+    deleted, missing = DocumentModel.delete_documents(document_ids, batch_size)
+    errors = sorted(errors + [{"index": index, "error": "Document not found"} for index in missing],
+                    key=lambda error: error["index"])
+    return jsonify({"deleted": deleted, "errors": errors}), bulk_status(errors)
+
 @app.route('/documents/<document_id>', methods=['PUT'])
 def update_document(document_id):
     data = request.json
@@ -47,13 +119,70 @@ def delete_document(document_id):
 def get_document_by_id(document_id):
     if not ObjectId.is_valid(document_id):
         return jsonify({"error": "Invalid document ID"}), 400
-    document = DocumentModel.get_document_by_id(document_id)
+    document, etag = DocumentModel.get_document_by_id(document_id)
     if document:
-        return jsonify(document), 200
+        response = jsonify(document)
+        response.set_etag(etag)
+        # Clients may keep the document but revalidate it, a matching If-None-Match gets a 304
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     else:
         return jsonify({"error": "Document not found"}), 404
 
+def parse_number(value):
+    """The value as an int or float if it is one, else None."""
+    for number_type in (int, float):
+        try:
+            return number_type(value)
+        except ValueError:
+            pass
+    return None
+
+def parse_filters(args):
+    """Field filters from the query string: ?region=West is an equality filter and
+    ?amount__gte=100 a comparison. Query strings carry no types, so a number also matches as a string."""
+    filters = {}
+    for name, value in args.items():
+        if name in LIST_PARAMETERS:
+            continue
+        field, _, operator = name.rpartition('__')
+        if not field or operator not in FILTER_OPERATORS:
+            field, operator = name, None
+        if field == '_id' or field.startswith('$'):
+            raise ValueError(f"Cannot filter on '{field}'")
+        number = parse_number(value)
+        if operator is None:
+            filters[field] = {'$in': [value, number]} if number is not None else value
+        else:
+            filters.setdefault(field, {})[FILTER_OPERATORS[operator]] = number if number is not None else value
+    return filters
+
 @app.route('/documents', methods=['GET'])
 def get_all_documents():
-    documents = DocumentModel.get_all_documents()
-    return jsonify(documents), 200
\ No newline at end of file
+    try:
+        filters = parse_filters(request.args)
+        fields = [field for field in request.args.get('fields', '').split(',') if field] or None
+        after = request.args.get('after')
+        if after is not None and not ObjectId.is_valid(after):
+            raise ValueError("Invalid cursor")
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be positive")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # NDJSON streams the whole result from the cursor, one document per line
+    if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        documents = DocumentModel.stream_documents(filters, fields, after=after, limit=limit)
+        lines = (json.dumps(document, default=str) + '\n' for document in documents)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    documents, next_cursor = DocumentModel.find_documents(
+        filters, fields, limit=min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE), after=after
+    )
+    response = jsonify(documents)
+    if next_cursor:
+        # Pass back as ?after= for the next page
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
\ No newline at end of file
@@ -0,0 +1,29 @@
+import pytest
+
+from app.controllers.document_controller import parse_filters
+
+
+def test_equality_filter_on_text():
+    assert parse_filters({'region': 'West'}) == {'region': 'West'}
+
+
+def test_equality_filter_on_a_number_also_matches_the_string():
+    assert parse_filters({'amount': '100'}) == {'amount': {'$in': ['100', 100]}}
+
+
+def test_comparisons_on_one_field_are_combined():
+    assert parse_filters({'amount__gte': '100', 'amount__lt': '2.5'}) == {'amount': {'$gte': 100, '$lt': 2.5}}
+
+
+def test_unknown_suffix_is_part_of_the_field_name():
+    assert parse_filters({'first__name': 'Ann'}) == {'first__name': 'Ann'}
+
+
+def test_list_parameters_are_not_filters():
+    assert parse_filters({'limit': '10', 'after': 'x', 'fields': 'a', 'format': 'ndjson'}) == {}
+
+
+@pytest.mark.parametrize('name', ['_id', '$where', '_id__ne'])
+def test_reserved_fields_are_rejected(name):
+    with pytest.raises(ValueError, match='Cannot filter on'):
+        parse_filters({name: '1'})
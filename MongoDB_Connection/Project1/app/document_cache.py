@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import bson
+
+logger = logging.getLogger(__name__)
+
+
+def document_etag(document):
+    """Hash of the document's BSON, the same for every worker and for the Motor read path."""
+    return hashlib.sha1(bson.encode(document)).hexdigest()
+
+
+def encode_entry(document, etag):
+    # BSON keeps dates, ObjectIds and decimals as they are, unlike JSON
+    return bson.encode({'etag': etag, 'document': document})
+
+
+def decode_entry(data):
+    entry = bson.decode(data)
+    return entry['document'], entry['etag']
+
+
+class LocalCache:
+    """In-process LRU of at most max_entries, every entry expiring ttl seconds after it was stored."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Value of a shared entry that was invalidated; fills are refused while it lasts
+TOMBSTONE = b''
+
+
+class RedisCache:
+    """Shared cache in Redis, e.g. redis://localhost:6379/0."""
+
+    def __init__(self, url, ttl, tombstone_ttl):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+
+    def get(self, key):
+        return self.client.get(f"document:{key}")
+
+    def add(self, key, value):
+        """Store the value unless the key holds an entry or a tombstone (SET NX)."""
+        self.client.set(f"document:{key}", value, ex=self.ttl, nx=True)
+
+    def invalidate(self, keys):
+        """Replace the entries with tombstones, so fills that loaded the old documents are refused."""
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.set(f"document:{key}", TOMBSTONE, ex=self.tombstone_ttl)
+            pipeline.execute()
+
+
+class SqliteCache:
+    """Local stand-in for the shared cache: a SQLite file that all worker processes on one host share,
+    e.g. sqlite:////tmp/document_cache.db. Expired rows are removed every prune_every stores."""
+
+    def __init__(self, path, ttl, tombstone_ttl, prune_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.prune_every = prune_every
+        self.stores = 0
+        with self._connect() as connection:
+            # WAL lets the workers read while one of them writes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def get(self, key):
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM documents WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def add(self, key, value):
+        """Store the value unless the key holds an unexpired entry or tombstone."""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO documents (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+                'WHERE documents.expires_at <= ?',
+                (key, value, now + self.ttl, now)
+            )
+            self.stores += 1
+            if self.stores % self.prune_every == 0:
+                connection.execute('DELETE FROM documents WHERE expires_at <= ?', (now,))
+
+    def invalidate(self, keys):
+        """Replace the entries with tombstones, so fills that loaded the old documents are refused."""
+        expires_at = time.time() + self.tombstone_ttl
+        with self._connect() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO documents (key, value, expires_at) VALUES (?, ?, ?)',
+                [(key, TOMBSTONE, expires_at) for key in keys]
+            )
+
+
+def shared_cache(url, ttl, tombstone_ttl):
+    """The shared cache for CACHE_SHARED_URL: redis://... or sqlite:///<path>, None without a URL."""
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisCache(url, ttl, tombstone_ttl)
+    if url.startswith('sqlite:///'):
+        return SqliteCache(url[len('sqlite:///'):], ttl, tombstone_ttl)
+    raise ValueError(f"Unsupported CACHE_SHARED_URL '{url}', use redis://... or sqlite:///<path>")
+
+
+class DocumentCache:
+    """Read-through cache of single documents with their ETags: the local LRU first, then the
+    shared cache, then MongoDB. Writes through the model invalidate both caches, but only the
+    local cache of this process, so the local TTL bounds how stale other workers can be.
+    A shared cache that fails is logged and skipped, reads then go to MongoDB.
+
+    Invalidation leaves a tombstone in the shared cache and fills only store into an empty key,
+    so a worker that loaded a document before another worker changed it cannot put the old
+    version back. A load that outlasts the tombstone (CACHE_TOMBSTONE_SECONDS) still can, until
+    the shared TTL ends, which is why the tombstone lasts longer than the socket timeout."""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self.lock = threading.Lock()
+        # Bumped by every invalidation; a load that overlaps one is not cached, it may be stale
+        self.generation = 0
+        self.stats = {}
+        self.reset()
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def _set_local(self, key, entry, generation):
+        """Store the entry unless an invalidation happened since generation; checked and stored
+        under the lock, so an invalidation cannot slip in between. Returns whether it was stored."""
+        with self.lock:
+            if generation != self.generation:
+                return False
+            self.local.set(key, entry)
+            return True
+
+    def _local_get(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count('local_hits')
+        return entry
+
+    def _shared_get(self, key, generation):
+        """The entry of key in the shared cache, also stored locally, or None."""
+        try:
+            data = self.shared.get(key)
+        except Exception as e:
+            self._count('shared_errors')
+            logger.warning(f"Shared cache read failed: {e}")
+            return None
+        if not data:
+            return None
+        self._count('shared_hits')
+        entry = decode_entry(data)
+        self._set_local(key, entry, generation)
+        return entry
+
+    def _store(self, key, document, generation):
+        """Cache a loaded document unless an invalidation happened since generation; returns its entry."""
+        entry = (document, document_etag(document))
+        if self._set_local(key, entry, generation) and self.shared is not None:
+            try:
+                self.shared.add(key, encode_entry(*entry))
+            except Exception as e:
+                self._count('shared_errors')
+                logger.warning(f"Shared cache write failed: {e}")
+        return entry
+
+    def get_or_load(self, key, load):
+        """The (document, etag) of key, from a cache or from load(), which returns the document or None."""
+        entry = self._local_get(key)
+        if entry is not None:
+            return entry
+        generation = self.generation
+        if self.shared is not None:
+            entry = self._shared_get(key, generation)
+            if entry is not None:
+                return entry
+        self._count('misses')
+        document = load()
+        if document is None:
+            return None, None
+        return self._store(key, document, generation)
+
+    async def get_or_load_async(self, key, load):
+        """get_or_load for the event loop: load is a coroutine function, and the shared cache,
+        which blocks, is read and written on a thread."""
+        entry = self._local_get(key)
+        if entry is not None:
+            return entry
+        generation = self.generation
+        if self.shared is not None:
+            entry = await asyncio.to_thread(self._shared_get, key, generation)
+            if entry is not None:
+                return entry
+        self._count('misses')
+        document = await load()
+        if document is None:
+            return None, None
+        if self.shared is not None:
+            return await asyncio.to_thread(self._store, key, document, generation)
+        return self._store(key, document, generation)
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        if not keys:
+            return
+        with self.lock:
+            self.generation += 1
+            self.stats['invalidations'] += len(keys)
+            self.local.delete(keys)
+        if self.shared is not None:
+            try:
+                self.shared.invalidate(keys)
+            except Exception as e:
+                self._count('shared_errors')
+                # Other workers may serve the old documents until the shared TTL ends
+                logger.error(f"Shared cache invalidation failed: {e}")
+
+    def report(self):
+        with self.lock:
+            stats = dict(self.stats)
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        stats['hit_ratio'] = hits / lookups if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        stats['shared'] = type(self.shared).__name__ if self.shared is not None else None
+        return stats
+
+    def reset(self):
+        with self.lock:
+            self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0, 'shared_errors': 0}
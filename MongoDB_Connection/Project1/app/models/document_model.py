@@ -1,19 +1,79 @@
 from bson.objectid import ObjectId
-from app import db 
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app import app, db, document_cache
 # Get the collection name from environment variables
-collection_name = "sales"
+collection_name = app.config['COLLECTION_NAME']
+
+# Page size limits for GET /documents and the cursor batch size when streaming
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+def build_projection(fields):
+    """Projection of the requested fields; _id is always read for the keyset cursor."""
+    if not fields:
+        return None
+    projection = {field: 1 for field in fields}
+    projection['_id'] = 1
+    return projection
+
+def batches(items, batch_size):
+    """Split (index, item) pairs into lists of at most batch_size."""
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+def bulk_errors(error, batch):
+    """Per item errors of an unordered bulk write, keyed back to the request index of each item."""
+    return [{"index": batch[write_error['index']][0], "error": write_error.get('errmsg', 'Write failed')}
+            for write_error in error.details.get('writeErrors', [])]
+
+def build_query(filters, after=None):
+    """Add the keyset condition to the filters: only documents after the cursor _id."""
+    query = dict(filters)
+    if after is not None:
+        query['_id'] = {'$gt': ObjectId(after)}
+    return query
 
 class DocumentModel:
     @staticmethod
-    def get_all_documents():
-        # Access the collection using the name from environment variables
+    def find_documents(filters=None, fields=None, limit=DEFAULT_PAGE_SIZE, after=None):
+        """Return one page of documents in _id order and the cursor of the next page, or None on the last page."""
         collection = db[collection_name]
-        return list(collection.find({}, {'_id': 0}))
+        # One extra document tells whether another page follows, without an empty last page
+        cursor = collection.find(build_query(filters or {}, after), build_projection(fields)) \
+            .sort('_id', 1).limit(limit + 1)
+        documents = list(cursor)
+        next_cursor = str(documents[limit - 1]['_id']) if len(documents) > limit else None
+        documents = documents[:limit]
+        for document in documents:
+            del document['_id']
+        return documents, next_cursor
+
+    @staticmethod
+    def stream_documents(filters=None, fields=None, after=None, limit=None, batch_size=STREAM_BATCH_SIZE):
+        """Yield documents in _id order straight from the cursor, batch_size documents per round trip."""
+        collection = db[collection_name]
+        # The stream needs no cursor, so _id is left out like in the single document responses
+        projection = {field: 1 for field in fields or []}
+        projection['_id'] = 0
+        cursor = collection.find(build_query(filters or {}, after), projection, batch_size=batch_size) \
+            .sort('_id', 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        try:
+            for document in cursor:
+                yield document
+        finally:
+            cursor.close()
 
     @staticmethod
     def get_document_by_id(document_id):
+        """Return the document and its ETag through the cache, or (None, None) if there is none.
+        Cached documents are shared between requests and must not be modified."""
         collection = db[collection_name]
-        return collection.find_one({"_id": ObjectId(document_id)}, {'_id': 0})
+        object_id = ObjectId(document_id)
+        return document_cache.get_or_load(str(object_id), lambda: collection.find_one({"_id": object_id}, {'_id': 0}))
 
     @staticmethod
     def insert_document(data):
@@ -25,10 +85,70 @@ class DocumentModel:
     def update_document(document_id, data):
         collection = db[collection_name]
         result = collection.update_one({"_id": ObjectId(document_id)}, {"$set": data})
+        document_cache.invalidate([str(ObjectId(document_id))])
         return result.modified_count
 
     @staticmethod
     def delete_document(document_id):
         collection = db[collection_name]
         result = collection.delete_one({"_id": ObjectId(document_id)})
+        document_cache.invalidate([str(ObjectId(document_id))])
         return result.deleted_count
+
+    @staticmethod
+    def insert_documents(documents, batch_size):
+        """Insert (index, document) pairs with unordered insert_many calls, so one bad document
+        does not stop the rest. Returns the ids by request index and the per item errors."""
+        collection = db[collection_name]
+        ids, errors = {}, []
+        for batch in batches(documents, batch_size):
+            try:
+                collection.insert_many([document for _, document in batch], ordered=False)
+            except BulkWriteError as e:
+                errors.extend(bulk_errors(e, batch))
+            # insert_many sets _id on every document before sending it
+            failed = {error["index"] for error in errors}
+            ids.update((index, str(document['_id'])) for index, document in batch if index not in failed)
+        return ids, errors
+
+    @staticmethod
+    def update_documents(updates, batch_size):
+        """Apply (index, document_id, data) updates with unordered bulk_write calls.
+        Returns the matched and modified counts and the per item errors, including documents that were not found."""
+        collection = db[collection_name]
+        matched, modified, errors = 0, 0, []
+        for batch in batches(updates, batch_size):
+            object_ids = [ObjectId(document_id) for _, document_id, _ in batch]
+            # Looked up first, like deletes, as bulk_write only counts the updates that matched nothing
+            existing = {document['_id'] for document in collection.find({"_id": {"$in": object_ids}}, {'_id': 1})}
+            errors.extend({"index": index, "error": "Document not found"}
+                          for (index, _, _), object_id in zip(batch, object_ids) if object_id not in existing)
+            found = [(index, object_id, data) for (index, _, data), object_id in zip(batch, object_ids) if object_id in existing]
+            if not found:
+                continue
+            operations = [UpdateOne({"_id": object_id}, {"$set": data}) for _, object_id, data in found]
+            try:
+                result = collection.bulk_write(operations, ordered=False)
+                matched += result.matched_count
+                modified += result.modified_count
+            except BulkWriteError as e:
+                matched += e.details.get('nMatched', 0)
+                modified += e.details.get('nModified', 0)
+                errors.extend(bulk_errors(e, found))
+            finally:
+                document_cache.invalidate(str(object_id) for _, object_id, _ in found)
+        return matched, modified, errors
+
+    @staticmethod
+    def delete_documents(document_ids, batch_size):
+        """Delete (index, document_id) pairs, one delete_many per batch.
+        Returns the deleted count and the request indexes of documents that were not found."""
+        collection = db[collection_name]
+        deleted, missing = 0, []
+        for batch in batches(document_ids, batch_size):
+            object_ids = [ObjectId(document_id) for _, document_id in batch]
+            existing = {document['_id'] for document in collection.find({"_id": {"$in": object_ids}}, {'_id': 1})}
+            missing.extend(index for (index, _), object_id in zip(batch, object_ids) if object_id not in existing)
+            deleted += collection.delete_many({"_id": {"$in": list(existing)}}).deleted_count
+            document_cache.invalidate(str(object_id) for object_id in existing)
+        return deleted, missing
@@ -0,0 +1,124 @@
+import logging
+import threading
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Commands whose plans can be explained
+QUERY_COMMANDS = ('find', 'aggregate', 'count', 'distinct', 'delete', 'update', 'findAndModify')
+# Fields of each command that explain needs, the rest (documents, driver fields) is not kept
+EXPLAIN_FIELDS = {
+    'find': ('filter', 'sort', 'projection', 'hint'),
+    'aggregate': ('pipeline', 'hint'),
+    'count': ('query', 'hint'),
+    'distinct': ('key', 'query'),
+    'findAndModify': ('query', 'sort', 'fields', 'update', 'remove'),
+}
+
+
+def shape_of(value):
+    """The structure of a filter without its values, e.g. {'amount': {'$gte': '?'}, 'region': '?'}."""
+    if isinstance(value, dict):
+        return {key: shape_of(item) if key.startswith('$') or isinstance(item, dict) else '?'
+                for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [shape_of(item) for item in value[:1]]
+    return '?'
+
+
+def explain_sample(command_name, command):
+    """The parts of a command that explain needs: namespace, filter, sort and projection.
+    Of updates and deletes only the first statement is kept. Values are referenced, not copied."""
+    sample = {command_name: command.get(command_name)}
+    if command_name in ('update', 'delete'):
+        key = 'updates' if command_name == 'update' else 'deletes'
+        sample[key] = command.get(key, [])[:1]
+    else:
+        sample.update((field, command[field]) for field in EXPLAIN_FIELDS[command_name] if field in command)
+        if command_name == 'aggregate':
+            sample['cursor'] = {}
+    return sample
+
+
+def query_shape(command_name, command):
+    """A readable key for all commands that differ only in their values."""
+    collection = command.get(command_name)
+    if command_name == 'find':
+        parts = [f"filter={shape_of(command.get('filter', {}))}"]
+        if command.get('sort'):
+            parts.append(f"sort={dict(command['sort'])}")
+        if command.get('projection'):
+            parts.append(f"projection={sorted(command['projection'])}")
+    elif command_name == 'aggregate':
+        parts = [f"pipeline={[next(iter(stage)) for stage in command.get('pipeline', [])]}"]
+    elif command_name in ('update', 'delete'):
+        key = 'updates' if command_name == 'update' else 'deletes'
+        statements = command.get(key, [])
+        parts = [f"q={shape_of(statements[0].get('q', {}))}" if statements else 'q={}']
+    else:
+        parts = [f"query={shape_of(command.get('query', {}))}"]
+    return f"{command_name} {collection} " + ' '.join(parts)
+
+
+class QueryStatsListener(monitoring.CommandListener):
+    """Collects timings per query shape from the driver's command events and logs slow queries.
+    The last slow query of every shape is kept, with its values, so its plan can be explained."""
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.stats = {}
+
+    def started(self, event):
+        if event.command_name not in QUERY_COMMANDS:
+            return
+        command = event.command
+        entry = (query_shape(event.command_name, command), explain_sample(event.command_name, command))
+        with self.lock:
+            self.in_flight[event.request_id] = entry
+
+    def _finished(self, event, failed):
+        with self.lock:
+            entry = self.in_flight.pop(event.request_id, None)
+            if entry is None:
+                return
+            shape, sample = entry
+            duration_ms = event.duration_micros / 1000
+            stats = self.stats.setdefault(shape, {
+                'shape': shape, 'command_name': event.command_name, 'database': event.database_name,
+                'count': 0, 'failed': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            })
+            stats['count'] += 1
+            stats['failed'] += failed
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            if duration_ms >= self.slow_ms:
+                stats['slow'] += 1
+                stats['sample'] = sample
+        if duration_ms >= self.slow_ms:
+            logger.warning(f"Slow query ({duration_ms:.1f} ms): {shape}")
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def report(self):
+        """Stats per shape, the most total time first, without the sample commands."""
+        with self.lock:
+            rows = [{key: value for key, value in stats.items() if key != 'sample'} for stats in self.stats.values()]
+        for row in rows:
+            row['avg_ms'] = row['total_ms'] / row['count']
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def samples(self):
+        """(shape, database, command) of the last slow query of every shape that had one."""
+        with self.lock:
+            return [(stats['shape'], stats['database'], stats['sample']) for stats in self.stats.values() if 'sample' in stats]
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+
+from app.document_cache import DocumentCache, LocalCache, SqliteCache, TOMBSTONE, encode_entry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SqliteCache(str(tmp_path / 'cache.db'), ttl=60, tombstone_ttl=35)
+
+
+def test_local_entries_expire_after_the_ttl(clock):
+    local = LocalCache(max_entries=10, ttl=5)
+    local.set('a', 1)
+    clock.now += 4.9
+    assert local.get('a') == 1
+    clock.now += 0.2
+    assert local.get('a') is None
+    assert len(local) == 0
+
+
+def test_local_cache_evicts_the_least_recently_used(clock):
+    local = LocalCache(max_entries=2, ttl=5)
+    local.set('a', 1)
+    local.set('b', 2)
+    local.get('a')
+    local.set('c', 3)
+    assert (local.get('a'), local.get('b'), local.get('c')) == (1, None, 3)
+
+
+def test_sqlite_fill_does_not_replace_an_entry(sqlite_cache, clock):
+    sqlite_cache.add('a', b'old')
+    sqlite_cache.add('a', b'new')
+    assert sqlite_cache.get('a') == b'old'
+
+
+def test_sqlite_tombstone_refuses_fills_until_it_expires(sqlite_cache, clock):
+    sqlite_cache.add('a', b'old')
+    sqlite_cache.invalidate(['a'])
+    sqlite_cache.add('a', b'stale')
+    assert sqlite_cache.get('a') == TOMBSTONE
+    clock.now += 36
+    assert sqlite_cache.get('a') is None
+    sqlite_cache.add('a', b'fresh')
+    assert sqlite_cache.get('a') == b'fresh'
+
+
+def test_document_cache_reads_through_and_counts_hits(sqlite_cache, clock):
+    cache = DocumentCache(LocalCache(10, 5), sqlite_cache)
+    document, etag = cache.get_or_load('a', lambda: {'title': 'x'})
+    assert cache.get_or_load('a', lambda: pytest.fail('loaded twice')) == (document, etag)
+    clock.now += 6
+    assert cache.get_or_load('a', lambda: pytest.fail('loaded twice')) == (document, etag)
+    assert {key: cache.report()[key] for key in ('local_hits', 'shared_hits', 'misses')} == \
+        {'local_hits': 1, 'shared_hits': 1, 'misses': 1}
+
+
+def test_missing_document_is_not_cached(clock):
+    cache = DocumentCache(LocalCache(10, 5))
+    assert cache.get_or_load('a', lambda: None) == (None, None)
+    assert len(cache.local) == 0
+
+
+def test_load_overlapping_an_invalidation_is_not_cached(sqlite_cache, clock):
+    cache = DocumentCache(LocalCache(10, 5), sqlite_cache)
+
+    def load():
+        # Another request changes the document while this one reads it
+        cache.invalidate(['a'])
+        return {'title': 'old'}
+
+    assert cache.get_or_load('a', load)[0] == {'title': 'old'}
+    assert cache.local.get('a') is None
+    assert sqlite_cache.get('a') == TOMBSTONE
+
+
+def test_tombstone_stops_another_worker_from_storing_the_old_document(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    reader = DocumentCache(LocalCache(10, 5), SqliteCache(path, 60, 35))
+    writer = DocumentCache(LocalCache(10, 5), SqliteCache(path, 60, 35))
+
+    def load():
+        writer.invalidate(['a'])
+        return {'title': 'old'}
+
+    reader.get_or_load('a', load)
+    assert writer.get_or_load('a', lambda: {'title': 'new'})[0] == {'title': 'new'}
+    assert writer.shared.get('a') == TOMBSTONE
+
+
+def test_failing_shared_cache_falls_back_to_the_load(clock):
+    class Broken:
+        def get(self, key):
+            raise ConnectionError('down')
+
+        def add(self, key, value):
+            raise ConnectionError('down')
+
+    cache = DocumentCache(LocalCache(10, 5), Broken())
+    assert cache.get_or_load('a', lambda: {'title': 'x'})[0] == {'title': 'x'}
+    assert cache.report()['shared_errors'] == 2
+
+
+def test_async_read_through_matches_the_sync_path(sqlite_cache, clock):
+    cache = DocumentCache(LocalCache(0, 5), sqlite_cache)
+
+    async def load():
+        return {'title': 'x'}
+
+    entry = asyncio.run(cache.get_or_load_async('a', load))
+    assert sqlite_cache.get('a') == encode_entry(*entry)
+    assert cache.get_or_load('a', lambda: pytest.fail('loaded twice')) == entry
@@ -0,0 +1,20 @@
+from app.query_stats import query_shape, shape_of
+
+
+def test_shape_of_strips_values_and_sorts_fields():
+    assert shape_of({'region': 'West', 'amount': {'$gte': 100}}) == {'amount': {'$gte': '?'}, 'region': '?'}
+
+
+def test_shape_of_keeps_operators_and_first_list_item():
+    assert shape_of({'$or': [{'a': 1}, {'b': 2}], 'tags': {'$in': ['x', 'y']}}) == \
+        {'$or': [{'a': '?'}], 'tags': {'$in': ['?']}}
+
+
+def test_shape_of_scalar():
+    assert shape_of(42) == '?'
+
+
+def test_queries_differing_only_in_values_share_a_shape():
+    first = query_shape('find', {'find': 'sales', 'filter': {'region': 'West'}, 'sort': {'_id': 1}})
+    second = query_shape('find', {'find': 'sales', 'filter': {'region': 'East'}, 'sort': {'_id': 1}})
+    assert first == second == "find sales filter={'region': '?'} sort={'_id': 1}"
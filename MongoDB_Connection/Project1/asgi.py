@@ -0,0 +1,132 @@
+"""ASGI entry point: the read endpoints on Motor, everything else on the Flask app.
+
+GET /documents (JSON pages) and GET /documents/<id> are answered on the event loop with
+Motor, so thousands of concurrent reads wait on MongoDB without holding a thread each.
+Single documents go through the same document cache as the Flask route, whose writes invalidate it.
+All other routes, including the NDJSON stream, go to the Flask WSGI app on a thread pool.
+
+    gunicorn -c gunicorn.conf.py          # with SERVER_MODE=asgi
+    uvicorn asgi:app --workers 4 --port 5000
+"""
+import json
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app import app as flask_app, document_cache, logger, query_stats
+from app.controllers.document_controller import parse_filters
+from app.models.document_model import build_projection, build_query, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+import main  # noqa: F401  Registers the remaining routes on the Flask app
+
+# Threads of the WSGI fallback, per worker process
+wsgi_app = WSGIMiddleware(flask_app, workers=flask_app.config['WSGI_FALLBACK_THREADS'])
+# Created in the worker's event loop on first use, Motor clients are bound to the loop they start in
+motor_client = None
+
+
+def get_collection():
+    global motor_client
+    if motor_client is None:
+        motor_client = AsyncIOMotorClient(flask_app.config['MONGO_URI'], event_listeners=[query_stats],
+                                          **flask_app.config['MONGO_CLIENT_OPTIONS'])
+        logger.info("Created Motor client for the async read path")
+    return motor_client[flask_app.config['DB_NAME']][flask_app.config['COLLECTION_NAME']]
+
+
+async def send_json(send, body, status=200, headers=()):
+    # Sorted keys, like Flask's jsonify
+    payload = json.dumps(body, default=str, sort_keys=True).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+                + list(headers)})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison, as If-None-Match uses it: W/"x" matches "x"."""
+    if if_none_match.strip() == b'*':
+        return True
+    return etag in [tag.strip().removeprefix(b'W/') for tag in if_none_match.split(b',')]
+
+
+async def get_document_by_id(send, document_id, if_none_match=b''):
+    if not ObjectId.is_valid(document_id):
+        await send_json(send, {"error": "Invalid document ID"}, 400)
+        return
+    object_id = ObjectId(document_id)
+    document, etag = await document_cache.get_or_load_async(
+        str(object_id), lambda: get_collection().find_one({"_id": object_id}, {'_id': 0})
+    )
+    if document:
+        # Same ETag as the Flask route
+        etag = f'"{etag}"'.encode()
+        headers = [(b'etag', etag), (b'cache-control', b'no-cache')]
+        if etag_matches(if_none_match, etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await send_json(send, document, headers=headers)
+    else:
+        await send_json(send, {"error": "Document not found"}, 404)
+
+
+async def get_documents(send, args):
+    """Same pages as DocumentModel.find_documents, with the same parameters and X-Next-Cursor header."""
+    try:
+        filters = parse_filters(args)
+        fields = [field for field in args.get('fields', '').split(',') if field] or None
+        after = args.get('after')
+        if after is not None and not ObjectId.is_valid(after):
+            raise ValueError("Invalid cursor")
+        limit = int(args['limit']) if 'limit' in args else DEFAULT_PAGE_SIZE
+        if limit < 1:
+            raise ValueError("limit must be positive")
+    except ValueError as e:
+        await send_json(send, {"error": str(e)}, 400)
+        return
+    limit = min(limit, MAX_PAGE_SIZE)
+    cursor = get_collection().find(build_query(filters, after), build_projection(fields)).sort('_id', 1).limit(limit + 1)
+    documents = await cursor.to_list(length=limit + 1)
+    headers = []
+    if len(documents) > limit:
+        headers.append((b'x-next-cursor', str(documents[limit - 1]['_id']).encode()))
+    documents = documents[:limit]
+    for document in documents:
+        del document['_id']
+    await send_json(send, documents, headers=headers)
+
+
+def is_async_read(scope, args):
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+        return False
+    parts = scope['path'].strip('/').split('/')
+    if parts == ['documents']:
+        # NDJSON streams stay on the Flask path
+        accept = dict(scope['headers']).get(b'accept', b'')
+        return args.get('format') != 'ndjson' and b'application/x-ndjson' not in accept
+    return len(parts) == 2 and parts[0] == 'documents'
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if motor_client is not None:
+                    motor_client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    # First value of every parameter, like request.args.get
+    args = {}
+    for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+        args.setdefault(name, value)
+    if not is_async_read(scope, args):
+        await wsgi_app(scope, receive, send)
+    elif scope['path'].strip('/') == 'documents':
+        await get_documents(send, args)
+    else:
+        await get_document_by_id(send, scope['path'].strip('/').split('/')[1], dict(scope['headers']).get(b'if-none-match', b''))
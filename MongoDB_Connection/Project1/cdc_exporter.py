@@ -0,0 +1,287 @@
+"""Incremental export of the MongoDB collection into the Bronze bucket.
+
+Follows the collection's change stream and writes the changes in batches as JSON-lines or Parquet
+under dw-bucket-bronze/mongodb/<db>/<collection>/date=YYYY-MM-DD/. After every batch the resume
+token is saved in dw-bucket-metadata, so a restarted exporter continues where it stopped.
+The first run exports a snapshot of the whole collection, then follows the changes made since it began.
+
+Change streams need a replica set. On a standalone server the exporter polls instead, with a
+watermark on _id, or on --timestamp-field and _id so updates are seen too. Polling cannot see deletes.
+
+Every record has op, document_id, cluster_time, exported_at and the document as relaxed Extended JSON.
+Delivery is at least once: a batch written just before a crash is written again on restart, so
+deduplicate on (document_id, cluster_time) for changes and keep the last record per document_id.
+
+    python cdc_exporter.py --format parquet
+    python cdc_exporter.py --mode poll --once
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import signal
+import time
+from datetime import datetime, timezone
+
+from bson import json_util
+from minio import Minio
+from minio.error import S3Error
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Server error codes of a deployment without change streams, and of a resume token that is too old
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324)
+CHANGE_STREAM_HISTORY_LOST = 286
+
+RECORD_FIELDS = ['op', 'document_id', 'cluster_time', 'exported_at', 'document']
+
+stopping = False
+
+
+def request_stop(signum, frame):
+    global stopping
+    stopping = True
+    logging.info("Stopping after the current batch")
+
+
+def read_object(minio_client, bucket, name):
+    """Contents of the object, or None if it does not exist yet."""
+    try:
+        response = minio_client.get_object(bucket, name)
+    except S3Error as e:
+        if e.code == 'NoSuchKey':
+            return None
+        raise
+    try:
+        return response.read()
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def write_object(minio_client, bucket, name, data):
+    minio_client.put_object(bucket, name, io.BytesIO(data), len(data))
+
+
+def load_state(minio_client, bucket, name):
+    data = read_object(minio_client, bucket, name)
+    # Extended JSON keeps the resume token and watermark values (ObjectId, dates) as they were
+    return json_util.loads(data) if data else {}
+
+
+def save_state(minio_client, bucket, name, state):
+    write_object(minio_client, bucket, name, json_util.dumps(state, indent=2).encode('utf-8'))
+
+
+def make_record(op, document_id, document, cluster_time=None):
+    return {
+        'op': op,
+        'document_id': str(document_id),
+        # Seconds and increment of the change's cluster time, zero padded so they sort as text
+        'cluster_time': f"{cluster_time.time:010d}.{cluster_time.inc:010d}" if cluster_time else None,
+        'exported_at': datetime.now(timezone.utc).isoformat(),
+        'document': json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) if document is not None else None,
+    }
+
+
+def change_record(change):
+    """One record of a change stream event; updates carry the full document looked up after the change."""
+    document_key = change.get('documentKey', {})
+    return make_record(change['operationType'], document_key.get('_id'), change.get('fullDocument'),
+                       change.get('clusterTime'))
+
+
+def encode_batch(records, file_format):
+    if file_format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist(records, schema=pa.schema([(field, pa.string()) for field in RECORD_FIELDS]))
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+    # JSON-lines keeps the document as an object rather than a string
+    lines = [json.dumps(dict(record, document=json.loads(record['document']) if record['document'] else None))
+             for record in records]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class BatchWriter:
+    """Collects records and writes them as one object per batch, calling on_flush after every write."""
+
+    def __init__(self, minio_client, args, prefix, on_flush):
+        self.minio_client = minio_client
+        self.args = args
+        self.prefix = prefix
+        self.on_flush = on_flush
+        self.records = []
+        self.started = time.monotonic()
+        self.written = 0
+
+    def add(self, record):
+        if not self.records:
+            self.started = time.monotonic()
+        self.records.append(record)
+        if len(self.records) >= self.args.batch_size:
+            self.flush()
+
+    def due(self):
+        return bool(self.records) and time.monotonic() - self.started >= self.args.batch_seconds
+
+    def flush(self):
+        """Write the pending records, if any, then save the position through on_flush."""
+        if not self.records:
+            return
+        now = datetime.now(timezone.utc)
+        extension = 'parquet' if self.args.format == 'parquet' else 'jsonl'
+        name = f"{self.prefix}/date={now:%Y-%m-%d}/{now:%Y%m%dT%H%M%S%f}-{len(self.records)}.{extension}"
+        write_object(self.minio_client, self.args.bucket, name, encode_batch(self.records, self.args.format))
+        self.written += len(self.records)
+        logging.info(f"Wrote {len(self.records)} records to {self.args.bucket}/{name}")
+        self.records = []
+        # The position only moves after the write, so a failed batch is exported again
+        self.on_flush()
+
+
+def export_snapshot(collection, writer):
+    """Write every document of the collection, in _id order, as 'snapshot' records."""
+    for document in collection.find({}, batch_size=writer.args.batch_size).sort('_id', 1):
+        if stopping:
+            return False
+        writer.add(make_record('snapshot', document['_id'], document))
+    writer.flush()
+    return True
+
+
+def follow_change_stream(collection, minio_client, args, prefix, state):
+    """Export the changes after the saved resume token; the first run starts with a snapshot."""
+    def save_position():
+        state['mode'] = 'stream'
+        state['resume_token'] = stream.resume_token
+        save_state(minio_client, args.state_bucket, args.state_name, state)
+
+    with collection.watch(full_document='updateLookup', resume_after=state.get('resume_token'),
+                          max_await_time_ms=1000, batch_size=args.batch_size) as stream:
+        if state.get('resume_token') is None:
+            # The stream is opened first, so changes made during the snapshot are exported as well
+            logging.info(f"No resume token, exporting a snapshot of {collection.full_name}")
+            snapshot_writer = BatchWriter(minio_client, args, prefix, lambda: None)
+            if not export_snapshot(collection, snapshot_writer):
+                return
+            save_position()
+        writer = BatchWriter(minio_client, args, prefix, save_position)
+        while not stopping and stream.alive:
+            change = stream.try_next()
+            if change is not None:
+                writer.add(change_record(change))
+            elif args.once:
+                # Caught up, the last batch is written below
+                break
+            elif writer.due():
+                writer.flush()
+        writer.flush()
+        # The token also moves past changes of other collections, keep it close to the oplog's head
+        save_position()
+        logging.info(f"Exported {writer.written} changes of {collection.full_name}")
+
+
+def poll_watermark(collection, minio_client, args, prefix, state):
+    """Export documents past the watermark: _id, or (--timestamp-field, _id) to see updates too.
+    With --timestamp-field, documents that lack the field are not exported."""
+    field = args.timestamp_field
+    watermark = state.get('watermark') or {}
+
+    def save_position():
+        state['mode'] = 'poll'
+        state['watermark'] = watermark
+        save_state(minio_client, args.state_bucket, args.state_name, state)
+
+    writer = BatchWriter(minio_client, args, prefix, save_position)
+    while not stopping:
+        if field:
+            # Documents without the timestamp would sort first and leave a null watermark, which
+            # matches nothing with $gt, so they are skipped
+            query = {field: {'$exists': True, '$ne': None}}
+            if watermark.get('timestamp') is not None:
+                # Documents with the same timestamp as the watermark are told apart by _id
+                query = {'$and': [query, {'$or': [{field: {'$gt': watermark['timestamp']}},
+                                                  {field: watermark['timestamp'], '_id': {'$gt': watermark['_id']}}]}]}
+        elif not watermark:
+            query = {}
+        else:
+            query = {'_id': {'$gt': watermark['_id']}}
+        sort = [(field, 1), ('_id', 1)] if field else [('_id', 1)]
+        documents = list(collection.find(query).sort(sort).limit(args.batch_size))
+        for document in documents:
+            # Moved before add, which may write the batch and save the watermark
+            watermark = {'_id': document['_id']}
+            if field:
+                watermark['timestamp'] = document.get(field)
+            writer.add(make_record('poll', document['_id'], document))
+        if len(documents) < args.batch_size:
+            # Caught up
+            writer.flush()
+            if args.once:
+                break
+            time.sleep(args.poll_seconds)
+        else:
+            writer.flush()
+    writer.flush()
+    logging.info(f"Exported {writer.written} documents of {collection.full_name}")
+
+
+def run(collection, minio_client, args):
+    prefix = f"mongodb/{collection.database.name}/{collection.name}"
+    state = {} if args.reset else load_state(minio_client, args.state_bucket, args.state_name)
+    mode = args.mode
+    if mode == 'auto':
+        mode = state.get('mode', 'stream')
+    if mode == 'stream':
+        try:
+            follow_change_stream(collection, minio_client, args, prefix, state)
+            return
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_HISTORY_LOST:
+                raise SystemExit("The resume token is no longer in the oplog, run again with --reset for a new snapshot")
+            if e.code not in CHANGE_STREAMS_UNSUPPORTED or args.mode == 'stream':
+                raise
+            logging.warning(f"Change streams are not available ({e}), polling a watermark instead")
+    poll_watermark(collection, minio_client, args, prefix, state)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export MongoDB collection changes into the Bronze bucket.')
+    parser.add_argument('--collection', default=Config.COLLECTION_NAME)
+    parser.add_argument('--mode', choices=['auto', 'stream', 'poll'], default='auto',
+                        help='auto follows the change stream and polls when change streams are not available')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Records per file at most')
+    parser.add_argument('--batch-seconds', type=float, default=60, help='Longest wait before a batch is written')
+    parser.add_argument('--poll-seconds', type=float, default=10)
+    parser.add_argument('--timestamp-field', help='Last modified field for polling, e.g. updated_at')
+    parser.add_argument('--once', action='store_true', help='Stop once caught up instead of following')
+    parser.add_argument('--reset', action='store_true', help='Ignore the saved position and start with a snapshot')
+    parser.add_argument('--bucket', default='dw-bucket-bronze')
+    parser.add_argument('--state-bucket', default='dw-bucket-metadata')
+    args = parser.parse_args()
+    args.state_name = f"mongodb/{Config.DB_NAME}/{args.collection}/cdc_state.json"
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    client = MongoClient(Config.MONGO_URI, **Config.MONGO_CLIENT_OPTIONS)
+    minio_client = Minio(
+        os.getenv('MINIO_HOST'),
+        access_key=os.getenv('MINIO_ACCESS_KEY'),
+        secret_key=os.getenv('MINIO_SECRET_KEY'),
+        secure=os.getenv('MINIO_SECURE', 'False').lower() == 'true'
+    )
+    try:
+        run(client[Config.DB_NAME][args.collection], minio_client, args)
+    finally:
+        client.close()
@@ -1,10 +1,65 @@
 import os
+import json
 #from dotenv import load_dotenv
 #load_dotenv()
 class Config:
     # Fetch MongoDB URI and database name from environment variables
     MONGO_URI = os.environ.get('MONGO_URI')
     DB_NAME = os.environ.get('DB_NAME')
+    # docker-compose passes COLLECTION_NAME through even when it is unset, as an empty string
+    COLLECTION_NAME = os.environ.get('COLLECTION_NAME') or 'sales'
+
+    # Connection pool, timeouts, read preference and write concern, shared by the
+    # MongoClient of the Flask app and the Motor client of the async read path.
+    # The pool is per server process, so the total is roughly workers * maxPoolSize.
+    MONGO_CLIENT_OPTIONS = {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', 5)),
+        'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+        'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        'socketTimeoutMS': int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'readPreference': os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+    }
+    # Write concern, e.g. MONGO_WRITE_CONCERN=majority or 1; unset keeps the server default
+    if os.environ.get('MONGO_WRITE_CONCERN'):
+        MONGO_CLIENT_OPTIONS['w'] = int(os.environ['MONGO_WRITE_CONCERN']) \
+            if os.environ['MONGO_WRITE_CONCERN'].isdigit() else os.environ['MONGO_WRITE_CONCERN']
+        MONGO_CLIENT_OPTIONS['journal'] = os.environ.get('MONGO_WRITE_CONCERN_JOURNAL', 'True').lower() == 'true'
+
+    # Threads per worker process that run the Flask routes under the ASGI server (asgi.py)
+    WSGI_FALLBACK_THREADS = int(os.environ.get('WSGI_FALLBACK_THREADS', 10))
+
+    # Documents per insert_many / bulk_write call of the bulk endpoints
+    BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
+
+    # Indexes created on the collection at startup. Each entry has "keys" as [field, direction] pairs
+    # (1, -1 or "text") and optional IndexModel options such as "name", "unique" or "expireAfterSeconds".
+    # Filters with a keyset page sort on _id, so an equality field is followed by _id.
+    # A TTL index, e.g. {"keys": [["expires_at", 1]], "expireAfterSeconds": 0}, can be added through MONGO_INDEXES.
+    INDEXES = json.loads(os.environ.get('MONGO_INDEXES', 'null')) or [
+        {"keys": [["title", 1], ["_id", 1]], "name": "title_id"},
+        {"keys": [["title", "text"], ["content", "text"]], "name": "title_content_text"},
+    ]
+    # Drop indexes that are not in INDEXES (never _id_)
+    DROP_UNDECLARED_INDEXES = os.environ.get('DROP_UNDECLARED_INDEXES', 'False').lower() == 'true'
+
+    # Read-through cache of GET /documents/<id>. The local LRU is per worker process and only sees the
+    # invalidations of its own process, so keep CACHE_TTL_SECONDS short with several workers.
+    # CACHE_MAX_ENTRIES=0 turns the local cache off.
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', 5))
+    # Optional cache shared by all workers: redis://host:6379/0, or sqlite:///<path> as a local stand-in
+    CACHE_SHARED_URL = os.environ.get('CACHE_SHARED_URL')
+    CACHE_SHARED_TTL_SECONDS = int(os.environ.get('CACHE_SHARED_TTL_SECONDS', 60))
+    # How long an invalidated document refuses fills in the shared cache; longer than MONGO_SOCKET_TIMEOUT_MS,
+    # so a read that started before the change cannot store the old version afterwards
+    CACHE_TOMBSTONE_SECONDS = int(os.environ.get('CACHE_TOMBSTONE_SECONDS', 35))
+
+    # Queries slower than this are logged and counted in /admin/query-stats
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    # Token required in the X-Admin-Token header of the /admin endpoints, which are disabled without it
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
 
     # Raise an error if the required environment variables are not set
     if not MONGO_URI or not DB_NAME:
@@ -0,0 +1,14 @@
+import os
+
+# The app connects to MongoDB and creates its indexes on import, so the tests run it on mongomock
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test')
+
+try:
+    import mongomock
+    import pymongo
+except ImportError:
+    # Without mongomock the app package cannot be imported, so its tests are not collected
+    collect_ignore = ['app']
+else:
+    pymongo.MongoClient = mongomock.MongoClient
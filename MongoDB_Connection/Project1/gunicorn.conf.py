@@ -0,0 +1,28 @@
+"""Gunicorn settings for production serving: gunicorn -c gunicorn.conf.py
+
+SERVER_MODE=wsgi (default) runs the Flask app on threaded workers. SERVER_MODE=asgi runs asgi.py
+on Uvicorn workers, which serve the document reads with Motor on an event loop.
+Every worker has its own MongoDB pool of MONGO_MAX_POOL_SIZE connections, so keep
+WEB_CONCURRENCY * MONGO_MAX_POOL_SIZE below what the MongoDB deployment accepts.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+# Restart workers now and then, so a leak in one of them cannot grow for ever
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+if os.environ.get('SERVER_MODE', 'wsgi').lower() == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'asgi:app'
+else:
+    # Threads share the worker's MongoClient pool, so more threads than MONGO_MAX_POOL_SIZE only queue
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+    wsgi_app = 'main:app'
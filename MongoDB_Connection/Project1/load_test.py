@@ -0,0 +1,90 @@
+"""Concurrent read load test for the API, to compare the serving modes.
+
+Each client thread keeps one HTTP connection open and requests the paths in turn:
+
+    python load_test.py --url http://localhost:5000 --concurrency 64 --duration 30
+    python load_test.py --url http://localhost:5000 --path "/documents?limit=50" --path /documents/<id>
+
+Run it once against the development server (python main.py), once against
+gunicorn -c gunicorn.conf.py and once with SERVER_MODE=asgi to see the difference.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_client(url, paths, deadline, latencies, statuses, lock):
+    connection = None
+    done, codes = [], {}
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        if connection is None:
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            connection.close()
+            connection = None
+        done.append(time.perf_counter() - start)
+        codes[status] = codes.get(status, 0) + 1
+    if connection is not None:
+        connection.close()
+    with lock:
+        latencies.extend(done)
+        for status, count in codes.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+
+def load_test(base_url, paths, concurrency, duration):
+    url = urlparse(base_url)
+    latencies, statuses, lock = [], {}, threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_client, args=(url, paths, deadline, latencies, statuses, lock))
+               for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'statuses': statuses,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent GET load test with keep-alive connections.')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--path', action='append', help='Path to request, may be repeated (default /documents)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Client threads, one connection each')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+    args = parser.parse_args()
+
+    result = load_test(args.url, args.path or ['/documents'], args.concurrency, args.duration)
+    print(f"{result['requests']} requests, {result['throughput']:.1f} req/s")
+    print(f"latency p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"statuses {result['statuses']}")
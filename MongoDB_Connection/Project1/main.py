@@ -1,6 +1,6 @@
 import os
 from app import app
-from app.controllers import document_controller  # Import controllers to register routes
+from app.controllers import document_controller, admin_controller  # Import controllers to register routes
 
 @app.route('/')
 def home():
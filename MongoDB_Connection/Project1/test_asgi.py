@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip('a2wsgi')
+pytest.importorskip('motor')
+
+from asgi import etag_matches  # noqa: E402
+
+
+@pytest.mark.parametrize('if_none_match', [b'"abc"', b'W/"abc"', b'"x", W/"abc"', b' * '])
+def test_etag_matches(if_none_match):
+    assert etag_matches(if_none_match, b'"abc"')
+
+
+@pytest.mark.parametrize('if_none_match', [b'', b'"abd"', b'W/"x"', b'abc'])
+def test_etag_does_not_match(if_none_match):
+    assert not etag_matches(if_none_match, b'"abc"')
@@ -0,0 +1,90 @@
+import io
+import json
+from argparse import Namespace
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('minio')
+mongomock = pytest.importorskip('mongomock')
+
+from bson import ObjectId, Timestamp  # noqa: E402
+
+import cdc_exporter  # noqa: E402
+
+
+class FakeMinio:
+    """Objects in a dict, enough for BatchWriter and save_state."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, bucket, name, data, length):
+        self.objects[(bucket, name)] = data.read()
+
+
+def test_record_cluster_time_sorts_as_text():
+    early = cdc_exporter.make_record('insert', 1, None, Timestamp(1700000000, 2))
+    late = cdc_exporter.make_record('insert', 1, None, Timestamp(1700000000, 10))
+    assert early['cluster_time'] == '1700000000.0000000002'
+    assert early['cluster_time'] < late['cluster_time']
+    assert early['document'] is None
+
+
+def test_change_record_of_an_update():
+    document_id = ObjectId()
+    record = cdc_exporter.change_record({'operationType': 'update', 'documentKey': {'_id': document_id},
+                                         'fullDocument': {'_id': document_id, 'amount': 5},
+                                         'clusterTime': Timestamp(1, 1)})
+    assert (record['op'], record['document_id']) == ('update', str(document_id))
+    assert json.loads(record['document']) == {'_id': {'$oid': str(document_id)}, 'amount': 5}
+
+
+def test_jsonl_batch_keeps_documents_as_objects():
+    records = [cdc_exporter.make_record('snapshot', 1, {'when': datetime(2024, 1, 2)}),
+               cdc_exporter.make_record('delete', 2, None)]
+    lines = cdc_exporter.encode_batch(records, 'jsonl').decode('utf-8').splitlines()
+    assert json.loads(lines[0])['document'] == {'when': {'$date': '2024-01-02T00:00:00Z'}}
+    assert json.loads(lines[1])['document'] is None
+
+
+def test_parquet_batch_has_the_record_fields():
+    pq = pytest.importorskip('pyarrow.parquet')
+    records = [cdc_exporter.make_record('snapshot', 1, {'a': 1})]
+    table = pq.read_table(io.BytesIO(cdc_exporter.encode_batch(records, 'parquet')))
+    assert table.column_names == cdc_exporter.RECORD_FIELDS
+    assert table.to_pylist()[0]['document'] == '{"a": 1}'
+
+
+def exported(minio_client):
+    return [json.loads(line) for (bucket, name), data in sorted(minio_client.objects.items())
+            if bucket == 'bronze' for line in data.decode('utf-8').splitlines()]
+
+
+@pytest.fixture
+def args():
+    return Namespace(batch_size=2, batch_seconds=60, poll_seconds=0, once=True, format='jsonl', bucket='bronze',
+                     state_bucket='metadata', state_name='state.json', timestamp_field=None)
+
+
+def test_polling_exports_only_documents_past_the_watermark(args):
+    collection = mongomock.MongoClient().db.sales
+    collection.insert_many([{'n': n} for n in range(3)])
+    minio_client, state = FakeMinio(), {}
+    cdc_exporter.poll_watermark(collection, minio_client, args, 'mongodb/db/sales', state)
+    collection.insert_one({'n': 3})
+    cdc_exporter.poll_watermark(collection, minio_client, args, 'mongodb/db/sales', state)
+    assert sorted(record['document']['n'] for record in exported(minio_client)) == [0, 1, 2, 3]
+    assert state['watermark']['_id'] == collection.find_one({'n': 3})['_id']
+
+
+def test_polling_a_timestamp_skips_documents_without_it(args):
+    args.timestamp_field = 'updated_at'
+    collection = mongomock.MongoClient().db.sales
+    collection.insert_many([{'n': 0}, {'n': 1, 'updated_at': datetime(2024, 1, 1)},
+                            {'n': 2, 'updated_at': datetime(2024, 1, 2)}])
+    minio_client, state = FakeMinio(), {}
+    cdc_exporter.poll_watermark(collection, minio_client, args, 'mongodb/db/sales', state)
+    collection.update_one({'n': 1}, {'$set': {'updated_at': datetime(2024, 1, 3)}})
+    cdc_exporter.poll_watermark(collection, minio_client, args, 'mongodb/db/sales', state)
+    assert [record['document']['n'] for record in exported(minio_client)] == [1, 2, 1]
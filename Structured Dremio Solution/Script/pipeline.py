@@ -1,10 +1,14 @@
 # Ensure you have env file containing details for dremio in your working directory before running this script
 # When running the script using: python pipeline.py
 # Add a space then a url for the csv files being uploaded to dremio. Each subsequent url should be separated by a space.
+# Use --mode bulk to write each csv as a parquet file into a MinIO bucket or NAS folder that dremio already reads
+# and promote it as a dataset with a single metadata refresh instead of sending INSERT statements.
+# Use --workers to ingest several urls in parallel. Each run records per url results in the state file, and
+# running again with --retry-failed (and no urls) only retries the urls that failed last time.
 
 import requests
 import pandas as pd
-import sqlite3
+import numpy as np
 import getpass
 import time
 from dotenv import load_dotenv
@@ -12,6 +16,11 @@ import os
 import argparse
 import logging
 import sys
+import tempfile
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED, ALL_COMPLETED
 from urllib.parse import urlparse
 
 # Set up logging
@@ -38,202 +47,508 @@ load_dotenv('pipeline.env')
 
 # Set up argument parsing
 parser = argparse.ArgumentParser(description='Process CSV URLs.')
-parser.add_argument('csv_urls', nargs='+', help='List of CSV file URLs')
-args = parser.parse_args()
+parser.add_argument('csv_urls', nargs='*', help='List of CSV file URLs')
+parser.add_argument('--mode', choices=['sql', 'bulk'], default='sql',
+                    help='sql sends INSERT statements, bulk writes parquet into a source dremio already reads')
+parser.add_argument('--max-in-flight', type=int, default=4,
+                    help='Maximum number of INSERT jobs each worker keeps running in dremio at the same time')
+parser.add_argument('--target-latency', type=float, default=10.0,
+                    help='Seconds an INSERT job should take, batch size adapts towards it')
+parser.add_argument('--max-statement-bytes', type=int, default=4 * 1024 * 1024,
+                    help='Upper limit on the size of a single INSERT statement')
+parser.add_argument('--workers', type=int, default=1,
+                    help='Number of urls ingested in parallel, each in its own process')
+parser.add_argument('--state-file', default='pipeline_state.json',
+                    help='File recording the result of every url from the last runs')
+parser.add_argument('--retry-failed', action='store_true',
+                    help='Also ingest the urls that failed according to the state file')
 
-# Get CSV URLs from command line arguments
-csv_urls = args.csv_urls
+# Function to load the per url results of previous runs
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return json.load(f)
 
-# Validate CSV URLs
-validated_urls = [url for url in csv_urls if is_valid_url(url)]
-if len(validated_urls) != len(csv_urls):
-    logging.error("One or more provided URLs are invalid.")
-    sys.exit(1)
-
-# Get environment variables with error handling
-dremio_url = get_env_variable('DREMIO_URL')
-username = get_env_variable('DREMIO_USERNAME')
-password = get_env_variable('DREMIO_PASSWORD')
-source = get_env_variable('DREMIO_SOURCE')
+# Function to save the per url results so a rerun can pick out the failures
+def save_state(state_file, state):
+    with open(state_file + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_file + '.tmp', state_file)
 
 chunk_size = 50 * 1024 * 1024  # 50MB chunk size (change as needed)
+sample_rows = 10000  # Rows read to derive the table schema once per file
+download_retries = 5  # Attempts to resume an interrupted download
+download_dir = os.getenv('DOWNLOAD_DIR', tempfile.gettempdir())
 
-# Authenticate and get token
-try:
-    auth_response = requests.post(f'{dremio_url}/apiv2/login', json={'userName': username, 'password': password})
-    auth_response.raise_for_status()
-    auth_token = auth_response.json().get('token')
-except requests.exceptions.RequestException as e:
-    logging.error(f"Error occurred while making a request: {str(e)}")
-    sys.exit(1)
-
-# Headers for authenticated requests
-headers = {
-    'Authorization': f'_dremio{auth_token}',
-    'Content-Type': 'application/json'
-}
-
-# Function to filter out unsupported SQL commands
-def filter_sql_commands(commands):
-    supported_commands = [
-        "CREATE", "INSERT", "DELETE", "UPDATE", "DROP", "ALTER", "TRUNCATE", "SELECT", "VALUES"
-    ]
-    filtered_commands = []
-    for command in commands:
-        if any(command.strip().upper().startswith(cmd) for cmd in supported_commands):
-            filtered_commands.append(command)
-    return filtered_commands
-
-# Mapping of SQLite types to Dremio types
-type_mapping = {
-    "INTEGER": "INT",
-    "TEXT": "VARCHAR",
-    "REAL": "FLOAT",
-    "BLOB": "VARBINARY",
-    "BOOLEAN": "BOOLEAN",
-    "DATE": "DATE",
-    "FLOAT": "FLOAT",
-    "DECIMAL": "DECIMAL",
-    "DOUBLE": "DOUBLE",
-    "INTERVAL": "INTERVAL",
-    "BIGINT": "BIGINT",
-    "TIME": "TIME",
-    "TIMESTAMP": "TIMESTAMP"
-}
-
-def convert_sqlite_to_dremio(sql_commands):
-    converted_commands = []
-    for command in sql_commands:
-        for sqlite_type, dremio_type in type_mapping.items():
-            command = command.replace(sqlite_type, dremio_type)
-        converted_commands.append(command)
-    return converted_commands
-
-# Function to send SQL command to Dremio
-def send_sql_command(command):
+# Function to read the dremio and bulk load settings and log in to dremio.
+# Runs once in the main process and again in every worker that was not forked from it.
+def configure(cli_args):
+    global args, dremio_url, source, bulk_target, bulk_source, bulk_bucket, minio_client, nas_path, headers
+    args = cli_args
+
+    # Get environment variables with error handling
+    dremio_url = get_env_variable('DREMIO_URL')
+    username = get_env_variable('DREMIO_USERNAME')
+    password = get_env_variable('DREMIO_PASSWORD')
+    source = get_env_variable('DREMIO_SOURCE')
+
+    # Bulk load settings, only needed when running with --mode bulk
+    if args.mode == 'bulk':
+        bulk_target = os.getenv('BULK_TARGET', 'minio').lower()  # minio or nas
+        bulk_source = get_env_variable('DREMIO_BULK_SOURCE')  # dremio source pointing at the bucket or nas folder
+        if bulk_target == 'minio':
+            # Only bulk mode needs the MinIO client, sql mode runs without it installed
+            from minio import Minio
+            bulk_bucket = get_env_variable('BULK_BUCKET')
+            minio_client = Minio(
+                get_env_variable('MINIO_HOST'),
+                access_key=get_env_variable('MINIO_ACCESS_KEY'),
+                secret_key=get_env_variable('MINIO_SECRET_KEY'),
+                secure=os.getenv('MINIO_SECURE', 'False').lower() == 'true'
+            )
+        elif bulk_target == 'nas':
+            nas_path = get_env_variable('NAS_PATH')
+        else:
+            logging.error(f"Unsupported BULK_TARGET {bulk_target}, use minio or nas.")
+            sys.exit(1)
+
+    # Authenticate and get token
     try:
-        sql_response = requests.post(f'{dremio_url}/api/v3/sql', headers=headers, json={'sql': command})
-        sql_response.raise_for_status()
-        logging.info(f'Executed SQL command: {sql_response.status_code}')
+        auth_response = requests.post(f'{dremio_url}/apiv2/login', json={'userName': username, 'password': password})
+        auth_response.raise_for_status()
+        auth_token = auth_response.json().get('token')
     except requests.exceptions.RequestException as e:
-        logging.error(f'Failed to execute SQL command: {str(e)}')
-        logging.error(f'Response content: {sql_response.content}')
+        logging.error(f"Error occurred while making a request: {str(e)}")
         sys.exit(1)
-    time.sleep(5)
-
-# Function to combine INSERT commands into a single statement
-def combine_insert_commands(insert_commands):
-    if not insert_commands:
-        return None
-    
-    # Extract the base part of the INSERT statement (i.e., columns part)
-    base_insert = insert_commands[0].split(' VALUES', 1)[0]  # Get the INSERT part
-
-    # Combine all VALUES parts into a single statement
-    combined_values = []
-    for command in insert_commands:
-        values_part = command.split(' VALUES', 1)[1].strip().rstrip(';')
-        combined_values.append(values_part)
-
-    combined_insert = f'{base_insert} VALUES {", ".join(combined_values)};'
-    return combined_insert
-
-# Function to send accumulated SQL commands in chunks
-def send_sql_in_chunks(filtered_commands, max_chunk_size):
-    chunk = []
-    chunk_size = 0
-    for command in filtered_commands:
-        command_size = len(command.encode('utf-8'))
-        if chunk_size + command_size > max_chunk_size:
-            # Combine INSERT commands in the current chunk
-            combined_insert_command = combine_insert_commands(chunk)
-            if combined_insert_command:
-                send_sql_command(combined_insert_command)
-            # Reset chunk and chunk size
-            chunk = []
-            chunk_size = 0
-        
-        chunk.append(command)
-        chunk_size += command_size
-
-    # Send any remaining commands in the last chunk
-    if chunk:
-        combined_insert_command = combine_insert_commands(chunk)
-        if combined_insert_command:
-            send_sql_command(combined_insert_command)
-
-# Function to insert data using prepared statements
-def insert_data(conn, table_name, data):
-    placeholders = ', '.join(['?' for _ in data[0]])
-    query = f"INSERT INTO {table_name} VALUES ({placeholders})"
-    cursor = conn.cursor()
+
+    # Headers for authenticated requests
+    headers = {
+        'Authorization': f'_dremio{auth_token}',
+        'Content-Type': 'application/json'
+    }
+
+# Function to pick how worker processes start. Fork is only used where it is safe (not on macOS) and
+# lets the workers inherit the settings and token, elsewhere each worker runs configure itself.
+def worker_context():
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+# Function to submit a SQL command to Dremio and return the id of the job running it
+def submit_sql_command(command):
+    sql_response = requests.post(f'{dremio_url}/api/v3/sql', headers=headers, json={'sql': command})
+    if not sql_response.ok:
+        logging.error(f'Response content: {sql_response.content}')
+    sql_response.raise_for_status()
+    return sql_response.json().get('id')
+
+# Function to wait for a Dremio job through the job api instead of sleeping a fixed time
+def wait_for_job(job_id):
+    delay = 0.1
+    while True:
+        job_response = requests.get(f'{dremio_url}/api/v3/job/{job_id}', headers=headers)
+        job_response.raise_for_status()
+        job = job_response.json()
+        job_state = job.get('jobState')
+        if job_state == 'COMPLETED':
+            return job
+        if job_state in ('FAILED', 'CANCELED'):
+            raise RuntimeError(f"Dremio job {job_id} {job_state}: {job.get('errorMessage', '')}")
+        # Back off so long running jobs are not polled in a tight loop
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+# Function to send SQL command to Dremio and wait for it to finish
+def send_sql_command(command):
     try:
-        cursor.executemany(query, data)
-        conn.commit()
-    except sqlite3.Error as e:
-        logging.error(f"Database error occurred: {str(e)}")
-        sys.exit(1)
+        wait_for_job(submit_sql_command(command))
+        logging.info('Executed SQL command')
+    except (requests.exceptions.RequestException, RuntimeError) as e:
+        logging.error(f'Failed to execute SQL command: {str(e)}')
+        raise
+
+# Submits multi-row INSERT statements with a bounded number of Dremio jobs in flight.
+# The rows per statement grow while jobs finish under the target latency and shrink when
+# they run slow or fail, and a statement never grows past the byte limit.
+# Use it as a context manager, leaving the block waits for the jobs in flight and shuts the thread pool down.
+class InsertSubmitter:
+    def __init__(self, max_in_flight, target_latency, max_statement_bytes, initial_rows=1000):
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.target_latency = target_latency
+        self.max_statement_bytes = max_statement_bytes
+        self.rows_per_statement = initial_rows
+        self.in_flight = set()
+        self.errors = []
+        self.base_insert = None
+        self.pending = []
+        self.pending_bytes = 0
+        self.started = time.monotonic()
+        self.rows = 0
+        self.statements = 0
+        self.bytes_sent = 0
+        self.latencies = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.executor.shutdown(wait=True)
+        return False
+
+    def add(self, base_insert, values):
+        # Rows for a different table cannot share a statement with the pending ones
+        if self.base_insert is not None and base_insert != self.base_insert:
+            self._dispatch()
+        self.base_insert = base_insert
+        if not self.pending:
+            self.pending_bytes = len(base_insert.encode('utf-8')) + len(' VALUES ;')
+        values_size = len(values.encode('utf-8')) + len(', ')
+        if self.pending and self.pending_bytes + values_size > self.max_statement_bytes:
+            self._dispatch()
+        self.pending.append(values)
+        self.pending_bytes += values_size
+        if len(self.pending) >= self.rows_per_statement:
+            self._dispatch()
+
+    def _dispatch(self):
+        if not self.pending:
+            return
+        statement = f'{self.base_insert} VALUES {", ".join(self.pending)};'
+        row_count = len(self.pending)
+        self.pending = []
+        # Wait for a free slot before putting another job in flight
+        while len(self.in_flight) >= self.max_in_flight:
+            self._collect(return_when=FIRST_COMPLETED)
+        self.in_flight.add(self.executor.submit(self._run, statement, row_count))
+
+    def _run(self, statement, row_count):
+        job_started = time.monotonic()
+        wait_for_job(submit_sql_command(statement))
+        return row_count, len(statement.encode('utf-8')), time.monotonic() - job_started
+
+    def _collect(self, return_when):
+        done, self.in_flight = wait(self.in_flight, return_when=return_when)
+        for future in done:
+            try:
+                row_count, statement_bytes, latency = future.result()
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                logging.error(f'Failed to execute INSERT statement: {str(e)}')
+                self.errors.append(e)
+                self.rows_per_statement = max(1, self.rows_per_statement // 2)
+                continue
+            self.rows += row_count
+            self.statements += 1
+            self.bytes_sent += statement_bytes
+            self.latencies.append(latency)
+            self._adjust(row_count, latency)
+
+    def _adjust(self, row_count, latency):
+        # Only grow when the finished statement was actually full size, partial tail batches say nothing
+        if latency > self.target_latency:
+            self.rows_per_statement = max(1, self.rows_per_statement // 2)
+        elif latency < self.target_latency / 2 and row_count >= self.rows_per_statement:
+            self.rows_per_statement *= 2
+        logging.info(f'Inserted {row_count} rows in {latency:.2f}s, next statements use {self.rows_per_statement} rows')
+
+    def flush(self):
+        self._dispatch()
+        self.base_insert = None
+        self._collect(return_when=ALL_COMPLETED)
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise RuntimeError(f'{len(errors)} INSERT statements failed, first error: {errors[0]}')
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        mean_latency = sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+        logging.info(
+            f'Throughput: {self.rows} rows in {self.statements} statements '
+            f'({self.bytes_sent / (1024 * 1024):.1f} MB) over {elapsed:.1f}s, '
+            f'{self.rows / elapsed if elapsed else 0:.0f} rows/s, '
+            f'mean job latency {mean_latency:.2f}s, final batch size {self.rows_per_statement} rows'
+        )
+
+# Function to download a csv once into an on-disk buffer, resuming a partial download if the connection drops
+def download_csv(url):
+    # Name the buffer after the url so a rerun after a failure picks up the partial or finished download
+    buffer_path = os.path.join(download_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.csv')
+    part_path = buffer_path + '.part'
+    if os.path.exists(buffer_path):
+        logging.info(f"Reusing downloaded copy of {url}")
+        return buffer_path
 
-# Download CSV files, convert to SQL, and upload to Dremio
-logging.info("Script started")
-logging.info(f"Processing {len(validated_urls)} CSV files")
-for url in validated_urls:
+    for attempt in range(1, download_retries + 1):
+        downloaded = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = {'Range': f'bytes={downloaded}-'} if downloaded else {}
+        try:
+            with requests.get(url, headers=request_headers, stream=True, timeout=60) as response:
+                if response.status_code == 416:
+                    # The partial file already holds the whole body
+                    break
+                response.raise_for_status()
+                # A server that ignores the range header sends the whole file again
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                with open(part_path, mode) as buffer:
+                    for block in response.iter_content(chunk_size=1024 * 1024):
+                        buffer.write(block)
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if attempt == download_retries:
+                raise
+            logging.warning(f"Download of {url} interrupted ({str(e)}), resuming (attempt {attempt + 1})")
+    os.replace(part_path, buffer_path)
+    return buffer_path
+
+# Function to widen a sampled dtype until it holds every value of the column read as text: Int64 -> DOUBLE -> VARCHAR
+def widen_dtype(dtype, values):
+    values = values.dropna()
+    if dtype == 'boolean':
+        # The same words read_csv parses as booleans
+        return dtype if values.str.lower().isin(['true', 'false']).all() else object
+    if dtype != 'Int64' and not pd.api.types.is_float_dtype(dtype):
+        return dtype
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.isna().any():
+        return object
+    if dtype == 'Int64' and not ((numbers % 1 == 0) & (numbers.abs() < 2 ** 63)).all():
+        return 'float64'
+    return dtype
+
+# Function to derive column dtypes once from a sample so every chunk is read with the same schema
+def derive_schema(file_path):
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    dtypes = {}
+    for column, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[column] = 'boolean'
+        elif pd.api.types.is_integer_dtype(dtype):
+            # Nullable so a missing value after the sample does not break the read
+            dtypes[column] = 'Int64'
+        else:
+            dtypes[column] = dtype
+    if len(sample) == sample_rows:
+        # A float or text value after the sample would fail the insert once the table exists,
+        # so the typed columns are checked over the whole file and widened before the DDL is sent
+        typed = [column for column, dtype in dtypes.items()
+                 if dtype in ('boolean', 'Int64') or pd.api.types.is_float_dtype(dtype)]
+        if typed:
+            for chunk in pd.read_csv(file_path, usecols=typed, dtype=str, chunksize=100000):
+                for column in typed:
+                    dtypes[column] = widen_dtype(dtypes[column], chunk[column])
+    return sample.astype(dtypes), dtypes
+
+# Function to map a pandas (or arrow backed) dtype to the Dremio column type
+def dremio_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'BIGINT'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'DOUBLE'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'VARCHAR'
+
+# Function to quote a column or table name for Dremio SQL
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+# Function to get the full dremio path of a table in the configured source
+def full_table_path(table_name):
+    return f'{quote_identifier(source)}.{quote_identifier(table_name)}'
+
+# Function to build the CREATE TABLE command once per file straight from the sampled dtypes
+def build_create_table_command(sample, table_name):
+    columns = ', '.join(f'{quote_identifier(column)} {dremio_type(dtype)}' for column, dtype in sample.dtypes.items())
+    return f'CREATE TABLE {full_table_path(table_name)} ({columns})'
+
+# Function to build the DROP TABLE command that clears a partly loaded table before it is loaded again
+def build_drop_table_command(table_name):
+    return f'DROP TABLE IF EXISTS {full_table_path(table_name)}'
+
+# Function to build the INSERT INTO part shared by every row of a table
+def build_insert_prefix(sample, table_name):
+    columns = ', '.join(quote_identifier(column) for column in sample.columns)
+    return f'INSERT INTO {full_table_path(table_name)} ({columns})'
+
+# Function to format a whole column as SQL literals of its type, missing values become NULL
+def encode_column(series):
+    dtype = series.dtype
+    missing = series.isna()
+    if pd.api.types.is_bool_dtype(dtype):
+        literals = series.map({True: 'TRUE', False: 'FALSE'})
+    elif pd.api.types.is_integer_dtype(dtype):
+        literals = series.astype(str)
+    elif pd.api.types.is_float_dtype(dtype):
+        literals = series.astype(str)
+        # Infinities have no numeric literal in Dremio SQL
+        infinite = np.isinf(series.to_numpy(dtype='float64', na_value=np.nan))
+        literals = literals.mask(infinite & (series > 0), "CAST('Infinity' AS DOUBLE)")
+        literals = literals.mask(infinite & (series < 0), "CAST('-Infinity' AS DOUBLE)")
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        literals = "TIMESTAMP '" + series.dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3] + "'"
+    else:
+        literals = "'" + series.astype(str).str.replace("'", "''", regex=False) + "'"
+    return literals.mask(missing, 'NULL')
+
+# Function to encode every row of a chunk as a VALUES tuple, one column at a time
+def encode_rows(chunk):
+    rows = None
+    for column in chunk.columns:
+        literals = encode_column(chunk[column])
+        rows = literals if rows is None else rows + ', ' + literals
+    return ('(' + rows + ')').tolist()
+
+# Function to stream a downloaded csv into a parquet file without going through pandas
+def write_csv_as_parquet(file_path, sink):
+    # pyarrow is only needed for bulk mode
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    reader = pa_csv.open_csv(file_path)
+    rows = 0
+    with pq.ParquetWriter(sink, reader.schema, compression='snappy') as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+# Function to promote or refresh the uploaded folder as a dremio dataset with one metadata call
+def refresh_dremio_dataset(table_name):
+    # In a MinIO source the bucket is the first folder of the dataset path, a NAS source starts at its folder
+    path = [bulk_source, bulk_bucket, table_name] if bulk_target == 'minio' else [bulk_source, table_name]
+    send_sql_command(f'ALTER TABLE {".".join(quote_identifier(part) for part in path)} REFRESH METADATA AUTO PROMOTION')
+
+# Function to bulk load a downloaded csv as parquet into the bulk target and register it in dremio
+def bulk_load_csv(file_path, table_name):
+    # The dataset is a folder so that reloading a file only replaces its parquet part
+    object_name = f'{table_name}/{table_name}.parquet'
+    if bulk_target == 'minio':
+        # Spool to memory and only spill to disk for large files, then upload in one put
+        with tempfile.SpooledTemporaryFile(max_size=chunk_size) as buffer:
+            rows = write_csv_as_parquet(file_path, buffer)
+            size = buffer.tell()
+            buffer.seek(0)
+            minio_client.put_object(bulk_bucket, object_name, buffer, size,
+                                    content_type='application/vnd.apache.parquet')
+        logging.info(f"Wrote {rows} rows to {bulk_bucket}/{object_name}")
+    else:
+        target_path = os.path.join(nas_path, object_name)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        rows = write_csv_as_parquet(file_path, target_path)
+        logging.info(f"Wrote {rows} rows to {target_path}")
+    refresh_dremio_dataset(table_name)
+    return rows
+
+# Function to create the dremio table once and then stream typed row batches into it.
+# A url that failed before may have left its table with some of the rows, replace drops it first.
+def sql_load_csv(file_path, table_name, replace=False):
+    sample, dtypes = derive_schema(file_path)
+    if replace:
+        logging.info(f"Dropping {table_name} left by the failed load before loading it again")
+        send_sql_command(build_drop_table_command(table_name))
+    send_sql_command(build_create_table_command(sample, table_name))
+
+    insert_prefix = build_insert_prefix(sample, table_name)
+    with InsertSubmitter(args.max_in_flight, args.target_latency, args.max_statement_bytes) as insert_submitter:
+        # Read CSV in chunks with the sampled dtypes
+        for chunk in pd.read_csv(file_path, chunksize=1000, dtype=dtypes):  # Adjust the chunksize as needed for performance
+            # Hand the typed rows to the submitter, which batches them into multi-row INSERT statements
+            for values in encode_rows(chunk):
+                insert_submitter.add(insert_prefix, values)
+        insert_submitter.flush()
+    insert_submitter.report()
+    return insert_submitter.rows
+
+# Function to download, convert and upload one CSV url, failures are returned instead of stopping the run
+# retrying is set when the url failed in an earlier run, e.g. one retried with --retry-failed.
+def ingest_url(url, retrying=False):
+    started = time.monotonic()
+    file_name = url.split('/')[-1]
+    table_name = file_name.split('.')[0]
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        file_name = url.split('/')[-1]
-        table_name = file_name.split('.')[0]
-        
-        # Read CSV in chunks
-        for chunk in pd.read_csv(url, chunksize=1000):  # Adjust the chunksize as needed for performance
-            # Convert chunk to SQL table using in-memory SQLite database
-            conn = sqlite3.connect(':memory:')
-            
-            # Create table schema based on the first chunk
-            chunk.to_sql(table_name, conn, if_exists='replace', index=False)
-            
-            # Insert data into the table
-            insert_data(conn, table_name, chunk.values.tolist())
-
-            # Extract SQL commands to create and populate the table
-            sql_commands = []
-            for line in conn.iterdump():
-                sql_commands.append(line)
-            conn.close()
-
-            # Convert SQLite types to Dremio types
-            sql_commands = convert_sqlite_to_dremio(sql_commands)
-
-            # Filter out unsupported SQL commands
-            filtered_commands = filter_sql_commands(sql_commands)
-
-            # Separate CREATE TABLE command from INSERT commands
-            create_table_command = None
-            insert_commands = []
-            for command in filtered_commands:
-                if command.strip().upper().startswith("CREATE TABLE"):
-                    create_table_command = command
-                else:
-                    insert_commands.append(command)
-
-            # Modify the table name to include the full path
-            full_table_path = f'"{source}"."{table_name}"'
-            if create_table_command:
-                create_table_command = create_table_command.replace(f'"{table_name}"', full_table_path)
-                # Send the CREATE TABLE command
-                send_sql_command(create_table_command)
-
-            insert_commands = [cmd.replace(f'"{table_name}"', full_table_path) for cmd in insert_commands]
-
-            # Upload INSERT commands in chunks to Dremio
-            send_sql_in_chunks(insert_commands, chunk_size)  # 50MB chunk size
+        # Download each file exactly once, both load modes read from the local buffer
+        file_path = download_csv(url)
+        if args.mode == 'bulk':
+            rows = bulk_load_csv(file_path, table_name)
+        else:
+            rows = sql_load_csv(file_path, table_name, replace=retrying)
+
+        # Only drop the buffer once the load succeeded so a failed run can reuse it
+        os.remove(file_path)
+        return {'status': 'ok', 'rows': rows, 'seconds': time.monotonic() - started, 'error': None}
     except requests.exceptions.RequestException as e:
-        logging.error(f"Error occurred while downloading CSV file: {str(e)}")
-        sys.exit(1)
+        logging.error(f"Error occurred while downloading CSV file {url}: {str(e)}")
+        error = str(e)
     except pd.errors.ParserError as e:
-        logging.error(f"Error occurred while parsing CSV file: {str(e)}")
-        sys.exit(1)
+        logging.error(f"Error occurred while parsing CSV file {url}: {str(e)}")
+        error = str(e)
     except Exception as e:
-        logging.error(f"An unexpected error occurred: {str(e)}")
+        logging.error(f"An unexpected error occurred for {url}: {str(e)}")
+        error = str(e)
+    return {'status': 'failed', 'rows': 0, 'seconds': time.monotonic() - started, 'error': error}
+
+# Function to log a table with the result and rows/sec of every source in this run
+def log_summary(results):
+    summary = pd.DataFrame([
+        {
+            'source': url,
+            'status': result['status'],
+            'rows': result['rows'],
+            'seconds': round(result['seconds'], 1),
+            'rows/sec': round(result['rows'] / result['seconds']) if result['seconds'] else 0,
+        }
+        for url, result in results.items()
+    ])
+    logging.info("Ingest summary:\n" + summary.to_string(index=False))
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    run_state = load_state(args.state_file)
+
+    # Get CSV URLs from command line arguments, plus the failed ones from the last run when retrying
+    csv_urls = list(args.csv_urls)
+    if args.retry_failed:
+        csv_urls += [url for url, result in run_state.items() if result['status'] == 'failed' and url not in csv_urls]
+    if not csv_urls:
+        logging.error("No CSV URLs to process.")
+        sys.exit(1)
+
+    # Validate CSV URLs
+    validated_urls = [url for url in csv_urls if is_valid_url(url)]
+    if len(validated_urls) != len(csv_urls):
+        logging.error("One or more provided URLs are invalid.")
+        sys.exit(1)
+
+    configure(args)
+
+    # Download CSV files, convert to SQL, and upload to Dremio
+    logging.info("Script started")
+    logging.info(f"Processing {len(validated_urls)} CSV files with {args.workers} workers")
+    results = {}
+    retrying = {url: run_state.get(url, {}).get('status') == 'failed' for url in validated_urls}
+    if args.workers > 1:
+        context = worker_context()
+        # Forked workers inherit the dremio token and settings loaded above, others log in on start
+        initializer, initargs = (None, ()) if context.get_start_method() == 'fork' else (configure, (args,))
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                                 initializer=initializer, initargs=initargs) as executor:
+            futures = {executor.submit(ingest_url, url, retrying[url]): url for url in validated_urls}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                run_state[futures[future]] = results[futures[future]]
+                save_state(args.state_file, run_state)
+    else:
+        for url in validated_urls:
+            results[url] = ingest_url(url, retrying[url])
+            run_state[url] = results[url]
+            save_state(args.state_file, run_state)
+
+    log_summary(results)
+    failed_urls = [url for url, result in results.items() if result['status'] == 'failed']
+    if failed_urls:
+        logging.error(f"{len(failed_urls)} of {len(results)} CSV files failed, rerun with --retry-failed to retry them")
         sys.exit(1)
-logging.info("Script completed")
\ No newline at end of file
+    logging.info("Script completed")
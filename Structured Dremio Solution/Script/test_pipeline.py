@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+
+
+@pytest.fixture
+def submitter():
+    with pipeline.InsertSubmitter(max_in_flight=2, target_latency=10.0, max_statement_bytes=1024,
+                                  initial_rows=100) as submitter:
+        yield submitter
+
+
+def test_adjust_halves_batch_after_slow_statement(submitter):
+    submitter._adjust(100, 15.0)
+    assert submitter.rows_per_statement == 50
+
+
+def test_adjust_doubles_batch_after_fast_full_statement(submitter):
+    submitter._adjust(100, 1.0)
+    assert submitter.rows_per_statement == 200
+
+
+def test_adjust_ignores_fast_partial_statement(submitter):
+    submitter._adjust(30, 1.0)
+    assert submitter.rows_per_statement == 100
+
+
+def test_adjust_keeps_batch_within_target(submitter):
+    submitter._adjust(100, 7.0)
+    assert submitter.rows_per_statement == 100
+
+
+def test_adjust_never_goes_below_one_row(submitter):
+    submitter.rows_per_statement = 1
+    submitter._adjust(1, 60.0)
+    assert submitter.rows_per_statement == 1
+
+
+def test_encode_column_integers_with_missing_values():
+    assert pipeline.encode_column(pd.Series([1, None, 3], dtype='Int64')).tolist() == ['1', 'NULL', '3']
+
+
+def test_encode_column_floats_and_infinities():
+    literals = pipeline.encode_column(pd.Series([1.5, np.inf, -np.inf, np.nan])).tolist()
+    assert literals == ['1.5', "CAST('Infinity' AS DOUBLE)", "CAST('-Infinity' AS DOUBLE)", 'NULL']
+
+
+def test_encode_column_booleans():
+    assert pipeline.encode_column(pd.Series([True, False, None], dtype='boolean')).tolist() == ['TRUE', 'FALSE', 'NULL']
+
+
+def test_encode_column_timestamps_to_milliseconds():
+    series = pd.Series(pd.to_datetime(['2024-01-02 03:04:05.678', None]))
+    assert pipeline.encode_column(series).tolist() == ["TIMESTAMP '2024-01-02 03:04:05.678'", 'NULL']
+
+
+def test_encode_column_escapes_quotes_in_text():
+    assert pipeline.encode_column(pd.Series(["O'Brien", None], dtype=object)).tolist() == ["'O''Brien'", 'NULL']
+
+
+def test_encode_rows_joins_columns_into_tuples():
+    chunk = pd.DataFrame({'a': pd.Series([1, 2], dtype='Int64'), 'b': ['x', None]})
+    assert pipeline.encode_rows(chunk) == ["(1, 'x')", '(2, NULL)']
+
+
+@pytest.mark.parametrize('dtype, values, expected', [
+    ('Int64', ['1', '2', None], 'Int64'),
+    ('Int64', ['1', '2.5'], 'float64'),
+    ('Int64', ['1', '99999999999999999999'], 'float64'),
+    ('Int64', ['1', 'x'], object),
+    ('float64', ['1.5', 'x'], object),
+    ('boolean', ['True', 'false'], 'boolean'),
+    ('boolean', ['True', 'maybe'], object),
+])
+def test_widen_dtype(dtype, values, expected):
+    assert pipeline.widen_dtype(dtype, pd.Series(values, dtype=object)) == expected
+
+
+def test_derive_schema_widens_columns_after_the_sample(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'sample_rows', 3)
+    csv = tmp_path / 'late.csv'
+    csv.write_text('a,b,c\n1,1,True\n2,2,False\n3,3,True\n4.5,x,True\n')
+    sample, dtypes = pipeline.derive_schema(str(csv))
+    assert dtypes == {'a': 'float64', 'b': object, 'c': 'boolean'}
+    assert pipeline.dremio_type(sample.dtypes['a']) == 'DOUBLE'
+    assert pipeline.dremio_type(sample.dtypes['b']) == 'VARCHAR'
+
+
+def test_write_csv_as_parquet_streams_every_batch(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    csv = tmp_path / 'big.csv'
+    csv.write_text('id,name\n' + ''.join(f'{i},n{i}\n' for i in range(200000)))
+    rows = pipeline.write_csv_as_parquet(str(csv), str(tmp_path / 'big.parquet'))
+    table = pq.read_table(tmp_path / 'big.parquet')
+    assert rows == table.num_rows == 200000
+    assert table.column('id').to_pylist()[-1] == 199999
@@ -1,9 +1,35 @@
 import os
 
+import sys
+
+import io
+
+import json
+
+import hashlib
+
+import inspect
+
+import csv
+
+import codecs
+
+from collections import Counter
+
+import argparse
+
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
 import pandas as pd
 
 from minio import Minio
 
+from minio.error import S3Error
+
 import logging
 
 from dotenv import load_dotenv
@@ -32,19 +58,43 @@ if not minio_access_key or not minio_secret_key:
 
     raise EnvironmentError("Please set 'MINIO_ACCESS_KEY' and 'MINIO_SECRET_KEY' in your environment.")
  
+def create_client():
+
+    """Create a MinIO client from the environment settings."""
+
+    return Minio(
+
+        minio_host,
+
+        access_key=minio_access_key,
+
+        secret_key=minio_secret_key,
+
+        secure=minio_secure
+
+    )
+ 
 # Initialize the MinIO client with secure=False for HTTP
 
-client = Minio(
+client = create_client()
+ 
+def init_worker():
+
+    """Give each worker process its own MinIO client instead of sharing the parent's connection pool."""
 
-    minio_host,
+    global client
 
-    access_key=minio_access_key,
+    client = create_client()
+ 
+def worker_context():
+
+    """Fork the workers where that is safe, elsewhere (Windows, macOS) use the platform's default start method."""
 
-    secret_key=minio_secret_key,
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
 
-    secure=minio_secure
+        return multiprocessing.get_context('fork')
 
-)
+    return multiprocessing.get_context()
  
 # Function to print bucket names
 
@@ -70,10 +120,6 @@ def print_bucket_names():
 
         logging.error(f"Error listing buckets: {e}")
  
-# Call the function to print the bucket names
-
-print_bucket_names()
- 
 # CSV Preprocessing Functions
 
 def handle_missing_values(df):
@@ -94,33 +140,147 @@ def handle_missing_values(df):
 
     return df
  
+# Bytes read from the start of a file to sniff its layout
+
+SNIFF_BYTES = 64 * 1024
+ 
+def sniff_csv(sample):
+
+    """Pick the encoding, delimiter, header row and column dtypes from the first bytes of a CSV file."""
+
+    if sample.startswith(codecs.BOM_UTF8):
+
+        encoding = 'utf-8-sig'
+
+    else:
+
+        # The sample may end in the middle of a multi-byte character
+
+        complete = sample[:-4] if len(sample) >= SNIFF_BYTES else sample
+
+        try:
+
+            complete.decode('utf-8')
+
+            encoding = 'utf-8'
+
+        except UnicodeDecodeError:
+
+            encoding = 'latin-1'
+
+    lines = sample.decode(encoding, errors='ignore').splitlines()
+
+    if len(sample) >= SNIFF_BYTES:
+
+        lines = lines[:-1]  # Drop the line cut off by the sample size
+
+    lines = [line for line in lines if line.strip()]
+
+    if not lines:
+
+        return None
+ 
+    # The delimiter is the one that splits the most rows into the same number of fields
+
+    def delimiter_score(delimiter):
+
+        field_count, rows_with_count = Counter(len(row) for row in csv.reader(lines, delimiter=delimiter)).most_common(1)[0]
+
+        return field_count > 1, rows_with_count, field_count
+
+    delimiter = max([',', ';', '\t', '|'], key=delimiter_score)
+ 
+    # The header is the first row with as many fields as most rows, which skips title or note lines above it
+
+    rows = list(csv.reader(lines, delimiter=delimiter))
+
+    field_count = Counter(len(row) for row in rows).most_common(1)[0][0]
+
+    header_row = next(index for index, row in enumerate(rows) if len(row) == field_count)
+ 
+    sample_df = pd.read_csv(io.StringIO('\n'.join(lines)), sep=delimiter, header=header_row)
+
+    dtypes = {}
+
+    for column, dtype in sample_df.dtypes.items():
+
+        # Text columns and columns empty in the sample are left to the parser
+
+        if sample_df[column].isnull().all():
+
+            continue
+
+        if dtype == 'int64':
+
+            dtypes[column] = 'Int64'  # Nullable, a missing value later in the file must not fail the parse
+
+        elif dtype == 'float64':
+
+            dtypes[column] = 'float64'
+
+        elif dtype == 'bool':
+
+            dtypes[column] = 'boolean'
+
+    return {'encoding': encoding, 'sep': delimiter, 'header': header_row, 'dtype': dtypes}
+ 
+def read_sniffed_csv(file_path, layout):
+
+    """Parse the whole file once with the pyarrow engine and the sniffed layout."""
+
+    try:
+
+        df = pd.read_csv(file_path, engine='pyarrow', **layout)
+
+    except (ValueError, TypeError) as e:
+
+        # A value later in the file did not fit the sampled dtype, let pandas infer the types instead
+
+        logging.info(f"Sampled dtypes did not fit {file_path} ({e}), parsing without them.")
+
+        layout = {key: value for key, value in layout.items() if key != 'dtype'}
+
+        df = pd.read_csv(file_path, engine='pyarrow', **layout)
+
+    # Give integer columns the dtype a plain read would, int64 or float64 when values are missing
+
+    for column in df.columns:
+
+        if str(df[column].dtype) in ('Int64', 'int64[pyarrow]'):
+
+            df[column] = df[column].astype('float64' if df[column].isnull().any() else 'int64')
+
+        elif str(df[column].dtype) in ('double[pyarrow]',):
+
+            df[column] = df[column].astype('float64')
+
+    return df
+ 
 def preprocess_csv(file_path):
 
     """Load and preprocess CSV data."""
 
     try:
 
-        # Try loading the CSV file normally
+        # Sniff the layout from the first few KB so the file is parsed exactly once
 
-        df = pd.read_csv(file_path)
+        with open(file_path, 'rb') as f:
 
-        logging.info(f"Columns in {file_path} (initial load): {df.columns.tolist()}")
- 
-        # If there are any missing columns or if the DataFrame is empty, try again with no header
+            layout = sniff_csv(f.read(SNIFF_BYTES))
 
-        if df.empty or df.columns.isnull().any():
+        if layout is None:
 
-            logging.info("Attempting to use the first row as column headers.")
+            logging.warning(f"{file_path} is empty.")
 
-            df = pd.read_csv(file_path, header=None)  # Read without headers
+            return None
 
-            df.columns = df.iloc[0]  # Set the first row as header
+        if layout['header']:
 
-            df = df[1:]  # Remove the first row from the data
+            logging.info(f"Using row {layout['header']} of {file_path} as column headers.")
 
-            df.reset_index(drop=True, inplace=True)
- 
-            logging.info(f"Columns in {file_path} (after setting header): {df.columns.tolist()}")
+        df = read_sniffed_csv(file_path, layout)
+
+        logging.info(f"Columns in {file_path}: {df.columns.tolist()}")
  
         # Handle missing values
 
@@ -142,9 +302,313 @@ def preprocess_csv(file_path):
 
         return None
  
+class ColumnStatistics:
+
+    """Fill statistics for one column, built up chunk by chunk.
+ 
+    Numeric values are kept as exact value counts while the column has at most max_exact_values
+
+    distinct values, which covers ids, ages and codes, and are folded into a t-digest after that,
+
+    so memory per column stays bounded no matter how many rows the file has.
+
+    """
+
+    def __init__(self, max_exact_values=10000, compression=200):
+
+        self.max_exact_values = max_exact_values
+
+        self.compression = compression
+
+        self.numeric = True
+
+        self.is_float = False
+
+        self.count = 0
+
+        self.missing = 0
+
+        self.value_counts = pd.Series(dtype='float64')
+
+        self.centroids = None  # (means, weights) once the column switched to the t-digest
+ 
+    def update(self, values):
+
+        self.missing += int(values.isnull().sum())
+
+        values = values.dropna()
+
+        self.count += len(values)
+
+        if values.dtype not in ('float64', 'int64'):
+
+            self.numeric = False
+
+        if not self.numeric:
+
+            # Only the non-null count is needed for non-numeric columns
+
+            self.value_counts = None
+
+            self.centroids = None
+
+            return
+
+        self.is_float = self.is_float or values.dtype == 'float64'
+
+        if values.empty:
+
+            return
+
+        if self.centroids is None:
+
+            self.value_counts = self.value_counts.add(values.value_counts(), fill_value=0)
+
+            if len(self.value_counts) > self.max_exact_values:
+
+                self.centroids = self._compress(self.value_counts.index.to_numpy(dtype='float64'),
+
+                                                self.value_counts.to_numpy(dtype='float64'))
+
+                self.value_counts = None
+
+        else:
+
+            means, weights = self.centroids
+
+            self.centroids = self._compress(np.concatenate([means, values.to_numpy(dtype='float64')]),
+
+                                            np.concatenate([weights, np.ones(len(values))]))
+ 
+    def _compress(self, means, weights):
+
+        """Merge sorted points into t-digest centroids using the arcsine scale function."""
+
+        order = np.argsort(means, kind='stable')
+
+        means, weights = means[order], weights[order]
+
+        total = weights.sum()
+
+        quantiles = (np.cumsum(weights) - weights / 2) / total
+
+        # Points whose scaled quantile falls in the same unit interval share a centroid, giving
+
+        # small centroids near the tails and larger ones around the median
+
+        scale = self.compression / (2 * np.pi) * np.arcsin(2 * quantiles - 1)
+
+        buckets = np.floor(scale - scale.min()).astype(np.int64)
+
+        merged_weights = np.bincount(buckets, weights=weights)
+
+        merged_means = np.bincount(buckets, weights=means * weights)
+
+        keep = merged_weights > 0
+
+        return merged_means[keep] / merged_weights[keep], merged_weights[keep]
+ 
+    def median(self):
+
+        """Median of the non-null values, exact while value counts are kept."""
+
+        if not self.numeric or self.count == 0:
+
+            return None
+
+        if self.centroids is None:
+
+            counts = self.value_counts.sort_index()
+
+            cumulative = counts.cumsum().to_numpy()
+
+            values = counts.index.to_numpy(dtype='float64')
+
+            # Average the two middle values for an even count, like pandas does
+
+            lower = values[np.searchsorted(cumulative, (self.count + 1) // 2)]
+
+            upper = values[np.searchsorted(cumulative, self.count // 2 + 1)]
+
+            return (lower + upper) / 2
+
+        means, weights = self.centroids
+
+        positions = np.cumsum(weights) - weights / 2
+
+        return float(np.interp(self.count / 2, positions, means))
+ 
+def collect_fill_statistics(stream, chunk_rows, layout=None):
+
+    """First pass over the CSV data: gather per column fill statistics chunk by chunk."""
+
+    statistics = {}
+
+    for chunk in pd.read_csv(stream, chunksize=chunk_rows, **(layout or {})):
+
+        for column in chunk.columns:
+
+            statistics.setdefault(column, ColumnStatistics()).update(chunk[column])
+
+    return statistics
+ 
+def apply_fill_statistics(chunk, statistics):
+
+    """Second pass: fill missing numeric values with the file wide medians and drop columns empty in the whole file."""
+
+    for column, column_statistics in statistics.items():
+
+        if column_statistics.numeric and column_statistics.missing and column_statistics.count:
+
+            chunk[column] = chunk[column].fillna(column_statistics.median())
+
+    empty_columns = [column for column, column_statistics in statistics.items() if column_statistics.count == 0]
+
+    return chunk.drop(columns=empty_columns)
+ 
+def fill_statistics_dtypes(statistics):
+
+    """Column dtypes that make every chunk parse the way the whole file would."""
+
+    dtypes = {}
+
+    for column, column_statistics in statistics.items():
+
+        if column_statistics.numeric and column_statistics.count:
+
+            # A column with missing values or any decimal value is float in the whole file
+
+            float_column = column_statistics.is_float or column_statistics.missing
+
+            dtypes[column] = 'float64' if float_column else 'int64'
+
+    return dtypes
+ 
+class ChunkedUploadStream(io.RawIOBase):
+
+    """Readable stream over an iterator of byte chunks, so put_object can upload without a local file."""
+
+    def __init__(self, chunks):
+
+        self._chunks = iter(chunks)
+
+        self._buffer = b''
+ 
+    def readable(self):
+
+        return True
+ 
+    def readinto(self, b):
+
+        while not self._buffer:
+
+            try:
+
+                self._buffer = next(self._chunks)
+
+            except StopIteration:
+
+                return 0
+
+        size = min(len(b), len(self._buffer))
+
+        b[:size] = self._buffer[:size]
+
+        self._buffer = self._buffer[size:]
+
+        return size
+ 
+def stream_processed_csv(stream, chunk_rows, statistics, layout=None):
+
+    """Read CSV data in chunks, fill them from the first pass statistics and yield the processed CSV bytes."""
+
+    dtypes = fill_statistics_dtypes(statistics)
+
+    for index, chunk in enumerate(pd.read_csv(stream, chunksize=chunk_rows, dtype=dtypes, **(layout or {}))):
+
+        chunk = apply_fill_statistics(chunk, statistics)
+
+        yield chunk.to_csv(index=False, header=(index == 0)).encode('utf-8')
+ 
+def preprocess_object_streaming(bucket_name, silver_bucket_name, object_name, chunk_rows):
+
+    """Stream an object from the source bucket through preprocessing into the silver bucket using multipart upload."""
+
+    # Sniff the encoding, delimiter and header row from a ranged read of the first few KB
+
+    response = client.get_object(bucket_name, object_name, offset=0, length=SNIFF_BYTES)
+
+    try:
+
+        layout = sniff_csv(response.read())
+
+    finally:
+
+        response.close()
+
+        response.release_conn()
+
+    if layout is None:
+
+        raise ValueError(f"{object_name} is empty.")
+
+    # The statistics pass settles the dtypes for the whole file, the sampled ones are not needed here
+
+    layout = {key: value for key, value in layout.items() if key != 'dtype'}
+ 
+    # First pass only keeps bounded per column statistics, so the object is read twice instead of held in memory
+
+    response = client.get_object(bucket_name, object_name)
+
+    try:
+
+        statistics = collect_fill_statistics(response, chunk_rows, layout)
+
+    finally:
+
+        response.close()
+
+        response.release_conn()
+
+    for column, column_statistics in statistics.items():
+
+        if column_statistics.count == 0:
+
+            logging.warning(f"Column '{column}' is completely empty. Skipping median fill.")
+ 
+    response = client.get_object(bucket_name, object_name)
+
+    try:
+
+        # Unknown length makes the client upload in parts as the processed chunks are produced
+
+        client.put_object(
+
+            silver_bucket_name,
+
+            os.path.basename(object_name),
+
+            ChunkedUploadStream(stream_processed_csv(response, chunk_rows, statistics, layout)),
+
+            length=-1,
+
+            part_size=10 * 1024 * 1024,
+
+            content_type='text/csv'
+
+        )
+
+        logging.info(f"Streamed processed {object_name} to {silver_bucket_name}.")
+
+    finally:
+
+        response.close()
+
+        response.release_conn()
+ 
 def copy_objects(source_bucket, dest_bucket, file_path):
 
-    """Copy files from source bucket to destination bucket."""
+    """Copy files from source bucket to destination bucket and return whether the upload succeeded."""
 
     try:
 
@@ -152,67 +616,251 @@ def copy_objects(source_bucket, dest_bucket, file_path):
 
         logging.info(f"Copied {file_path} to {dest_bucket}.")
 
+        return True
+
     except Exception as err:
 
         logging.error(f"Error copying {file_path} to {dest_bucket}: {err}")
+
+        return False
+ 
+def preprocess_object(bucket_name, silver_bucket_name, object_name, streaming, chunk_rows):
+
+    """Preprocess one CSV object into the silver bucket and return whether it was processed."""
+
+    if streaming:
+
+        try:
+
+            preprocess_object_streaming(bucket_name, silver_bucket_name, object_name, chunk_rows)
+
+            return True
+
+        except Exception as e:
+
+            logging.error(f"Error processing {object_name}: {e}")
+
+            return False
+
+    temp_file_path = f'/tmp/{object_name}'
+
+    os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
+
+    try:
+
+        client.fget_object(bucket_name, object_name, temp_file_path)
+
+        processed_data = preprocess_csv(temp_file_path)
+
+        if processed_data is not None:
+
+            logging.info(f"Processed data for {object_name}.")
+
+            # Save the processed data locally first
+
+            processed_data.to_csv(temp_file_path, index=False)  # Save locally
+ 
+            # Copy the processed file to the silver bucket; only a confirmed upload counts as processed
+
+            return copy_objects(bucket_name, silver_bucket_name, temp_file_path)
+
+        logging.warning(f"Skipping processing for {object_name} due to validation issues.")
+
+        return False
+
+    except Exception as e:
+
+        logging.error(f"Error processing {object_name}: {e}")
+
+        return False
+
+    finally:
+
+        # Clean up temporary file
+
+        if os.path.exists(temp_file_path):
+
+            os.remove(temp_file_path)
+ 
+def preprocessing_config_hash(streaming, chunk_rows):
+
+    """Hash of the preprocessing code and options, so changing either reprocesses every object."""
+
+    config = hashlib.sha256()
+
+    # Every function that shapes the output, in both the temp file and the streaming path
+
+    functions = (handle_missing_values, sniff_csv, read_sniffed_csv, preprocess_csv, preprocess_object,
+
+                 ColumnStatistics, collect_fill_statistics, apply_fill_statistics, fill_statistics_dtypes,
+
+                 ChunkedUploadStream, stream_processed_csv, preprocess_object_streaming)
+
+    for function in functions:
+
+        config.update(inspect.getsource(function).encode('utf-8'))
+
+    config.update(json.dumps({'streaming': streaming, 'chunk_rows': chunk_rows}, sort_keys=True).encode('utf-8'))
+
+    return config.hexdigest()
+ 
+def ensure_bucket(bucket_name):
+
+    """Create the bucket if it does not exist yet."""
+
+    if not client.bucket_exists(bucket_name):
+
+        client.make_bucket(bucket_name)
+
+        logging.info(f"Created bucket {bucket_name}.")
+ 
+def load_manifest(manifest_bucket, manifest_name):
+
+    """Load the manifest of previously processed objects, empty if there is none yet."""
+
+    try:
+
+        response = client.get_object(manifest_bucket, manifest_name)
+
+        try:
+
+            return json.loads(response.read())
+
+        finally:
+
+            response.close()
+
+            response.release_conn()
+
+    except S3Error as err:
+
+        if err.code == 'NoSuchKey':
+
+            return {}
+
+        raise
+ 
+def save_manifest(manifest_bucket, manifest_name, manifest):
+
+    """Write the manifest back to the metadata bucket."""
+
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+
+    client.put_object(manifest_bucket, manifest_name, io.BytesIO(data), len(data), content_type='application/json')
+ 
+def preprocess_all_csv_files_in_bucket(bucket_name, silver_bucket_name, streaming=False, chunk_rows=100000, workers=1,
+
+                                       prefix=None, manifest_bucket='dw-bucket-metadata',
+
+                                       manifest_name='preprocessing/manifest.json', force=False):
+
+    """Preprocess all CSV files in the specified MinIO bucket and move to silver bucket.
  
-def preprocess_all_csv_files_in_bucket(bucket_name, silver_bucket_name):
+    Objects whose ETag, size and preprocessing config match the manifest from an earlier run are skipped.
 
-    """Preprocess all CSV files in the specified MinIO bucket and move to silver bucket."""
+    """
 
     processed_files = []  # To keep track of processed files
 
     skipped_files = []    # To keep track of skipped files
 
+    unchanged_files = []  # To keep track of files already processed with the same content and config
+
     try:
 
-        objects = client.list_objects(bucket_name, recursive=True)
+        config_hash = preprocessing_config_hash(streaming, chunk_rows)
 
-        for obj in objects:
+        # A first run may find neither the metadata nor the silver bucket
 
-            if obj.object_name.endswith('/') or not obj.object_name.endswith('.csv'):
+        ensure_bucket(manifest_bucket)
 
-                continue  # Skip directories and non-CSV files
+        ensure_bucket(silver_bucket_name)
 
-            temp_file_path = f'/tmp/{obj.object_name}'
+        manifest = load_manifest(manifest_bucket, manifest_name)
 
-            os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
+        objects = client.list_objects(bucket_name, prefix=prefix, recursive=True)
 
-            client.fget_object(bucket_name, obj.object_name, temp_file_path)
+        # Skip directories and non-CSV files
 
-            try:
+        csv_objects = [obj for obj in objects if not obj.object_name.endswith('/') and obj.object_name.endswith('.csv')]
 
-                processed_data = preprocess_csv(temp_file_path)
+        pending_objects = []
 
-                if processed_data is not None:
+        for obj in csv_objects:
 
-                    processed_files.append(obj.object_name)
+            entry = manifest.get(obj.object_name)
 
-                    logging.info(f"Processed data for {obj.object_name}.")
+            if not force and entry and entry['etag'] == obj.etag and entry['size'] == obj.size and entry['config_hash'] == config_hash:
 
-                    # Save the processed data locally first
+                unchanged_files.append(obj.object_name)
 
-                    processed_data.to_csv(temp_file_path, index=False)  # Save locally
- 
-                    # Copy the processed file to the silver bucket
+            else:
+
+                pending_objects.append(obj)
+
+        object_names = [obj.object_name for obj in pending_objects]
 
-                    copy_objects(bucket_name, silver_bucket_name, temp_file_path)
+        if workers > 1 and len(object_names) > 1:
 
-                    # Clean up temporary file
+            # While one worker parses, the others are downloading or uploading, so network time overlaps with compute
 
-                    os.remove(temp_file_path)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(),
 
-                else:
+                                     initializer=init_worker) as executor:
 
-                    skipped_files.append(obj.object_name)
+                results = executor.map(preprocess_object, [bucket_name] * len(object_names),
 
-                    logging.warning(f"Skipping processing for {obj.object_name} due to validation issues.")
+                                       [silver_bucket_name] * len(object_names), object_names,
 
-            except Exception as e:
+                                       [streaming] * len(object_names), [chunk_rows] * len(object_names))
+
+                results = list(results)
+
+        else:
 
-                logging.error(f"Error processing {obj.object_name}: {e}")
+            results = [preprocess_object(bucket_name, silver_bucket_name, object_name, streaming, chunk_rows)
 
-                os.remove(temp_file_path)
+                       for object_name in object_names]
+
+        for obj, processed in zip(pending_objects, results):
+
+            if processed:
+
+                processed_files.append(obj.object_name)
+
+                manifest[obj.object_name] = {
+
+                    'etag': obj.etag,
+
+                    'size': obj.size,
+
+                    'config_hash': config_hash,
+
+                    'output': os.path.basename(obj.object_name),
+
+                }
+
+            else:
+
+                skipped_files.append(obj.object_name)
+
+                manifest.pop(obj.object_name, None)
+ 
+        # Forget objects that were removed from the source bucket
+
+        listed_names = {obj.object_name for obj in csv_objects}
+
+        removed_files = [object_name for object_name in manifest
+
+                         if object_name.startswith(prefix or '') and object_name not in listed_names]
+
+        for object_name in removed_files:
+
+            del manifest[object_name]
+
+        if processed_files or skipped_files or removed_files:
+
+            save_manifest(manifest_bucket, manifest_name, manifest)
  
         # Summary of processing
 
@@ -221,21 +869,45 @@ def preprocess_all_csv_files_in_bucket(bucket_name, silver_bucket_name):
         logging.info(f"Processed files: {processed_files}")
 
         logging.info(f"Skipped files: {skipped_files}")
+
+        logging.info(f"Unchanged files: {len(unchanged_files)}")
  
-        # Optionally list all files in the silver bucket
+        # Optionally list the files written in the silver bucket, only under the prefixes this run touched
 
-        silver_objects = client.list_objects(silver_bucket_name, recursive=True)
+        silver_files = []
 
-        silver_files = [obj.object_name for obj in silver_objects]
+        for output_prefix in sorted({manifest[object_name]['output'] for object_name in processed_files}):
 
-        logging.info(f"Files in silver bucket after processing: {silver_files}")
+            silver_files.extend(obj.object_name for obj in client.list_objects(silver_bucket_name, prefix=output_prefix))
+
+        logging.info(f"Files written to silver bucket: {silver_files}")
 
     except Exception as err:
 
         logging.error(f"Error listing objects in bucket {bucket_name}: {err}")
  
-# Example usage
+# Example usage; spawned workers import this file too, so only the main process runs the sweep
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Preprocess CSV files from the bronze bucket into the silver bucket.')
+
+    parser.add_argument('--streaming', action='store_true', help='Process objects chunk by chunk in memory without using local disk')
+
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='Rows per chunk in streaming mode')
+
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes preprocessing files in parallel')
+
+    parser.add_argument('--prefix', default=None, help='Only preprocess objects under this prefix of the bronze bucket')
+
+    parser.add_argument('--force', action='store_true', help='Reprocess every object even if the manifest says it is unchanged')
+
+    args = parser.parse_args()
+
+    # Call the function to print the bucket names
+
+    print_bucket_names()
 
-preprocess_all_csv_files_in_bucket('dw-bucket-bronze', 'dw-bucket-silver')
+    preprocess_all_csv_files_in_bucket('dw-bucket-bronze', 'dw-bucket-silver', streaming=args.streaming,
 
- 
\ No newline at end of file
+                                       chunk_rows=args.chunk_rows, workers=args.workers, prefix=args.prefix, force=args.force)
@@ -0,0 +1,110 @@
+import codecs
+import io
+import importlib.util
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The script builds its MinIO client on import, it does not connect until used
+os.environ.setdefault('MINIO_ACCESS_KEY', 'test')
+os.environ.setdefault('MINIO_SECRET_KEY', 'test')
+os.environ.setdefault('MINIO_HOST', 'localhost:9000')
+
+spec = importlib.util.spec_from_file_location('pre_processing', Path(__file__).with_name('pre-processing.py'))
+pre_processing = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pre_processing)
+
+
+def test_sniff_csv_comma_separated_with_typed_columns():
+    layout = pre_processing.sniff_csv(b'id,amount,flag,name,empty\n1,2.5,True,a,\n2,3.0,False,b,\n')
+    assert layout == {'encoding': 'utf-8', 'sep': ',', 'header': 0,
+                      'dtype': {'id': 'Int64', 'amount': 'float64', 'flag': 'boolean'}}
+
+
+def test_sniff_csv_semicolons_below_a_title_line():
+    layout = pre_processing.sniff_csv(b'Exported survey data\na;b;c\n1;2;3\n4;5;6\n')
+    assert layout['sep'] == ';'
+    assert layout['header'] == 1
+
+
+@pytest.mark.parametrize('sample, encoding', [
+    (codecs.BOM_UTF8 + 'a,b\n1,2\n'.encode('utf-8'), 'utf-8-sig'),
+    ('name,city\nJosé,Zürich\n'.encode('utf-8'), 'utf-8'),
+    ('name,city\nJosé,Zürich\n'.encode('latin-1'), 'latin-1'),
+])
+def test_sniff_csv_encoding(sample, encoding):
+    assert pre_processing.sniff_csv(sample)['encoding'] == encoding
+
+
+def test_sniff_csv_drops_line_cut_off_by_the_sample_size():
+    rows = b'a,b\n' + b'1,2\n' * (pre_processing.SNIFF_BYTES // 4)
+    layout = pre_processing.sniff_csv((rows + b'3,xyz')[:pre_processing.SNIFF_BYTES])
+    assert layout['dtype'] == {'a': 'Int64', 'b': 'Int64'}
+
+
+def test_sniff_csv_empty_sample():
+    assert pre_processing.sniff_csv(b'\n\n') is None
+
+
+def chunks_of(series, count):
+    return [series.iloc[start::count] for start in range(count)]
+
+
+def column_statistics(chunks, **kwargs):
+    statistics = pre_processing.ColumnStatistics(**kwargs)
+    for chunk in chunks:
+        statistics.update(chunk)
+    return statistics
+
+
+@pytest.mark.parametrize('values', [
+    [1, 2, 3],
+    [4, 1, 3, 2],
+    [1.5, np.nan, 2.5, 2.5, np.nan, 10.0],
+    [7],
+    [3, 3, 3, 1, 1, 9],
+])
+def test_median_matches_pandas_while_exact(values):
+    series = pd.Series(values)
+    statistics = column_statistics(chunks_of(series, 2))
+    assert statistics.median() == pytest.approx(series.median())
+
+
+def test_median_of_t_digest_is_close_to_pandas():
+    series = pd.Series(np.random.default_rng(0).normal(50, 10, 50000))
+    statistics = column_statistics(chunks_of(series, 10), max_exact_values=1000)
+    assert statistics.centroids is not None
+    assert statistics.median() == pytest.approx(series.median(), abs=0.1)
+
+
+def test_median_of_text_or_empty_column_is_none():
+    assert column_statistics([pd.Series(['a', 'b'])]).median() is None
+    assert column_statistics([pd.Series([np.nan, np.nan])]).median() is None
+
+
+def test_chunked_upload_stream_skips_empty_chunks_until_the_end():
+    stream = pre_processing.ChunkedUploadStream([b'ab', b'', b'cde', b'f'])
+    # Raw reads may return less than asked, put_object reads until a part is full
+    assert b''.join(iter(lambda: stream.read(4), b'')) == b'abcdef'
+    assert stream.read() == b''
+
+
+def test_streaming_matches_preprocessing_the_whole_file(tmp_path):
+    data = pd.DataFrame({
+        'id': range(1, 11),
+        'age': [30, None, 41, 25, None, 60, 33, 47, None, 52],
+        'score': [1.5, 2.5, np.nan, 4.0, 5.5, np.nan, 7.0, 8.5, 9.0, 10.5],
+        'name': list('abcdefghij'),
+    })
+    csv = tmp_path / 'survey.csv'
+    data.to_csv(csv, index=False)
+    expected = pre_processing.preprocess_csv(str(csv))
+
+    statistics = pre_processing.collect_fill_statistics(str(csv), chunk_rows=3)
+    chunks = list(pre_processing.stream_processed_csv(str(csv), 3, statistics))
+    assert len(chunks) == 4
+    streamed = pd.read_csv(pre_processing.ChunkedUploadStream(chunks))
+    pd.testing.assert_frame_equal(streamed, pd.read_csv(io.StringIO(expected.to_csv(index=False))))
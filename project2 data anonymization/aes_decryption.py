@@ -0,0 +1,109 @@
+"""Column-at-a-time decryption of AES-CFB values encrypted like encrypt_message in encryption.ipynb:
+base64(IV + ciphertext) with a random 16 byte IV per value.
+
+In CFB mode every plaintext block is P_i = C_i XOR AES(C_{i-1}) with C_0 = IV, so the keystream of
+all values is the AES encryption of blocks that are already known. Values are grouped by their
+decoded length, base64 is decoded for a whole group with NumPy, the keystream of the group comes
+from one update of a single reused AES-ECB encryptor and is XORed in with NumPy.
+"""
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+BLOCK_SIZE = 16
+
+_BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+# Maps base64 characters to their 6 bit values, padding to 0 and everything else to 255
+_BASE64_VALUES = np.full(256, 255, dtype=np.uint8)
+_BASE64_VALUES[np.frombuffer(_BASE64_ALPHABET, dtype=np.uint8)] = np.arange(64, dtype=np.uint8)
+_BASE64_VALUES[ord('=')] = 0
+
+
+def b64decode_fixed(encoded, length):
+    """Decode equal length base64 strings given as one ASCII byte string.
+    Returns a (values, length // 4 * 3) array of bytes and the padding count of every value."""
+    characters = np.frombuffer(encoded, dtype=np.uint8).reshape(-1, length)
+    values = _BASE64_VALUES[characters]
+    if (values == 255).any():
+        raise ValueError("Invalid base64 character in encrypted values")
+    padding = (characters[:, -2:] == ord('=')).sum(axis=1)
+    # Every 4 characters carry 24 bits, i.e. 3 bytes
+    quads = values.reshape(len(values), -1, 4).astype(np.uint32)
+    bits = (quads[..., 0] << 18) | (quads[..., 1] << 12) | (quads[..., 2] << 6) | quads[..., 3]
+    decoded = np.empty(bits.shape + (3,), dtype=np.uint8)
+    decoded[..., 0] = bits >> 16
+    decoded[..., 1] = (bits >> 8) & 0xFF
+    decoded[..., 2] = bits & 0xFF
+    return decoded.reshape(len(values), -1), padding
+
+
+def decrypt_blocks(encryptor, data):
+    """Decrypt a (values, IV + ciphertext) byte array in which every value has the same length."""
+    rows, length = data.shape
+    message_length = length - BLOCK_SIZE
+    blocks = -(-message_length // BLOCK_SIZE)
+    # CFB keystream input: the IV followed by every full ciphertext block but the last
+    keystream_input = np.ascontiguousarray(data[:, :blocks * BLOCK_SIZE])
+    keystream = np.frombuffer(encryptor.update(keystream_input.tobytes()), dtype=np.uint8).reshape(rows, -1)
+    return data[:, BLOCK_SIZE:] ^ keystream[:, :message_length]
+
+
+def decrypt_values(key, values):
+    """Decrypt a column of base64 AES-CFB values to strings; missing values stay missing."""
+    values = pd.Series(values)
+    result = np.full(len(values), None, dtype=object)
+    present = values.notna().to_numpy()
+    if not present.any():
+        return result
+    encoded = values[present].astype(str).to_numpy()
+    positions = np.flatnonzero(present)
+    # ECB applies the block cipher alone, so one encryptor serves every value and group
+    encryptor = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend()).encryptor()
+    lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+    for length in np.unique(lengths):
+        in_group = np.flatnonzero(lengths == length)
+        if length % 4 or length < 24:
+            raise ValueError(f"Encrypted values must be base64 of an IV and a ciphertext, got length {length}")
+        decoded, padding = b64decode_fixed(''.join(encoded[in_group]).encode('ascii'), length)
+        # Padding shortens a value by one byte per '=', so each padding count is its own group
+        for pad in np.unique(padding):
+            rows = padding == pad
+            data = decoded[rows, :decoded.shape[1] - pad]
+            plaintext = decrypt_blocks(encryptor, data)
+            if plaintext.shape[1] == 0:
+                result[positions[in_group[rows]]] = ''
+                continue
+            texts = np.ascontiguousarray(plaintext).view(f'S{plaintext.shape[1]}').ravel()
+            result[positions[in_group[rows]]] = np.char.decode(texts, 'utf-8').astype(object)
+    return result
+
+
+def worker_context():
+    """Fork the workers where that is safe, elsewhere (Windows, macOS) use the platform's default start method."""
+    if 'fork' in multiprocessing.get_all_start_methods() and sys.platform != 'darwin':
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def decrypt_columns(df, key, columns, workers=1, chunk_rows=100000):
+    """Return a copy of df with the given columns decrypted.
+    With workers > 1 the columns, split into chunks of chunk_rows, are decrypted on a process pool."""
+    result = df.copy()
+    if workers <= 1:
+        for column in columns:
+            result[column] = decrypt_values(key, df[column])
+        return result
+    tasks = [(column, start) for column in columns for start in range(0, len(df), chunk_rows)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=worker_context()) as executor:
+        futures = [executor.submit(decrypt_values, key, df[column].iloc[start:start + chunk_rows]) for column, start in tasks]
+        decrypted = {column: [] for column in columns}
+        for (column, start), future in zip(tasks, futures):
+            decrypted[column].append(future.result())
+    for column in columns:
+        result[column] = np.concatenate(decrypted[column]) if decrypted[column] else np.array([], dtype=object)
+    return result
@@ -0,0 +1,57 @@
+"""Buckets for the ingest scripts: MinIO, or directories on disk for running without MinIO.
+Both have get(bucket, name), which returns None for a missing object, and put(bucket, name, data)."""
+import io
+import os
+
+
+class LocalStore:
+    """Buckets as directories under a root directory, for running without MinIO."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, bucket, name):
+        path = os.path.join(self.root, bucket, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put(self, bucket, name, data):
+        path = os.path.join(self.root, bucket, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a crash never leaves half a file behind
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+
+
+class MinioStore:
+    """Buckets in MinIO."""
+
+    def __init__(self):
+        from minio import Minio
+        from minio.error import S3Error
+        self.no_such_key = S3Error
+        self.client = Minio(
+            os.getenv('MINIO_HOST'),
+            access_key=os.getenv('MINIO_ACCESS_KEY'),
+            secret_key=os.getenv('MINIO_SECRET_KEY'),
+            secure=os.getenv('MINIO_SECURE', 'False').lower() == 'true'
+        )
+
+    def get(self, bucket, name):
+        try:
+            response = self.client.get_object(bucket, name)
+        except self.no_such_key as e:
+            if e.code == 'NoSuchKey':
+                return None
+            raise
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def put(self, bucket, name, data):
+        self.client.put_object(bucket, name, io.BytesIO(data), len(data))
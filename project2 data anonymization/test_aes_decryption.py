@@ -0,0 +1,76 @@
+import base64
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('cryptography')
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes  # noqa: E402
+
+try:
+    from cryptography.hazmat.decrepit.ciphers.modes import CFB
+except ImportError:
+    from cryptography.hazmat.primitives.ciphers.modes import CFB
+
+import aes_decryption  # noqa: E402
+
+KEY = bytes(range(32))
+
+
+def encrypt_message(key, plaintext):
+    """encrypt_message of encryption.ipynb."""
+    iv = os.urandom(16)
+    encryptor = Cipher(algorithms.AES(key), CFB(iv)).encryptor()
+    return base64.b64encode(iv + encryptor.update(plaintext.encode()) + encryptor.finalize()).decode()
+
+
+def test_nist_cfb128_vector():
+    # NIST SP 800-38A, F.3.13 CFB128-AES128.Encrypt
+    key = bytes.fromhex('2b7e151628aed2a6abf7158809cf4f3c')
+    iv = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+    plaintext = bytes.fromhex('6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51'
+                              '30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710')
+    ciphertext = bytes.fromhex('3b3fd92eb72dad20333449f8e83cfb4ac8a64537a0b3a93fcde3cdad9f1ce58b'
+                               '26751f67a3cbb140b1808cf187a4f4dfc04b05357c5d1c0eeac4c66f9ff7f2e6')
+    encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+    for length in (64, 40, 1):
+        data = np.frombuffer(iv + ciphertext[:length], dtype=np.uint8)[None, :]
+        assert aes_decryption.decrypt_blocks(encryptor, data).tobytes() == plaintext[:length]
+
+
+def test_decrypt_known_value():
+    encrypted = 'ZGVmZ2hpamtsbW5vcHFyc6HrPxWWRN4qDOja2Mqf47mMy0ykhz8='
+    assert aes_decryption.decrypt_values(KEY, [encrypted]).tolist() == ['23.5 degrees, sensor 7']
+
+
+def test_decrypt_values_of_every_length_and_padding():
+    texts = ['', 'a', '36.6', 'ü' * 7] + [str(value) * (value % 40) for value in range(100)]
+    encrypted = [encrypt_message(KEY, text) for text in texts]
+    assert aes_decryption.decrypt_values(KEY, encrypted).tolist() == texts
+
+
+def test_missing_values_stay_missing():
+    encrypted = pd.Series([encrypt_message(KEY, '98'), None, np.nan, encrypt_message(KEY, '99')], dtype=object)
+    assert aes_decryption.decrypt_values(KEY, encrypted).tolist() == ['98', None, None, '99']
+    assert aes_decryption.decrypt_values(KEY, [None, None]).tolist() == [None, None]
+
+
+@pytest.mark.parametrize('value', ['not base64!!' * 3, 'QUJD'])
+def test_malformed_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        aes_decryption.decrypt_values(KEY, [value])
+
+
+@pytest.mark.parametrize('start_method', multiprocessing.get_all_start_methods())
+def test_decrypt_columns_on_a_pool_matches_one_process(start_method, monkeypatch):
+    monkeypatch.setattr(aes_decryption, 'worker_context', lambda: multiprocessing.get_context(start_method))
+    df = pd.DataFrame({'heartRate': [encrypt_message(KEY, str(60 + i)) for i in range(25)],
+                       'SP02': [encrypt_message(KEY, str(90 + i % 10)) for i in range(25)],
+                       'timestamp': range(25)})
+    serial = aes_decryption.decrypt_columns(df, KEY, ['heartRate', 'SP02'])
+    parallel = aes_decryption.decrypt_columns(df, KEY, ['heartRate', 'SP02'], workers=2, chunk_rows=7)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial['heartRate'].tolist() == [str(60 + i) for i in range(25)]
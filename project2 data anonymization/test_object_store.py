@@ -0,0 +1,14 @@
+from object_store import LocalStore
+
+
+def test_local_store_round_trip(tmp_path):
+    store = LocalStore(str(tmp_path))
+    store.put('bucket', 'a/b/c.json', b'{}')
+    assert store.get('bucket', 'a/b/c.json') == b'{}'
+    store.put('bucket', 'a/b/c.json', b'[]')
+    assert store.get('bucket', 'a/b/c.json') == b'[]'
+    assert not list(tmp_path.rglob('*.tmp'))
+
+
+def test_local_store_missing_object_is_none(tmp_path):
+    assert LocalStore(str(tmp_path)).get('bucket', 'missing.json') is None
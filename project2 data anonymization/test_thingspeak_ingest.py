@@ -0,0 +1,93 @@
+import base64
+import threading
+from argparse import Namespace
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('cryptography')
+
+import thingspeak_ingest  # noqa: E402
+import thingspeak_standin  # noqa: E402
+from object_store import LocalStore  # noqa: E402
+
+KEY = bytes(range(32))
+CHANNEL = {
+    "channel_id": 7,
+    "fields": ["created_at", "entry_id", "field2", "field3"],
+    "rename": {"created_at": "timestamp", "field2": "heartRate", "field3": "SP02"},
+    "encrypted": ["field2", "field3"]
+}
+
+
+@pytest.fixture
+def standin():
+    """The stand-in with 100 encrypted entries, one a minute up to now."""
+    handler = type('Handler', (thingspeak_standin.FeedHandler,), {
+        'key': KEY, 'interval': 60,
+        'origin': datetime.now(timezone.utc).replace(microsecond=0) - timedelta(minutes=99),
+        'log_message': lambda self, *args: None,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_key_without_encrypted_fields_is_refused():
+    with pytest.raises(ValueError, match='no channel marks encrypted fields'):
+        thingspeak_ingest.check_encryption(thingspeak_ingest.DEFAULT_CHANNELS, KEY)
+
+
+def test_encrypted_fields_without_key_are_refused():
+    with pytest.raises(EnvironmentError):
+        thingspeak_ingest.check_encryption({'c': CHANNEL}, None)
+
+
+def test_plain_and_encrypted_channels_with_matching_key():
+    thingspeak_ingest.check_encryption(thingspeak_ingest.DEFAULT_CHANNELS, None)
+    thingspeak_ingest.check_encryption({'c': CHANNEL}, KEY)
+
+
+def test_fetch_pages_back_and_skips_entries_before_the_watermark(standin, monkeypatch):
+    url, _ = standin
+    monkeypatch.setattr(thingspeak_ingest, 'PAGE_SIZE', 30)
+    entries = thingspeak_ingest.fetch_new_entries(url, CHANNEL, None, None)
+    assert [entry['entry_id'] for entry in entries] == list(range(1, 101))
+    watermark = {'created_at': entries[59]['created_at'], 'entry_id': 60}
+    entries = thingspeak_ingest.fetch_new_entries(url, CHANNEL, None, watermark)
+    assert [entry['entry_id'] for entry in entries] == list(range(61, 101))
+
+
+def test_transform_decrypts_and_types_the_fields():
+    encrypt = thingspeak_standin.encrypt_message
+    entries = [
+        {'created_at': '2024-05-01T10:00:00Z', 'entry_id': 1, 'field2': encrypt(KEY, '64.876'), 'field3': encrypt(KEY, '97')},
+        {'created_at': '2024-05-01T10:01:00Z', 'entry_id': 2, 'field2': encrypt(KEY, 'n/a'), 'field3': None},
+    ]
+    df = thingspeak_ingest.transform_entries(entries, CHANNEL, KEY)
+    assert list(df.columns) == ['timestamp', 'entry_id', 'heartRate', 'SP02']
+    assert df['heartRate'].tolist()[0] == 64.88
+    assert df[['heartRate', 'SP02']].iloc[1].isna().all()
+    assert df['SP02'].tolist()[0] == 97.0
+    assert df['timestamp'].tolist()[0] == pd.Timestamp('2024-05-01 10:00:00', tz='UTC')
+
+
+def test_ingest_moves_the_watermark_and_writes_bronze_and_silver(standin, tmp_path):
+    url, _ = standin
+    store = LocalStore(str(tmp_path))
+    args = Namespace(base_url=url, bronze_bucket='bronze', silver_bucket='silver', metadata_bucket='metadata',
+                     watermark_name='thingspeak/watermarks.json')
+    watermarks = {}
+    assert thingspeak_ingest.ingest_channel(store, args, 'c', CHANNEL, watermarks, KEY) == 100
+    assert thingspeak_ingest.ingest_channel(store, args, 'c', CHANNEL, watermarks, KEY) == 0
+    assert thingspeak_ingest.load_watermarks(store, 'metadata', args.watermark_name)['c']['entry_id'] == 100
+    silver = pd.concat(pd.read_parquet(path) for path in sorted((tmp_path / 'silver').rglob('*.parquet')))
+    bronze = pd.concat(pd.read_parquet(path) for path in sorted((tmp_path / 'bronze').rglob('*.parquet')))
+    assert sorted(silver['entry_id']) == sorted(bronze['entry_id']) == list(range(1, 101))
+    assert silver['heartRate'].notna().all()
+    assert base64.b64decode(bronze['field2'].iloc[0])  # Bronze keeps the ciphertext
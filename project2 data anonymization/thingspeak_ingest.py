@@ -0,0 +1,176 @@
+import argparse
+import base64
+import io
+import json
+import logging
+import os
+
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+
+from aes_decryption import decrypt_columns
+from object_store import LocalStore, MinioStore
+
+# Load the .env file
+load_dotenv(dotenv_path='api.env')
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ThingSpeak returns at most 8000 entries per request, the most recent ones in the requested range
+PAGE_SIZE = 8000
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Same channels as encryption.ipynb, whose ThingSpeak feeds are plain text; the notebook only encrypts
+# after fetching. encrypted lists the fields holding encrypt_message values, thingspeak_standin_channels.json
+# marks the fields the stand-in encrypts when THINGSPEAK_AES_KEY is set.
+DEFAULT_CHANNELS = {
+    "Channel1": {
+        "channel_id": 2561136,
+        "api_key_env": "CHANNEL1_API_KEY",
+        "fields": ["created_at", "entry_id", "field2"],
+        "rename": {"created_at": "timestamp", "field2": "Body_temp"},
+        "encrypted": []
+    },
+    "Channel2": {
+        "channel_id": 2561145,
+        "api_key_env": "CHANNEL2_API_KEY",
+        "fields": ["created_at", "entry_id", "field2", "field3"],
+        "rename": {"created_at": "timestamp", "field2": "heartRate", "field3": "SP02"},
+        "encrypted": []
+    }
+}
+
+
+# Function to check that the AES key and the channels' encrypted fields go together
+def check_encryption(channels, key):
+    encrypted = any(channel.get('encrypted') for channel in channels.values())
+    if key is None and encrypted:
+        raise EnvironmentError("Please set 'THINGSPEAK_AES_KEY' to decrypt the encrypted fields.")
+    if key is not None and not encrypted:
+        # Ciphertext in unmarked fields would silently become missing values in Silver
+        raise ValueError("THINGSPEAK_AES_KEY is set but no channel marks encrypted fields, "
+                         "list them under 'encrypted' in the --channels file")
+
+
+# Function to fetch every feed entry of a channel after the watermark
+def fetch_new_entries(base_url, channel, api_key, watermark, session=None):
+    """Fetch the entries created after the watermark (created_at, entry_id), oldest first.
+    Pages backwards from now, because a page holds the newest PAGE_SIZE entries of its range."""
+    session = session or requests.Session()
+    params = {'results': PAGE_SIZE, 'timezone': 'Etc/UTC'}
+    if api_key:
+        params['api_key'] = api_key
+    if watermark:
+        params['start'] = pd.Timestamp(watermark['created_at']).strftime(TIME_FORMAT)
+    entries = {}
+    end = None
+    while True:
+        page_params = dict(params, end=end) if end else params
+        response = session.get(f"{base_url}/channels/{channel['channel_id']}/feeds.json", params=page_params, timeout=60)
+        response.raise_for_status()
+        feeds = response.json().get('feeds', [])
+        new = [entry for entry in feeds if entry['entry_id'] not in entries]
+        entries.update((entry['entry_id'], entry) for entry in new)
+        if len(feeds) < PAGE_SIZE or not new:
+            break
+        # The range ends are inclusive, the overlap at the boundary is dropped by entry_id
+        end = pd.Timestamp(min(entry['created_at'] for entry in feeds)).strftime(TIME_FORMAT)
+    last_entry_id = watermark['entry_id'] if watermark else 0
+    return sorted((entry for entry in entries.values() if entry['entry_id'] > last_entry_id),
+                  key=lambda entry: entry['entry_id'])
+
+
+# Function to turn raw feed entries into the channel's columns
+def transform_entries(entries, channel, key):
+    df = pd.DataFrame(entries, columns=channel['fields'])
+    encrypted = [field for field in channel.get('encrypted', []) if field in df.columns]
+    if encrypted:
+        df = decrypt_columns(df, key, encrypted, workers=int(os.getenv('DECRYPT_WORKERS', 1)))
+    df = df.rename(columns=channel['rename'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+    for column in df.columns:
+        if column not in ('timestamp', 'entry_id'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').round(2)
+    return df
+
+
+# Function to append a batch to date partitioned Parquet, one object per batch and date
+def write_partitioned(store, bucket, prefix, df, date_column):
+    dates = pd.to_datetime(df[date_column], utc=True).dt.strftime('%Y-%m-%d')
+    written = []
+    for date, part in df.groupby(dates):
+        name = f"{prefix}/date={date}/{part['entry_id'].min()}-{part['entry_id'].max()}.parquet"
+        buffer = io.BytesIO()
+        part.to_parquet(buffer, index=False)
+        store.put(bucket, name, buffer.getvalue())
+        written.append(name)
+    return written
+
+
+def load_watermarks(store, bucket, name):
+    data = store.get(bucket, name)
+    return json.loads(data) if data else {}
+
+
+def save_watermarks(store, bucket, name, watermarks):
+    store.put(bucket, name, json.dumps(watermarks, indent=2).encode('utf-8'))
+
+
+def ingest_channel(store, args, name, channel, watermarks, key):
+    """Fetch, store and decrypt the new entries of one channel, then move its watermark."""
+    watermark = watermarks.get(name)
+    entries = fetch_new_entries(args.base_url, channel, os.getenv(channel.get('api_key_env', '')), watermark)
+    if not entries:
+        logging.info(f"{name}: no new entries after {watermark}")
+        return 0
+    prefix = f"thingspeak/{name}"
+    # Bronze keeps the entries as fetched, still encrypted
+    raw = pd.DataFrame(entries)
+    write_partitioned(store, args.bronze_bucket, prefix, raw, 'created_at')
+    # Silver gets the decrypted, typed columns
+    write_partitioned(store, args.silver_bucket, prefix, transform_entries(entries, channel, key), 'timestamp')
+    last = entries[-1]
+    # The watermark only moves after both writes, so a failed run is fetched again
+    watermarks[name] = {'created_at': last['created_at'], 'entry_id': last['entry_id']}
+    save_watermarks(store, args.metadata_bucket, args.watermark_name, watermarks)
+    logging.info(f"{name}: ingested {len(entries)} entries up to {last['created_at']}")
+    return len(entries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incrementally ingest ThingSpeak channel feeds into Bronze and Silver.')
+    parser.add_argument('--channels', help='JSON file with the channel definitions, defaults to the notebook channels')
+    parser.add_argument('--base-url', default=os.getenv('THINGSPEAK_URL', 'https://api.thingspeak.com'),
+                        help='ThingSpeak API address, e.g. a local stand-in')
+    parser.add_argument('--target', choices=['minio', 'local'], default='minio')
+    parser.add_argument('--local-dir', default='thingspeak_data', help='Root directory of the local target')
+    parser.add_argument('--bronze-bucket', default='dw-bucket-bronze')
+    parser.add_argument('--silver-bucket', default='dw-bucket-silver')
+    parser.add_argument('--metadata-bucket', default='dw-bucket-metadata')
+    parser.add_argument('--watermark-name', default='thingspeak/watermarks.json')
+    args = parser.parse_args()
+
+    if args.channels:
+        with open(args.channels) as f:
+            channels = json.load(f)
+    else:
+        channels = DEFAULT_CHANNELS
+
+    # The AES key of encrypt_message, base64 encoded; only needed for channels with encrypted fields
+    key = os.getenv('THINGSPEAK_AES_KEY')
+    key = base64.b64decode(key) if key else None
+    check_encryption(channels, key)
+
+    store = LocalStore(args.local_dir) if args.target == 'local' else MinioStore()
+    watermarks = load_watermarks(store, args.metadata_bucket, args.watermark_name)
+    failed = []
+    for name, channel in channels.items():
+        try:
+            ingest_channel(store, args, name, channel, watermarks, key)
+        except Exception as e:
+            logging.error(f"{name}: ingest failed: {e}")
+            failed.append(name)
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,98 @@
+"""Local stand-in for the ThingSpeak feeds API, to run thingspeak_ingest.py without the real channels.
+
+Serves /channels/<id>/feeds.json with synthetic readings every --interval seconds from --hours ago
+until now, so new entries keep appearing while it runs. Like ThingSpeak it honours start, end
+(UTC, 'YYYY-MM-DD HH:MM:SS') and results, returning the most recent entries of the range.
+With THINGSPEAK_AES_KEY set the fields are encrypted like encrypt_message in encryption.ipynb,
+and the ingest needs thingspeak_standin_channels.json, which marks them as encrypted.
+
+    python thingspeak_standin.py --port 8080
+    python thingspeak_ingest.py --base-url http://localhost:8080 --target local
+
+    export THINGSPEAK_AES_KEY=$(python -c "import base64, os; print(base64.b64encode(os.urandom(32)).decode())")
+    python thingspeak_standin.py --port 8080
+    python thingspeak_ingest.py --base-url http://localhost:8080 --target local --channels thingspeak_standin_channels.json
+"""
+import argparse
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+MAX_RESULTS = 8000
+
+
+def encrypt_message(key, plaintext):
+    iv = os.urandom(16)
+    encryptor = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend()).encryptor()
+    return base64.b64encode(iv + encryptor.update(plaintext.encode()) + encryptor.finalize()).decode()
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    origin = None
+    interval = 60
+    key = None
+
+    def entry(self, channel_id, entry_id):
+        created_at = self.origin + timedelta(seconds=(entry_id - 1) * self.interval)
+        # Deterministic readings, so every request sees the same values for an entry
+        rng = np.random.default_rng([channel_id, entry_id])
+        entry = {'created_at': created_at.strftime('%Y-%m-%dT%H:%M:%SZ'), 'entry_id': entry_id}
+        for field, (mean, spread) in {'field2': (70, 10), 'field3': (97, 2)}.items():
+            value = str(round(rng.normal(mean, spread), 2))
+            entry[field] = encrypt_message(self.key, value) if self.key else value
+        return entry
+
+    def entry_id_at(self, moment):
+        """Id of the last entry created at or before moment."""
+        return int((moment - self.origin).total_seconds() // self.interval) + 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'channels' or parts[2] != 'feeds.json' or not parts[1].isdigit():
+            self.send_error(404)
+            return
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+
+        def parse_time(name, default):
+            if name not in query:
+                return default
+            return datetime.strptime(query[name], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+        now = datetime.now(timezone.utc)
+        start = parse_time('start', self.origin)
+        end = min(parse_time('end', now), now)
+        results = min(int(query.get('results', 100)), MAX_RESULTS)
+        first = max(1, self.entry_id_at(start - timedelta(microseconds=1)) + 1)
+        last = self.entry_id_at(end)
+        first = max(first, last - results + 1)
+        feeds = [self.entry(int(parts[1]), entry_id) for entry_id in range(first, last + 1)]
+
+        body = json.dumps({'channel': {'id': int(parts[1])}, 'feeds': feeds}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve synthetic ThingSpeak feeds locally.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--hours', type=float, default=24, help='How far back the feeds start')
+    parser.add_argument('--interval', type=int, default=15, help='Seconds between entries')
+    args = parser.parse_args()
+
+    key = os.getenv('THINGSPEAK_AES_KEY')
+    FeedHandler.key = base64.b64decode(key) if key else None
+    FeedHandler.origin = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=args.hours)
+    FeedHandler.interval = args.interval
+    print(f"Serving ThingSpeak stand-in on http://localhost:{args.port}")
+    ThreadingHTTPServer(('', args.port), FeedHandler).serve_forever()